@@ -0,0 +1,322 @@
+"""
+Activity buffer module
+Optional write-behind for activity rows: ids come from reserved blocks of
+the activities id sequence, rows are appended to a local spill file and
+written to the database in multi-row inserts by size or age
+"""
+import os
+import asyncio
+import json
+import sqlite3
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from concurrency import run_io
+from metrics import metrics
+
+ACTIVITY_WRITE_BEHIND = os.getenv("ACTIVITY_WRITE_BEHIND", "0") == "1"
+ACTIVITY_FLUSH_ROWS = int(os.getenv("ACTIVITY_FLUSH_ROWS", 500))
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", 1.0))
+ACTIVITY_ID_BLOCK = int(os.getenv("ACTIVITY_ID_BLOCK", 1000))
+ACTIVITY_SPILL_DIR = os.getenv("ACTIVITY_SPILL_DIR", os.path.join(os.path.dirname(__file__), ".cache", "activity_spill"))
+# fsync the spill file before add() returns; concurrent adds share one fsync
+ACTIVITY_SPILL_FSYNC = os.getenv("ACTIVITY_SPILL_FSYNC", "1") == "1"
+# Failed flushes of one segment before it stops holding up the others and
+# its rows are retried one by one, dead-lettering those that keep failing
+ACTIVITY_FLUSH_MAX_ATTEMPTS = int(os.getenv("ACTIVITY_FLUSH_MAX_ATTEMPTS", 5))
+
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+WriteRows = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+ReserveIds = Callable[[int], Awaitable[List[int]]]
+
+
+def _rejected(error: Exception) -> bool:
+    """Whether the database refused the rows themselves, so retrying them won't help"""
+    if isinstance(error, sqlite3.IntegrityError):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        # Auth, missing table and throttling are the deployment's problem, not the rows'
+        return 400 <= status < 500 and status not in (401, 403, 404, 408, 429)
+    # Postgres data exception / integrity constraint violation (supabase errors)
+    return str(getattr(error, "code", "") or "")[:2] in ("22", "23")
+
+
+class _SpillSegment:
+    """One append-only JSON-lines spill file, fsynced with group commit"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._written = 0
+        self._synced = 0
+        self._syncing: Optional[asyncio.Task] = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(row) + "\n" for row in rows))
+        self._file.flush()
+        self.rows += len(rows)
+        self._written += 1
+
+    async def sync(self):
+        """Return once everything written so far is on disk"""
+        target = self._written
+        while self._synced < target:
+            if self._syncing is None:
+                self._syncing = asyncio.create_task(self._fsync())
+            await asyncio.shield(self._syncing)
+
+    async def _fsync(self):
+        target = self._written
+        try:
+            await run_io(os.fsync, self._file.fileno())
+            self._synced = max(self._synced, target)
+        finally:
+            self._syncing = None
+
+    async def close(self):
+        await self.sync()
+        self._file.close()
+
+
+class ActivityWriteBuffer:
+    """
+    Hands out activity ids immediately and writes the rows behind
+
+    Rows are spilled to numbered segment files in spill_dir; each flush
+    closes the current segment and inserts the segments not yet written,
+    oldest first, deleting each once the database has it. The write must
+    skip ids that already exist, so a segment replayed after a crash
+    between insert and delete is harmless. Segments left over from a
+    previous run are replayed on start.
+
+    While the database is unreachable everything waits, in order. Rows it
+    rejects (constraint or data errors) are found by retrying the segment
+    row by row and moved to dead-letter.jsonl in spill_dir; a segment that
+    failed max_attempts flushes goes after the others, and its rows that
+    still fail while other writes succeed are dead-lettered too.
+    """
+
+    def __init__(self, flush_rows: int = ACTIVITY_FLUSH_ROWS, flush_seconds: float = ACTIVITY_FLUSH_SECONDS,
+                 id_block: int = ACTIVITY_ID_BLOCK, spill_dir: str = ACTIVITY_SPILL_DIR,
+                 fsync: bool = ACTIVITY_SPILL_FSYNC, max_attempts: int = ACTIVITY_FLUSH_MAX_ATTEMPTS):
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.id_block = id_block
+        self.spill_dir = spill_dir
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self._write: Optional[WriteRows] = None
+        self._reserve: Optional[ReserveIds] = None
+        self._ids: Deque[int] = deque()
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._segment: Optional[_SpillSegment] = None
+        self._next_segment = 0
+        self._pending: List[str] = []
+        self._pending_rows = 0
+        self._attempts: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._reserve_lock: Optional[asyncio.Lock] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    async def start(self, write: WriteRows, reserve: ReserveIds):
+        """
+        Start the flusher on the running event loop
+
+        write(rows) inserts activity rows that carry their own ids, ignoring
+        ids already present; reserve(n) returns n unused activity ids.
+        """
+        self._write, self._reserve = write, reserve
+        self._wake = asyncio.Event()
+        self._reserve_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        leftover = sorted((int(name.split("-")[1].split(".")[0]), name) for name in os.listdir(self.spill_dir)
+                          if name.startswith("activities-") and name.endswith(".jsonl"))
+        for _, name in leftover:
+            self._add_pending(os.path.join(self.spill_dir, name))
+        if leftover:
+            print(f"Replaying {self._pending_rows} buffered activities from {len(leftover)} spill file(s)")
+        self._next_segment = leftover[-1][0] + 1 if leftover else 0
+        self._open_segment()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is buffered; anything the database refuses stays spilled for the next start"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+        await self._segment.close()
+        if self._segment.rows == 0:
+            os.remove(self._segment.path)
+
+    async def add(self, row: Dict[str, Any]) -> int:
+        """Buffer one activity row; returns its id"""
+        return (await self.add_many([row]))[0]
+
+    async def add_many(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Buffer activity rows; returns their ids once they are spilled"""
+        if not rows:
+            return []
+        ids = await self._take_ids(len(rows))
+        rows = [{**row, "id": activity_id} for row, activity_id in zip(rows, ids)]
+        segment = self._segment
+        segment.write(rows)
+        if not self._rows:
+            self._oldest = time.monotonic()
+        self._rows.extend(rows)
+        self._report_depth()
+        if len(self._rows) >= self.flush_rows:
+            self._wake.set()
+        if self.fsync:
+            await segment.sync()
+        return ids
+
+    async def flush(self):
+        """Write everything buffered and every pending segment, oldest first"""
+        async with self._flush_lock:
+            # The segment closed here is written from memory, older ones are read back
+            fresh: Dict[str, List[Dict[str, Any]]] = {}
+            if self._rows:
+                metrics.observe("activity_buffer.flush_delay", time.monotonic() - self._oldest)
+                closed = self._segment
+                fresh[closed.path], self._rows = self._rows, []
+                self._open_segment()
+                await closed.close()
+                self._add_pending(closed.path, closed.rows)
+
+            # Segments that keep failing go last, so they can't hold up the
+            # others and whether the database takes writes at all is known
+            exhausted = [path for path in self._pending if self._attempts.get(path, 0) >= self.max_attempts]
+            writing = [path for path in self._pending if path not in exhausted] + exhausted
+            written_any = False
+            for path in writing:
+                batch = fresh.get(path) or self._read(path)
+                if path in exhausted:
+                    written_any |= await self._write_singly(path, batch, dead_letter_failed=written_any)
+                    continue
+                start = time.perf_counter()
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    metrics.incr("activity_buffer.flush_errors")
+                    self._attempts[path] = self._attempts.get(path, 0) + 1
+                    if not _rejected(e):
+                        print(f"Activity flush failed, will retry: {str(e)}")
+                        break
+                    print(f"Activity flush rejected, retrying {len(batch)} rows one by one: {str(e)}")
+                    written_any |= await self._write_singly(path, batch, dead_letter_failed=False)
+                    continue
+                written_any = True
+                metrics.observe("activity_buffer.flush_latency", time.perf_counter() - start)
+                metrics.observe("activity_buffer.rows_per_flush", len(batch))
+                metrics.incr("activity_buffer.rows_flushed", len(batch))
+                self._settle(path, len(batch), [])
+            self._report_depth()
+
+    async def _write_singly(self, path: str, rows: List[Dict[str, Any]], dead_letter_failed: bool) -> bool:
+        """
+        Write a segment's rows one at a time; rejected rows (and, with
+        dead_letter_failed, any failing row) go to the dead-letter file.
+        Returns whether any row was written.
+        """
+        kept, dead, written = [], [], 0
+        for i, row in enumerate(rows):
+            try:
+                await self._write([row])
+                written += 1
+            except Exception as e:
+                if _rejected(e) or dead_letter_failed:
+                    dead.append(row)
+                elif not written and not dead:
+                    # Nothing got through: the database looks unreachable, keep the rest
+                    kept.extend(rows[i:])
+                    break
+                else:
+                    kept.append(row)
+        metrics.incr("activity_buffer.rows_flushed", written)
+        if dead:
+            dead_letter = _SpillSegment(os.path.join(self.spill_dir, DEAD_LETTER_FILE))
+            dead_letter.write(dead)
+            await dead_letter.close()
+            metrics.incr("activity_buffer.dead_letter_rows", len(dead))
+            print(f"Moved {len(dead)} activities the database keeps refusing to {dead_letter.path}")
+        self._settle(path, len(rows), kept)
+        return written > 0
+
+    def _settle(self, path: str, rows: int, kept: List[Dict[str, Any]]):
+        """Drop a written segment, or shrink it to the rows still to be written"""
+        self._pending_rows -= rows - len(kept)
+        if kept:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row) + "\n" for row in kept))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            return
+        os.remove(path)
+        self._pending.remove(path)
+        self._attempts.pop(path, None)
+
+    async def _take_ids(self, count: int) -> List[int]:
+        async with self._reserve_lock:
+            while len(self._ids) < count:
+                self._ids.extend(await self._reserve(max(self.id_block, count - len(self._ids))))
+                metrics.incr("activity_buffer.id_blocks")
+            return [self._ids.popleft() for _ in range(count)]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Activity flush failed: {str(e)}")
+                metrics.incr("activity_buffer.flush_errors")
+
+    def _open_segment(self):
+        path = os.path.join(self.spill_dir, f"activities-{self._next_segment:08d}.jsonl")
+        self._next_segment += 1
+        self._segment = _SpillSegment(path)
+
+    def _add_pending(self, path: str, rows: Optional[int] = None):
+        self._pending.append(path)
+        self._pending_rows += rows if rows is not None else len(self._read(path))
+
+    def _read(self, path: str) -> List[Dict[str, Any]]:
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash was never acknowledged
+                    pass
+        return rows
+
+    def _report_depth(self):
+        metrics.set_gauge("activity_buffer.queue_depth", len(self._rows) + self._pending_rows)
+        metrics.set_gauge("activity_buffer.pending_segments", len(self._pending))
+        metrics.set_gauge("activity_buffer.stuck_segments",
+                          sum(attempts >= self.max_attempts for attempts in self._attempts.values()))
+
+
+# Global activity buffer, started by the API when ACTIVITY_WRITE_BEHIND=1
+activity_buffer = ActivityWriteBuffer()
@@ -0,0 +1,258 @@
+"""
+Async database module
+Non-blocking Supabase access straight over PostgREST, sharing one pooled
+keep-alive HTTP client; same methods as database.DatabaseClient, as coroutines
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from contact_cache import normalize_contact_part
+from database import activity_row, ingest_params, select_columns
+from storage import AsyncStorage
+
+load_dotenv()
+
+# Connection pool shared by every request. At most DB_POOL_MAX_CONNECTIONS
+# requests are in flight; the rest wait on a semaphore rather than in the
+# httpx pool, whose bookkeeping per request grows with its queue.
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", 20))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", DB_POOL_MAX_CONNECTIONS))
+DB_KEEPALIVE_SECONDS = float(os.getenv("DB_KEEPALIVE_SECONDS", 60))
+DB_TIMEOUT_SECONDS = float(os.getenv("DB_TIMEOUT_SECONDS", 10))
+DB_CONNECT_TIMEOUT_SECONDS = float(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", 5))
+# HTTP/2 multiplexes requests over one connection; needs the h2 package
+DB_HTTP2 = os.getenv("DB_HTTP2", "1") == "1"
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class AsyncDatabaseClient(AsyncStorage):
+    """
+    PostgREST client for the CRM tables
+
+    Talks to SUPABASE_URL/rest/v1 with SUPABASE_KEY, or to DB_REST_URL
+    (e.g. a local PostgREST at http://localhost:3000) when set. Pass a
+    transport to run against an in-process stand-in.
+    """
+
+    def __init__(self, rest_url: Optional[str] = None, key: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        url = os.getenv("SUPABASE_URL")
+        key = key if key is not None else os.getenv("SUPABASE_KEY")
+        self.rest_url = rest_url or os.getenv("DB_REST_URL")
+        if not self.rest_url:
+            if not url or not key:
+                raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in environment")
+            self.rest_url = f"{url.rstrip('/')}/rest/v1"
+
+        headers = {"Accept": "application/json"}
+        if key:
+            headers["apikey"] = key
+            headers["Authorization"] = f"Bearer {key}"
+
+        self.http2 = DB_HTTP2 and transport is None and _http2_available()
+        self.client = httpx.AsyncClient(
+            base_url=self.rest_url.rstrip("/"),
+            headers=headers,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=DB_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=DB_KEEPALIVE_SECONDS
+            ),
+            timeout=httpx.Timeout(DB_TIMEOUT_SECONDS, connect=DB_CONNECT_TIMEOUT_SECONDS),
+            transport=transport
+        )
+        self._slots = asyncio.Semaphore(DB_POOL_MAX_CONNECTIONS)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _request(self, method: str, table: str, **kwargs: Any) -> Any:
+        async with self._slots:
+            response = await self.client.request(method, f"/{table}", **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    async def _select(self, table: str, **params: Any) -> List[Dict[str, Any]]:
+        return await self._request("GET", table, params=params)
+
+    async def _page(self, table: str, select: str, limit: Optional[int],
+                    after: Optional[int]) -> List[Dict[str, Any]]:
+        """Newest first by id; after is the last id of the previous page (keyset)"""
+        params = {"select": select, "order": "id.desc"}
+        if after is not None:
+            params["id"] = f"lt.{after}"
+        if limit:
+            params["limit"] = limit
+        return await self._select(table, **params)
+
+    async def _insert(self, table: str, rows: Any) -> List[Dict[str, Any]]:
+        return await self._request("POST", table, json=rows, headers={"Prefer": "return=representation"})
+
+    # ==================== CONTACTS ====================
+
+    async def find_or_create_contact(self, name: str, company: Optional[str] = None,
+                                     email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Find existing contact or create new one, in one round trip (resolve_contact)"""
+        return await self._request("POST", "rpc/resolve_contact", json={
+            "p_name": name,
+            "p_company": company,
+            "p_email": email,
+            "p_phone": phone
+        })
+
+    async def find_contact(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        """Id of an existing contact with this name (and company, if given), or None"""
+        params = {"select": "id", "name_key": f"eq.{normalize_contact_part(name)}", "order": "id", "limit": 1}
+        if normalize_contact_part(company):
+            params["company_key"] = f"eq.{normalize_contact_part(company)}"
+        rows = await self._select("contacts", **params)
+        return rows[0]["id"] if rows else None
+
+    async def create_contact(self, name: str, company: Optional[str] = None,
+                             email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Insert a new contact and return its id"""
+        rows = await self._insert("contacts", {
+            "name": name,
+            "company": company,
+            "email": email,
+            "phone": phone,
+            "created_at": datetime.now().isoformat()
+        })
+        return rows[0]["id"]
+
+    async def find_or_create_contacts(self, contacts: List[Dict[str, Any]]) -> List[int]:
+        """Resolve many contacts in one round trip (resolve_contacts); ids in input order"""
+        if not contacts:
+            return []
+
+        rows = [{k: c.get(k) for k in ("name", "company", "email", "phone")} for c in contacts]
+        return await self._request("POST", "rpc/resolve_contacts", json={"p_contacts": rows})
+
+    async def get_all_contacts(self, limit: Optional[int] = None, after: Optional[int] = None,
+                               fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve contacts, newest first (all of them unless limit is given)"""
+        return await self._page("contacts", select_columns("contacts", fields, "*"), limit, after)
+
+    async def get_contact_by_id(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """Get specific contact by ID"""
+        rows = await self._select("contacts", select="*", id=f"eq.{contact_id}")
+        return rows[0] if rows else None
+
+    # ==================== DEALS ====================
+
+    async def create_deal(self, contact_id: int, deal_value: Optional[float] = None,
+                          stage: str = "initial", next_step: Optional[str] = None,
+                          follow_up_date: Optional[str] = None, notes: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new deal"""
+        rows = await self._insert("deals", {
+            "contact_id": contact_id,
+            "deal_value": deal_value,
+            "stage": stage,
+            "next_step": next_step,
+            "follow_up_date": follow_up_date,
+            "notes": notes,
+            "created_at": datetime.now().isoformat()
+        })
+        return rows[0]
+
+    async def create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create many deals with a single multi-row insert"""
+        if not deals:
+            return []
+
+        now = datetime.now().isoformat()
+        return await self._insert("deals", [{
+            "contact_id": deal["contact_id"],
+            "deal_value": deal.get("deal_value"),
+            "stage": deal.get("stage", "initial"),
+            "next_step": deal.get("next_step"),
+            "follow_up_date": deal.get("follow_up_date"),
+            "notes": deal.get("notes"),
+            "created_at": now
+        } for deal in deals])
+
+    async def get_all_deals(self, limit: Optional[int] = None, after: Optional[int] = None,
+                            fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve deals with contact information, newest first"""
+        return await self._page("deals", select_columns("deals", fields, "*,contacts(*)"), limit, after)
+
+    async def get_deals_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all deals for a specific contact"""
+        return await self._select("deals", select="*", contact_id=f"eq.{contact_id}")
+
+    async def execute_raw_query(self, query: str) -> List[Dict[str, Any]]:
+        """Execute raw SQL query (not supported over PostgREST; use RPC functions)"""
+        return []
+
+    # ==================== INGESTION ====================
+
+    async def ingest_crm_record(self, activity_type: str, transcript: str, summary: Optional[str] = None,
+                                contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                                deal: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[int]]:
+        """Save one ingested record in a single round trip and transaction (see DatabaseClient)"""
+        params = ingest_params(activity_type, transcript, summary, contact, contact_id, deal)
+        return await self._request("POST", "rpc/ingest_crm_record", json=params)
+
+    # ==================== ACTIVITIES ====================
+
+    async def create_activity(self, activity_type: str, transcript: str,
+                              summary: Optional[str] = None, contact_id: Optional[int] = None) -> Dict[str, Any]:
+        """Log an activity (email, call, meeting)"""
+        rows = await self._insert("activities", activity_row(activity_type, transcript, summary, contact_id))
+        return rows[0]
+
+    async def create_activities(self, activities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Log many activities with a single multi-row insert"""
+        if not activities:
+            return []
+
+        now = datetime.now().isoformat()
+        return await self._insert("activities", [{
+            "type": activity["activity_type"],
+            "transcript": activity["transcript"],
+            "summary": activity.get("summary"),
+            "contact_id": activity.get("contact_id"),
+            "timestamp": now
+        } for activity in activities])
+
+    async def reserve_activity_ids(self, count: int) -> List[int]:
+        """Reserve count ids from the activities sequence (for write-behind logging)"""
+        return await self._request("POST", "rpc/reserve_activity_ids", json={"p_count": count})
+
+    async def save_activity_rows(self, rows: List[Dict[str, Any]]):
+        """Insert activity rows that already carry their ids, skipping ids that exist"""
+        if rows:
+            await self._request("POST", "activities", params={"on_conflict": "id"}, json=rows,
+                                headers={"Prefer": "resolution=ignore-duplicates,return=minimal"})
+
+    async def get_all_activities(self, limit: Optional[int] = None, after: Optional[int] = None,
+                                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve activities, newest first; leave transcript out of fields for list views"""
+        return await self._page("activities", select_columns("activities", fields, "*,contacts(*)"), limit, after)
+
+    async def get_activities_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all activities for a specific contact"""
+        return await self._select("activities", select="*", contact_id=f"eq.{contact_id}")
+
+# Global async database instance, created on first use
+_async_db: Optional[AsyncDatabaseClient] = None
+_async_db_lock = threading.Lock()
+
+def get_async_db() -> AsyncDatabaseClient:
+    """Return the shared AsyncDatabaseClient (and its connection pool)"""
+    global _async_db
+    with _async_db_lock:
+        if _async_db is None:
+            _async_db = AsyncDatabaseClient()
+        return _async_db
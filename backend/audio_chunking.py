@@ -0,0 +1,129 @@
+"""
+Audio chunking module
+Decodes audio, finds silences with a simple energy-based voice activity
+detector, and splits/stitches long recordings for parallel transcription
+"""
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# VAD frame size and how quiet/long a gap must be to count as a split point
+FRAME_MS = 30
+MIN_SILENCE_SECONDS = 0.3
+# Frames quieter than this fraction of the loud-speech level are silence
+SILENCE_RATIO = 0.1
+# Absolute floor so digital silence / very quiet rooms still register
+SILENCE_FLOOR = 1e-3
+
+
+def load_audio(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable file to mono float32 samples in [-1, 1]"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def find_silences(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                  min_silence: float = MIN_SILENCE_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Return (start, end) seconds of silent stretches at least min_silence long
+    """
+    frame = int(sample_rate * FRAME_MS / 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return []
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    # Scale the threshold to the recording: 95th percentile ~ speech level
+    threshold = max(SILENCE_FLOOR, float(np.percentile(rms, 95)) * SILENCE_RATIO)
+    silent = rms < threshold
+
+    silences = []
+    min_frames = max(1, int(min_silence * 1000 / FRAME_MS))
+    run_start = None
+    for i, is_silent in enumerate(np.append(silent, False)):
+        if is_silent and run_start is None:
+            run_start = i
+        elif not is_silent and run_start is not None:
+            if i - run_start >= min_frames:
+                silences.append((run_start * FRAME_MS / 1000, i * FRAME_MS / 1000))
+            run_start = None
+    return silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]],
+                target_seconds: float, max_seconds: float) -> List[Tuple[float, float]]:
+    """
+    Choose chunk boundaries near every target_seconds, cutting in the middle
+    of a silence so no word is split. Falls back to a hard cut at
+    max_seconds only when a stretch has no silence at all.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    chunks = []
+    chunk_start = 0.0
+    while duration - chunk_start > max_seconds:
+        target = chunk_start + target_seconds
+        limit = chunk_start + max_seconds
+        # Silences that keep the chunk between half the target and the max
+        candidates = [m for m in midpoints if chunk_start + target_seconds / 2 <= m <= limit]
+        cut = min(candidates, key=lambda m: abs(m - target)) if candidates else limit
+        chunks.append((chunk_start, cut))
+        chunk_start = cut
+    chunks.append((chunk_start, duration))
+    return chunks
+
+
+def split_audio(samples: np.ndarray, target_seconds: float, max_seconds: float,
+                sample_rate: int = SAMPLE_RATE) -> List[Tuple[float, np.ndarray]]:
+    """
+    Split samples at silences into chunks of roughly target_seconds
+
+    Returns:
+        list of (offset_seconds, chunk_samples)
+    """
+    duration = len(samples) / sample_rate
+    if duration <= max_seconds:
+        return [(0.0, samples)]
+
+    bounds = plan_chunks(duration, find_silences(samples, sample_rate), target_seconds, max_seconds)
+    return [(start, samples[int(start * sample_rate):int(end * sample_rate)]) for start, end in bounds]
+
+
+def merge_transcripts(results: List[Dict[str, Any]], offsets: List[float]) -> Dict[str, Any]:
+    """
+    Stitch per-chunk transcriptions back into one, shifting segment
+    timestamps by each chunk's offset and renumbering segment ids
+    """
+    segments = []
+    texts = []
+    languages = []
+    for result, offset in zip(results, offsets):
+        for segment in result.get("segments", []):
+            segment = dict(segment)
+            segment["id"] = len(segments)
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(segment["end"] + offset, 3)
+            if "seek" in segment:
+                segment["seek"] += int(offset * 100)  # seek is in 10 ms frames
+            segments.append(segment)
+        text = result.get("text", "").strip()
+        if text:
+            texts.append(text)
+        languages.append(result.get("language", "unknown"))
+
+    known = [lang for lang in languages if lang != "unknown"]
+    return {
+        "text": " ".join(texts),
+        "language": max(set(known), key=known.count) if known else "unknown",
+        "segments": segments
+    }
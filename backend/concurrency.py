@@ -0,0 +1,37 @@
+"""
+Concurrency module
+Bounded executors for running blocking work off the event loop
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Network-bound work (LLM APIs, Supabase) spends most of its time waiting on
+# sockets, so a fairly wide thread pool is fine
+IO_WORKERS = int(os.getenv("IO_WORKERS", 32))
+
+# CPU-bound work (Whisper) should not oversubscribe the machine
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="crm-io")
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="crm-cpu")
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking network call on the I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking CPU-heavy call on the CPU pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = True):
+    """Stop accepting work and release pool threads"""
+    io_executor.shutdown(wait=wait)
+    cpu_executor.shutdown(wait=wait)
@@ -0,0 +1,96 @@
+"""
+Contact cache module
+Bounded LRU of resolved contact ids keyed like the contacts table's unique
+(name_key, company_key), so repeat mentions of a contact skip the database
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from metrics import metrics
+
+CONTACT_CACHE_SIZE = int(os.getenv("CONTACT_CACHE_SIZE", 10000))
+# Most recent contacts loaded into the cache at startup (0 disables)
+CONTACT_CACHE_WARM = int(os.getenv("CONTACT_CACHE_WARM", 1000))
+
+
+def normalize_contact_part(value: Optional[str]) -> str:
+    """Same normalization as the name_key/company_key columns in setup_database.sql"""
+    return re.sub(r"\s+", " ", (value or "").strip()).lower()
+
+
+def contact_key(name: str, company: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Cache key for a contact resolution
+
+    An empty company key stands for a name-only resolution, which (like
+    resolve_contact in the database) matches that name at any company.
+    """
+    return normalize_contact_part(name), normalize_contact_part(company)
+
+
+class ContactCache:
+    """
+    LRU map of contact_key(name, company) -> contact id
+
+    Contacts are never renamed or deleted by the app and the database key
+    is unique, so a cached id stays valid; every resolution that reaches
+    the database is written back with put().
+    """
+
+    def __init__(self, max_size: int = CONTACT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        key = contact_key(name, company)
+        with self._lock:
+            contact_id = self._entries.get(key)
+            if contact_id is not None:
+                self._entries.move_to_end(key)
+        metrics.incr("contact_cache.hits" if contact_id is not None else "contact_cache.misses")
+        return contact_id
+
+    def put(self, name: str, company: Optional[str], contact_id: Optional[int]):
+        if contact_id is None or self.max_size <= 0:
+            return
+        key = contact_key(name, company)
+        with self._lock:
+            self._entries[key] = contact_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def warm(self, contacts: Iterable[Dict[str, Any]]) -> int:
+        """
+        Load contacts (id, name, company rows, newest first) without
+        touching recency of entries already cached; returns how many were added
+
+        Company-less rows are skipped: a name-only resolution returns the
+        oldest contact with that name, which may have a company.
+        """
+        added = 0
+        with self._lock:
+            for row in contacts:
+                if len(self._entries) >= self.max_size:
+                    break
+                key = contact_key(row["name"], row.get("company"))
+                if key[1] and key not in self._entries:
+                    # Newest rows go in first, so they are evicted last
+                    self._entries[key] = row["id"]
+                    self._entries.move_to_end(key, last=False)
+                    added += 1
+        return added
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Global contact cache instance
+contact_cache = ContactCache()
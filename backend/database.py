@@ -3,14 +3,87 @@ Database module for Supabase integration
 Handles all CRM data operations
 """
 import os
+import threading
 from typing import Optional, Dict, List, Any
 from datetime import datetime
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from contact_cache import normalize_contact_part
+from storage import Storage
+
 load_dotenv()
 
-class DatabaseClient:
+# Columns the list endpoints may project with fields=; "contacts" embeds the linked contact
+LIST_COLUMNS = {
+    'contacts': ('id', 'name', 'company', 'email', 'phone', 'created_at'),
+    'deals': ('id', 'contact_id', 'deal_value', 'stage', 'next_step', 'follow_up_date',
+              'notes', 'created_at', 'contacts'),
+    'activities': ('id', 'type', 'transcript', 'summary', 'contact_id', 'timestamp', 'contacts'),
+}
+
+def list_fields(table: str, fields: List[str]) -> List[str]:
+    """
+    Columns for a list query projected to fields
+
+    fields must come from LIST_COLUMNS[table] (ValueError otherwise); id is
+    always included since it is the pagination cursor.
+    """
+    unknown = [f for f in fields if f not in LIST_COLUMNS[table]]
+    if unknown:
+        raise ValueError(f"Unknown {table} fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(['id'] + list(fields)))
+
+def select_columns(table: str, fields: Optional[List[str]], default: str) -> str:
+    """PostgREST select string for a list query (see list_fields)"""
+    if not fields:
+        return default
+    return ','.join('contacts(*)' if c == 'contacts' else c for c in list_fields(table, fields))
+
+def ingest_params(activity_type: str, transcript: str, summary: Optional[str] = None,
+                  contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                  deal: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Arguments of the ingest_crm_record database function (setup_database.sql)"""
+    contact = contact or {}
+    deal = deal or {}
+    return {
+        'p_activity_type': activity_type,
+        'p_transcript': transcript,
+        'p_summary': summary,
+        'p_contact_name': contact.get('name'),
+        'p_company': contact.get('company'),
+        'p_email': contact.get('email'),
+        'p_phone': contact.get('phone'),
+        'p_contact_id': contact_id,
+        'p_create_deal': bool(deal),
+        'p_deal_value': deal.get('deal_value'),
+        'p_next_step': deal.get('next_step'),
+        'p_follow_up_date': deal.get('follow_up_date'),
+        'p_notes': deal.get('notes')
+    }
+
+def missing_function(error: Exception) -> bool:
+    """
+    Whether a PostgREST error means an RPC function is not installed
+    (setup_database.sql not re-run); works for supabase and httpx errors
+    """
+    response = getattr(error, 'response', None)
+    text = response.text if response is not None else f"{getattr(error, 'code', '')} {error}"
+    return 'PGRST202' in text or 'Could not find the function' in text
+
+def activity_row(activity_type: str, transcript: str, summary: Optional[str] = None,
+                 contact_id: Optional[int] = None) -> Dict[str, Any]:
+    """An activities row as create_activity inserts it"""
+    return {
+        'type': activity_type,
+        'transcript': transcript,
+        'summary': summary,
+        'contact_id': contact_id,
+        'timestamp': datetime.now().isoformat()
+    }
+
+class DatabaseClient(Storage):
+    """Storage on Supabase, through the supabase client (blocking)"""
+    
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL")
         self.key = os.getenv("SUPABASE_KEY")
@@ -18,24 +91,39 @@ class DatabaseClient:
         if not self.url or not self.key:
             raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in environment")
         
-        self.client: Client = create_client(self.url, self.key)
+        from supabase import create_client
+        self.client = create_client(self.url, self.key)
     
     # ==================== CONTACTS ====================
     
     def find_or_create_contact(self, name: str, company: Optional[str] = None, 
                                email: Optional[str] = None, phone: Optional[str] = None) -> int:
-        """Find existing contact or create new one"""
-        # Try to find existing contact
-        query = self.client.table('contacts').select('*').eq('name', name)
-        if company:
-            query = query.eq('company', company)
+        """
+        Find existing contact or create new one, in one round trip and safe
+        under concurrent ingestion (the resolve_contact function)
+        """
+        return self.client.rpc('resolve_contact', {
+            'p_name': name,
+            'p_company': company,
+            'p_email': email,
+            'p_phone': phone
+        }).execute().data
+    
+    def find_contact(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        """Id of an existing contact with this name (and company, if given), or None"""
+        query = self.client.table('contacts').select('id').eq('name_key', normalize_contact_part(name))
+        if normalize_contact_part(company):
+            query = query.eq('company_key', normalize_contact_part(company))
         
-        result = query.execute()
+        result = query.order('id').limit(1).execute()
         
         if result.data and len(result.data) > 0:
             return result.data[0]['id']
-        
-        # Create new contact
+        return None
+    
+    def create_contact(self, name: str, company: Optional[str] = None,
+                       email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Insert a new contact and return its id"""
         contact_data = {
             'name': name,
             'company': company,
@@ -47,10 +135,36 @@ class DatabaseClient:
         result = self.client.table('contacts').insert(contact_data).execute()
         return result.data[0]['id']
     
-    def get_all_contacts(self) -> List[Dict[str, Any]]:
-        """Retrieve all contacts"""
-        result = self.client.table('contacts').select('*').order('created_at', desc=True).execute()
-        return result.data
+    def find_or_create_contacts(self, contacts: List[Dict[str, Any]]) -> List[int]:
+        """
+        Resolve many contacts in one round trip (the resolve_contacts function)
+        
+        Args:
+            contacts: dicts with name, company, email, phone
+        
+        Returns:
+            contact ids in the same order as the input
+        """
+        if not contacts:
+            return []
+        
+        rows = [{k: c.get(k) for k in ('name', 'company', 'email', 'phone')} for c in contacts]
+        return self.client.rpc('resolve_contacts', {'p_contacts': rows}).execute().data
+    
+    def _page(self, query, limit: Optional[int], after: Optional[int]) -> List[Dict[str, Any]]:
+        """Newest first by id; after is the last id of the previous page (keyset)"""
+        if after is not None:
+            query = query.lt('id', after)
+        query = query.order('id', desc=True)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+    
+    def get_all_contacts(self, limit: Optional[int] = None, after: Optional[int] = None,
+                         fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve contacts, newest first (all of them unless limit is given)"""
+        query = self.client.table('contacts').select(select_columns('contacts', fields, '*'))
+        return self._page(query, limit, after)
     
     def get_contact_by_id(self, contact_id: int) -> Optional[Dict[str, Any]]:
         """Get specific contact by ID"""
@@ -76,11 +190,36 @@ class DatabaseClient:
         result = self.client.table('deals').insert(deal_data).execute()
         return result.data[0]
     
-    def get_all_deals(self) -> List[Dict[str, Any]]:
-        """Retrieve all deals with contact information"""
-        result = self.client.table('deals').select('*, contacts(*)').order('created_at', desc=True).execute()
+    def create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create many deals with a single multi-row insert
+        
+        Args:
+            deals: dicts with the same keys as create_deal's arguments
+        """
+        if not deals:
+            return []
+        
+        now = datetime.now().isoformat()
+        rows = [{
+            'contact_id': deal['contact_id'],
+            'deal_value': deal.get('deal_value'),
+            'stage': deal.get('stage', 'initial'),
+            'next_step': deal.get('next_step'),
+            'follow_up_date': deal.get('follow_up_date'),
+            'notes': deal.get('notes'),
+            'created_at': now
+        } for deal in deals]
+        
+        result = self.client.table('deals').insert(rows).execute()
         return result.data
     
+    def get_all_deals(self, limit: Optional[int] = None, after: Optional[int] = None,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve deals with contact information, newest first"""
+        query = self.client.table('deals').select(select_columns('deals', fields, '*, contacts(*)'))
+        return self._page(query, limit, after)
+    
     def get_deals_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
         """Get all deals for a specific contact"""
         result = self.client.table('deals').select('*').eq('contact_id', contact_id).execute()
@@ -92,31 +231,95 @@ class DatabaseClient:
         # This is a simplified version - in production, use RPC functions
         return []
     
+    # ==================== INGESTION ====================
+    
+    def ingest_crm_record(self, activity_type: str, transcript: str, summary: Optional[str] = None,
+                          contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                          deal: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[int]]:
+        """
+        Save one ingested record in a single round trip and transaction
+        (the ingest_crm_record function in setup_database.sql)
+        
+        Args:
+            contact: name, company, email, phone to find or create; skipped when contact_id is given
+            contact_id: an already resolved contact
+            deal: deal_value, next_step, follow_up_date, notes, or None for no deal
+        
+        Returns:
+            dict with contact_id, activity_id and deal_id
+        """
+        params = ingest_params(activity_type, transcript, summary, contact, contact_id, deal)
+        return self.client.rpc('ingest_crm_record', params).execute().data
+    
     # ==================== ACTIVITIES ====================
     
     def create_activity(self, activity_type: str, transcript: str, 
                         summary: Optional[str] = None, contact_id: Optional[int] = None) -> Dict[str, Any]:
         """Log an activity (email, call, meeting)"""
-        activity_data = {
-            'type': activity_type,
-            'transcript': transcript,
-            'summary': summary,
-            'contact_id': contact_id,
-            'timestamp': datetime.now().isoformat()
-        }
+        activity_data = activity_row(activity_type, transcript, summary, contact_id)
         
         result = self.client.table('activities').insert(activity_data).execute()
         return result.data[0]
     
-    def get_all_activities(self) -> List[Dict[str, Any]]:
-        """Retrieve all activities"""
-        result = self.client.table('activities').select('*, contacts(*)').order('timestamp', desc=True).execute()
+    def create_activities(self, activities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Log many activities with a single multi-row insert
+        
+        Args:
+            activities: dicts with the same keys as create_activity's arguments
+        """
+        if not activities:
+            return []
+        
+        now = datetime.now().isoformat()
+        rows = [{
+            'type': activity['activity_type'],
+            'transcript': activity['transcript'],
+            'summary': activity.get('summary'),
+            'contact_id': activity.get('contact_id'),
+            'timestamp': now
+        } for activity in activities]
+        
+        result = self.client.table('activities').insert(rows).execute()
         return result.data
     
+    def reserve_activity_ids(self, count: int) -> List[int]:
+        """Reserve count ids from the activities sequence (for write-behind logging)"""
+        return self.client.rpc('reserve_activity_ids', {'p_count': count}).execute().data
+    
+    def save_activity_rows(self, rows: List[Dict[str, Any]]):
+        """
+        Insert activity rows that already carry their ids, skipping ids that
+        exist, so replaying a write-behind batch is harmless
+        """
+        if rows:
+            self.client.table('activities').upsert(rows, ignore_duplicates=True).execute()
+    
+    def get_all_activities(self, limit: Optional[int] = None, after: Optional[int] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve activities, newest first; leave transcript out of fields for list views"""
+        query = self.client.table('activities').select(select_columns('activities', fields, '*, contacts(*)'))
+        return self._page(query, limit, after)
+    
     def get_activities_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
         """Get all activities for a specific contact"""
         result = self.client.table('activities').select('*').eq('contact_id', contact_id).execute()
         return result.data
 
-# Global database instance
-db = DatabaseClient()
+# Global database instance, created on first use
+_db: Optional[DatabaseClient] = None
+_db_lock = threading.Lock()
+
+def get_db() -> DatabaseClient:
+    """Return the shared DatabaseClient, connecting on first call"""
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = DatabaseClient()
+        return _db
+
+def __getattr__(name: str):
+    # Keeps `from database import db` working
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,13 @@ import re
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+# Words that make a dollar amount in the same sentence a deal value
+DEAL_CONTEXT = re.compile(
+    r'\b(budget|pric(?:e|es|ing)|cost|quote|proposal|contract|deal|plan|licen[cs]e|subscription|'
+    r'renewal|purchase|order|spend|invest(?:ment)?|annual(?:ly)?|per (?:year|month|seat|user)|/(?:yr|year|mo|month))\b',
+    re.IGNORECASE
+)
+
 
 class EmailParser:
     """Simple email parser for extracting structured data from email text"""
@@ -106,32 +113,91 @@ class EmailParser:
     @staticmethod
     def extract_currency_amounts(text: str) -> list:
         """Extract dollar amounts from text"""
-        # Matches: $5,000 or $5000 or 5k or 5K
-        patterns = [
-            r'\$\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',  # $5,000.00
-            r'(\d+)\s*k\b',  # 5k (thousands)
-            r'\$\s*(\d+)',  # $5000
-        ]
+        # Matches: $5,000 or $5000 or $5,000.00 or $5K or 5k or $1.2M
+        pattern = re.compile(
+            r'\$\s*(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*([km])?\b'  # $5,000.00 / $5K
+            r'|\b(\d+(?:\.\d+)?)\s*(k)\b',  # 5k (thousands)
+            re.IGNORECASE
+        )
+        multipliers = {"k": 1000, "m": 1000000}
         
         amounts = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                # Convert to float
-                if isinstance(match, str):
-                    # Remove commas
-                    clean = match.replace(',', '')
-                    try:
-                        value = float(clean)
-                        # If it's a 'k' notation, multiply by 1000
-                        if 'k' in text[text.find(clean):text.find(clean)+len(clean)+2].lower():
-                            value *= 1000
-                        amounts.append(value)
-                    except ValueError:
-                        pass
+        for match in pattern.finditer(text):
+            number = match.group(1) or match.group(3)
+            suffix = (match.group(2) or match.group(4) or "").lower()
+            try:
+                value = float(number.replace(',', ''))
+            except ValueError:
+                continue
+            amounts.append(value * multipliers.get(suffix, 1))
         
         return amounts
     
+    @staticmethod
+    def extract_deal_amounts(text: str) -> list:
+        """
+        Dollar amounts in sentences that talk about a deal (budget, pricing,
+        contract, plan, ...), so "$5 meeting" or "$4 coffee" don't count
+        """
+        amounts = []
+        for sentence in re.split(r'(?<=[.!?])\s+|\n', text):
+            if DEAL_CONTEXT.search(sentence):
+                amounts.extend(EmailParser.extract_currency_amounts(sentence))
+        return amounts
+    
+    @staticmethod
+    def pre_extract(email_text: str, parsed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Rule-based extraction of the CRM fields that can be resolved with
+        high confidence, so the LLM only has to be asked for the rest
+        
+        Only unambiguous values are returned: an email address, phone number
+        or dollar amount when the body mentions exactly one. The sender in
+        the headers is not used: it may be a rep forwarding or writing to
+        the customer, so it is only a fallback when the LLM finds no contact.
+        
+        Returns:
+            Dictionary with a subset of email, phone, deal_value
+        """
+        parsed = parsed or EmailParser.parse_email(email_text)
+        body = parsed.get("body") or email_text
+        resolved = {}
+        
+        # An address other than the sender's and recipient's (e.g. in a forwarded message)
+        addresses = {a.lower() for a in EmailParser.extract_email_addresses(body)}
+        for header in ("from_email", "to_email", "from_name"):
+            addresses.discard((parsed.get(header) or "").strip().strip('"\'<>').lower())
+        if len(addresses) == 1:
+            resolved["email"] = addresses.pop()
+        
+        # Patterns overlap, so "+1 555-123-4567" also matches as "555-123-4567";
+        # drop numbers whose digits are a suffix of a longer match
+        phones = {}
+        for phone in EmailParser.extract_phone_numbers(body):
+            phones.setdefault(re.sub(r'\D', '', phone), phone)
+        distinct = [d for d in phones if not any(o != d and o.endswith(d) for o in phones)]
+        if len(distinct) == 1:
+            resolved["phone"] = phones[distinct[0]].strip()
+        
+        amounts = set(EmailParser.extract_deal_amounts(body))
+        if len(amounts) == 1:
+            resolved["deal_value"] = amounts.pop()
+        
+        return resolved
+    
+    @staticmethod
+    def quick_summary(parsed: Dict[str, Any], max_words: int = 50) -> str:
+        """Summary built from the subject and opening of the body, without an LLM"""
+        body = parsed.get("body") or ""
+        # Skip greetings like "Hi there," before taking the opening sentences
+        lines = [l for l in body.split('\n') if l.strip() and not re.match(r'^(hi|hello|hey|dear)\b.{0,30}$', l.strip(), re.IGNORECASE)]
+        words = ' '.join(lines).split()
+        subject = parsed.get("subject")
+        if subject:
+            words = [f"{subject}:"] + words
+        summary = ' '.join(words[:max_words])
+        return summary + "..." if len(words) > max_words else summary
+    
     @staticmethod
     def create_sample_emails() -> list:
         """
@@ -228,3 +294,5 @@ John"""
     print("\nExtracted emails:", email_parser.extract_email_addresses(sample))
     print("Extracted phones:", email_parser.extract_phone_numbers(sample))
     print("Extracted amounts:", email_parser.extract_currency_amounts(sample))
+    print("Pre-extracted:", email_parser.pre_extract(sample, parsed))
+    print("Quick summary:", email_parser.quick_summary(parsed))
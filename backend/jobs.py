@@ -0,0 +1,184 @@
+"""
+Background job module
+In-process job queue with a worker pool, stage progress and event streams
+"""
+import os
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 3600))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+class Job:
+    """A unit of background work and its progress history"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.events: List[Dict[str, Any]] = []
+        # Cleanup for a job dropped before its handler runs (e.g. temp files)
+        self.on_cancel: Optional[Callable[[], Any]] = None
+        self._changed = asyncio.Event()
+        self._record("queued")
+
+    def _record(self, event_type: str):
+        """Append a snapshot event and wake any listeners"""
+        self.updated_at = time.time()
+        self.events.append({"event": event_type, "data": self.to_dict()})
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def update(self, stage: str, progress: float):
+        """Report that the job entered a new stage"""
+        self.status = "running"
+        self.stage = stage
+        self.progress = progress
+        self._record("progress")
+
+    def complete(self, result: Dict[str, Any]):
+        self.status = "completed"
+        self.stage = "completed"
+        self.progress = 1.0
+        self.result = result
+        self._record("completed")
+
+    def fail(self, error: str):
+        self.status = "failed"
+        self.error = error
+        self._record("failed")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+JobHandler = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    """Bounded queue of jobs served by a fixed number of worker tasks"""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE,
+                 ttl_seconds: int = JOB_TTL_SECONDS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl_seconds = ttl_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start worker tasks on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        """Cancel worker tasks; queued jobs are marked failed and their on_cancel run"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            if not job.finished:
+                job.fail("Server shutting down")
+            if job.on_cancel:
+                try:
+                    job.on_cancel()
+                except Exception as e:
+                    print(f"Cleanup for job {job.id} failed: {str(e)}")
+                job.on_cancel = None
+
+    def submit(self, kind: str, handler: JobHandler, *args,
+               on_cancel: Optional[Callable[[], Any]] = None, **kwargs) -> Job:
+        """
+        Queue a job; handler is awaited as handler(job, *args, **kwargs)
+
+        on_cancel is called instead if the job is dropped before a worker
+        picks it up (server shutdown). Raises QueueFullError when the queue
+        is at capacity
+        """
+        if self._queue is None:
+            raise RuntimeError("JobManager not started")
+        self._evict_expired()
+
+        job = Job(kind)
+        job.on_cancel = on_cancel
+        try:
+            self._queue.put_nowait((job, handler, args, kwargs))
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full, try again later")
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def stream(self, job_id: str) -> AsyncIterator[str]:
+        """Yield server-sent events for a job until it finishes"""
+        job = self.jobs[job_id]
+        sent = 0
+        while True:
+            changed = job._changed
+            for event in job.events[sent:]:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            sent = len(job.events)
+            if job.finished:
+                return
+            await changed.wait()
+
+    def _evict_expired(self):
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job, handler, args, kwargs = await self._queue.get()
+            # The handler cleans up after itself from here on
+            job.on_cancel = None
+            try:
+                result = await handler(job, *args, **kwargs)
+                job.complete(result)
+            except Exception as e:
+                print(f"Job {job.id} failed: {str(e)}")
+                job.fail(str(e))
+            finally:
+                self._queue.task_done()
+
+
+# Global job manager
+job_manager = JobManager()
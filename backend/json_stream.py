@@ -0,0 +1,136 @@
+"""
+JSON stream module
+Tolerant JSON extraction from completions, and an incremental parser that
+emits top-level fields of a streamed JSON object as soon as each is complete
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+def parse_json_text(content: str) -> Any:
+    """
+    Parse the first JSON object/array in a completion, ignoring markdown
+    fences or prose around it
+    """
+    starts = [i for i in (content.find("{"), content.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object found in response")
+    value, _ = json.JSONDecoder().raw_decode(content, min(starts))
+    return value
+
+
+class IncrementalJSONParser:
+    """
+    Feed it the text of a JSON object chunk by chunk; feed() returns the
+    (key, value) pairs of top-level fields completed by that chunk
+
+    Text before the opening brace (e.g. a ```json fence) is skipped. On
+    malformed input the parser stops emitting and sets failed; callers
+    should still parse the full text at the end.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.failed = False
+        self.done = False
+        self._state = "start"  # start | key_start | key | colon | value_start | value | after_value
+        self._buffer: List[str] = []
+        self._key = None
+        self._kind = None  # string | container | scalar
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        emitted: List[Tuple[str, Any]] = []
+        if self.failed or self.done:
+            return emitted
+        try:
+            for ch in chunk:
+                self._step(ch, emitted)
+                if self.done:
+                    break
+        except ValueError:
+            self.failed = True
+        return emitted
+
+    def _string_char(self, ch: str) -> bool:
+        """Track escapes inside a string; returns True when ch closes it"""
+        if self._escape:
+            self._escape = False
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            return True
+        return False
+
+    def _emit(self, emitted: List[Tuple[str, Any]]):
+        value = json.loads("".join(self._buffer))
+        self.fields[self._key] = value
+        emitted.append((self._key, value))
+        self._state = "after_value"
+
+    def _step(self, ch: str, emitted: List[Tuple[str, Any]]):
+        state = self._state
+        if state == "start":
+            if ch == "{":
+                self._state = "key_start"
+        elif state == "key_start":
+            if ch == '"':
+                self._buffer, self._in_string = ['"'], True
+                self._state = "key"
+            elif ch == "}":
+                self.done = True
+            elif ch not in _WHITESPACE:
+                raise ValueError(f"Expected a key, got {ch!r}")
+        elif state == "key":
+            self._buffer.append(ch)
+            if self._string_char(ch):
+                self._key = json.loads("".join(self._buffer))
+                self._state = "colon"
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value_start"
+            elif ch not in _WHITESPACE:
+                raise ValueError(f"Expected ':', got {ch!r}")
+        elif state == "value_start":
+            if ch in _WHITESPACE:
+                return
+            self._buffer = [ch]
+            self._state = "value"
+            if ch == '"':
+                self._kind, self._in_string = "string", True
+            elif ch in "{[":
+                self._kind, self._depth = "container", 1
+            else:
+                self._kind = "scalar"
+        elif state == "value":
+            if self._kind == "scalar":
+                if ch in ",}" or ch in _WHITESPACE:
+                    self._emit(emitted)
+                    self._step(ch, emitted)
+                else:
+                    self._buffer.append(ch)
+                return
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._string_char(ch) and self._kind == "string":
+                    self._emit(emitted)
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(emitted)
+        elif state == "after_value":
+            if ch == ",":
+                self._state = "key_start"
+            elif ch == "}":
+                self.done = True
+            elif ch not in _WHITESPACE:
+                raise ValueError(f"Expected ',' or '}}', got {ch!r}")
@@ -0,0 +1,164 @@
+"""
+LLM result cache module
+Content-addressed cache for extraction and summary results, with an
+in-memory LRU tier in front of a persistent SQLite tier
+"""
+import os
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+from metrics import metrics
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", 1024))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.db"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 100000))
+
+# Run disk eviction every N writes rather than on every write
+_EVICT_EVERY = 100
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache key"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(kind: str, text: str, prompt_version: str, provider: str, model: str, **params: Any) -> str:
+    """
+    Cache key: hash of the normalized text, prompt version, provider, model
+    and any extra prompt parameters (e.g. max_words)
+    """
+    payload = json.dumps({
+        "kind": kind,
+        "text": normalize_text(text),
+        "prompt_version": prompt_version,
+        "provider": provider,
+        "model": model,
+        "params": params
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache of JSON-serializable LLM results
+
+    Values are stored as JSON so callers always get a fresh copy they can
+    modify. The disk tier expires entries after ttl_seconds and keeps at
+    most max_entries, dropping the least recently used first.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        """Open the SQLite tier on first use"""
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                metrics.incr("llm_cache.memory_hits")
+                return json.loads(entry[0])
+
+            try:
+                row = self._db().execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] + self.ttl_seconds > now:
+                    self._db().execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[0], row[1] + self.ttl_seconds)
+                    metrics.incr("llm_cache.disk_hits")
+                    return json.loads(row[0])
+            except sqlite3.Error as e:
+                print(f"LLM cache read failed: {str(e)}")
+                metrics.incr("llm_cache.errors")
+
+        metrics.incr("llm_cache.misses")
+        return None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        now = time.time()
+        serialized = json.dumps(value)
+        with self._lock:
+            self._remember(key, serialized, now + self.ttl_seconds)
+            try:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, serialized, now, now)
+                )
+                self._writes += 1
+                if self._writes % _EVICT_EVERY == 0:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                print(f"LLM cache write failed: {str(e)}")
+                metrics.incr("llm_cache.errors")
+        metrics.incr("llm_cache.sets")
+
+    def _remember(self, key: str, serialized: str, expires_at: float):
+        """Put an entry in the memory tier, evicting the least recently used"""
+        self._memory[key] = (serialized, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            metrics.incr("llm_cache.memory_evictions")
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used beyond max_entries"""
+        conn = self._db()
+        expired = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = conn.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        metrics.incr("llm_cache.disk_evictions", expired + overflow)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db().execute("DELETE FROM llm_cache")
+
+
+# Global LLM cache
+llm_cache = LLMCache()
@@ -3,40 +3,266 @@ LLM extraction module
 Uses Claude/Gemini/GPT to extract structured CRM data from text
 """
 import os
-import json
-from typing import Dict, Any, Optional
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from json_stream import IncrementalJSONParser, parse_json_text
+from llm_cache import llm_cache, make_key
+from llm_providers import create_provider
+from llm_router import LLMRouter, get_llm_router
+from metrics import metrics
+from singleflight import SingleFlight
+from text_chunking import estimate_tokens, split_text, merge_crm_data
+
 load_dotenv()
 
+# combined | parallel | sequential
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "combined").lower()
+
+# Ask providers for schema-constrained JSON (tool use / JSON mode) and stream
+# it, so fields can be acted on before the completion finishes
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") == "1"
+
+# CRM fields and their descriptions, shared by the extraction prompts
+CRM_FIELDS = {
+    "contact_name": "(string): Person's name",
+    "company": "(string): Company name",
+    "email": "(string): Email address if mentioned",
+    "phone": "(string): Phone number if mentioned",
+    "deal_value": "(number): Dollar amount of deal (just the number, no $ or commas)",
+    "next_step": "(string): What needs to happen next",
+    "follow_up_date": "(string): Date in YYYY-MM-DD format",
+    "notes": "(string): Any additional relevant information"
+}
+
+def _fields_prompt(fields: List[str]) -> str:
+    return "\n".join(f"- {name} {CRM_FIELDS[name]}" for name in fields)
+
+CRM_FIELDS_PROMPT = _fields_prompt(list(CRM_FIELDS))
+
+def _json_schema(fields: List[str], summary_words: Optional[int] = None) -> Dict[str, Any]:
+    """JSON schema for the given CRM fields (all nullable), plus summary if summary_words"""
+    properties = {}
+    for name in fields:
+        kind, description = CRM_FIELDS[name].split(": ", 1)
+        properties[name] = {"type": [kind.strip("()"), "null"], "description": description}
+    if summary_words:
+        properties["summary"] = {"type": "string", "description": f"Summary of the conversation in {summary_words} words or less"}
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+# Fields that must be resolved before the rule-based fast path may skip the
+# LLM entirely. By default that is every CRM field, which the rules never
+# resolve (company, next_step, ...), so they only shrink the prompt; list
+# fewer (e.g. contact_name,email,deal_value) to trade quality for calls
+REQUIRED_FIELDS = [f.strip() for f in os.getenv("EXTRACTION_REQUIRED_FIELDS", ",".join(CRM_FIELDS)).split(",") if f.strip()]
+
+# Key in crm_data listing what fell back (extraction, summary, ...) when an
+# LLM call failed; save_crm_record pops it and reports it as "degraded"
+DEGRADED_KEY = "_degraded"
+
+def mark_degraded(crm_data: Dict[str, Any], part: str):
+    """Record that part of this result is a fallback rather than LLM output"""
+    parts = crm_data.setdefault(DEGRADED_KEY, [])
+    if part not in parts:
+        parts.append(part)
+
+# Inputs longer than this (estimated tokens) are split and extracted per chunk
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", 8000))
+
+# Multi-document prompts: documents up to LLM_BATCH_ITEM_TOKENS are packed,
+# up to LLM_BATCH_MAX_ITEMS per request and LLM_BATCH_TOKENS of prompt
+LLM_BATCH_ITEM_TOKENS = int(os.getenv("LLM_BATCH_ITEM_TOKENS", 500))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", 20))
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS", 4000))
+# Completion budget per packed document (fields + summary) and per request
+BATCH_OUTPUT_TOKENS_PER_ITEM = 200
+BATCH_MAX_OUTPUT_TOKENS = 4096
+
+# ==================== Prompt templates ====================
+# Each prompt is a static system prefix (instructions and field list, the
+# same for every request) and a user message holding only the input, so
+# providers can cache the prefix across requests.
+
+EXTRACTION_SYSTEM = """You are an AI CRM assistant. Extract structured data from the text the user sends.
+
+Return ONLY a valid JSON object with these keys (use null for missing values):
+{fields}
+
+Return ONLY the JSON object, no other text."""
+
+SUMMARY_SYSTEM = "Summarize the conversation the user sends in {max_words} words or less."
+
+COMBINED_SYSTEM = """You are an AI CRM assistant. Extract structured data from the text the user sends and summarize it.
+
+Return ONLY a valid JSON object with these keys (use null for missing values):
+{fields}
+- summary (string): Summary of the conversation in {max_words} words or less
+
+Return ONLY the JSON object, no other text."""
+
+TEXT_PROMPT = 'Text to analyze:\n"{text}"'
+
+BATCH_SYSTEM = """You are an AI CRM assistant. Extract structured data from each of the documents the user sends and summarize each one.
+
+Return ONLY a valid JSON array with one object per document. Each object has these keys (use null for missing values):
+- id (string): The id of the document it describes
+{fields}
+- summary (string): Summary of the document in {max_words} words or less
+
+Return ONLY the JSON array, no other text."""
+
+BATCH_PROMPT = "Documents:\n{documents}"
+
+BATCH_DOCUMENT = '<document id="{id}">\n{text}\n</document>'
+
+def _prompt_tokens(system: str, prompt: str) -> int:
+    return estimate_tokens(system) + estimate_tokens(prompt)
+
+def _prompt_version(*templates: str) -> str:
+    """Short hash of the templates; editing a prompt changes its cache keys"""
+    return hashlib.sha256("\x00".join(templates).encode("utf-8")).hexdigest()[:12]
+
+PROMPT_VERSIONS = {
+    "extract": _prompt_version(EXTRACTION_SYSTEM, TEXT_PROMPT, CRM_FIELDS_PROMPT),
+    "summary": _prompt_version(SUMMARY_SYSTEM, TEXT_PROMPT),
+    "combined": _prompt_version(COMBINED_SYSTEM, TEXT_PROMPT, CRM_FIELDS_PROMPT),
+    "batch": _prompt_version(BATCH_SYSTEM, BATCH_PROMPT, BATCH_DOCUMENT, CRM_FIELDS_PROMPT)
+}
+
+# Concurrent extract_all calls for the same text share one LLM round-trip
+_inflight = SingleFlight("llm_extract")
+
+# Used for the parallel extraction + summary fallback
+_parallel_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_PARALLEL_WORKERS", 16)),
+    thread_name_prefix="llm-parallel"
+)
+
+# Runs per-chunk extraction for long inputs; separate from _parallel_executor
+# because each chunk may itself submit to it in parallel mode
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_CHUNK_WORKERS", 8)),
+    thread_name_prefix="llm-chunk"
+)
+
+# Runs extract_batch documents that go through extract_all on their own;
+# those wait on _chunk_executor and _parallel_executor, so they must not
+# occupy either pool's workers
+_single_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_CHUNK_WORKERS", 8)),
+    thread_name_prefix="llm-single"
+)
+
 class LLMExtractor:
-    def __init__(self, provider: str = "anthropic"):
+    def __init__(self, provider: Optional[str] = None, router: Optional[LLMRouter] = None):
         """
         Initialize LLM client
         Supports: anthropic, openai, google
+        
+        By default completions go through the shared router across every
+        configured provider; pass provider to pin a single one.
         """
-        self.provider = provider.lower()
-        
-        if self.provider == "anthropic":
-            import anthropic
-            self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-            self.model = "claude-3-5-sonnet-20241022"
-        elif self.provider == "openai":
-            import openai
-            self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            self.model = "gpt-4-turbo-preview"
-        elif self.provider == "google":
-            import google.generativeai as genai
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-            self.client = genai.GenerativeModel('gemini-pro')
-            self.model = "gemini-pro"
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+        if router is None:
+            router = LLMRouter([create_provider(provider)]) if provider else get_llm_router()
+        self.router = router
+        self.provider = router.name
+        self.model = router.model
+    
+    def _complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0, **options: Any) -> str:
+        """Send a single prompt through the router and return the raw text (options: system, schema, on_delta)"""
+        return self.router.complete(prompt, max_tokens=max_tokens, temperature=temperature, **options)
+    
+    def _cache_key(self, kind: str, text: str, **params: Any) -> str:
+        return make_key(kind, text, PROMPT_VERSIONS[kind], self.provider, self.model, **params)
+    
+    @staticmethod
+    def _parse_json(content: str) -> Any:
+        """Parse a JSON completion, ignoring markdown code blocks or text around it"""
+        return parse_json_text(content)
+    
+    def _complete_json(self, system: str, prompt: str, schema: Dict[str, Any], max_tokens: int = 1024,
+                       on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Complete a prompt asking for a JSON object matching schema
+        
+        With LLM_STRUCTURED_OUTPUT the response is streamed and each top-level
+        field is passed to on_field(name, value) as soon as it is complete.
+        If the full response does not parse (e.g. cut off at max_tokens), the
+        fields completed before the error are kept, the rest set to None and
+        the result marked degraded (callers don't cache it).
+        """
+        if not LLM_STRUCTURED_OUTPUT:
+            data = self._parse_json(self._complete(prompt, max_tokens=max_tokens, temperature=0, system=system))
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
+            return data
+        
+        parser = IncrementalJSONParser()
+        start = time.perf_counter()
+        
+        def on_delta(delta: str):
+            for name, value in parser.feed(delta):
+                if len(parser.fields) == 1:
+                    metrics.observe("llm_structured.time_to_first_field", time.perf_counter() - start)
+                if on_field:
+                    try:
+                        on_field(name, value)
+                    except Exception as e:
+                        print(f"Field callback failed for '{name}': {str(e)}")
+        
+        content = self._complete(prompt, max_tokens=max_tokens, temperature=0, system=system,
+                                 schema=schema, on_delta=on_delta)
+        metrics.incr("llm_structured.responses")
+        metrics.observe("llm_structured.latency", time.perf_counter() - start)
+        try:
+            data = self._parse_json(content)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+        
+        metrics.incr("llm_structured.parse_failures")
+        salvage = IncrementalJSONParser()
+        salvage.feed(content)
+        if not salvage.fields:
+            raise ValueError("Structured response could not be parsed")
+        metrics.incr("llm_structured.salvaged")
+        metrics.incr("llm.degraded.extraction")
+        print(f"Malformed structured response, kept {len(salvage.fields)} complete fields")
+        data = {name: salvage.fields.get(name) for name in schema["properties"]}
+        mark_degraded(data, "extraction")
+        return data
+    
+    @staticmethod
+    def _empty_crm_data(text: str) -> Dict[str, Any]:
+        """Empty structure returned when extraction fails"""
+        return {
+            "contact_name": None,
+            "company": None,
+            "email": None,
+            "phone": None,
+            "deal_value": None,
+            "next_step": None,
+            "follow_up_date": None,
+            "notes": text
+        }
+    
+    @staticmethod
+    def _fallback_summary(text: str) -> str:
+        """Truncated text used when summarization fails"""
+        return text[:100] + "..." if len(text) > 100 else text
     
-    def extract_crm_data(self, text: str) -> Dict[str, Any]:
+    def extract_crm_data(self, text: str, on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
         """
         Extract structured CRM data from text
         
+        on_field(name, value) is called as each field streams in (not on
+        cache hits).
+        
         Returns:
             {
                 "contact_name": str,
@@ -49,105 +275,388 @@ class LLMExtractor:
                 "notes": str (optional)
             }
         """
-        prompt = f"""You are an AI CRM assistant. Extract structured data from the following text.
-
-Return ONLY a valid JSON object with these keys (use null for missing values):
-- contact_name (string): Person's name
-- company (string): Company name
-- email (string): Email address if mentioned
-- phone (string): Phone number if mentioned
-- deal_value (number): Dollar amount of deal (just the number, no $ or commas)
-- next_step (string): What needs to happen next
-- follow_up_date (string): Date in YYYY-MM-DD format
-- notes (string): Any additional relevant information
-
-Text to analyze:
-"{text}"
-
-Return ONLY the JSON object, no other text."""
+        key = self._cache_key("extract", text)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        system = EXTRACTION_SYSTEM.format(fields=CRM_FIELDS_PROMPT)
+        prompt = TEXT_PROMPT.format(text=text)
 
         try:
-            if self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=1024,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                content = response.content[0].text
-            
-            elif self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "google":
-                response = self.client.generate_content(prompt)
-                content = response.text
-            
-            # Parse JSON response
-            # Remove markdown code blocks if present
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            data = json.loads(content)
-            return data
-            
+            data = self._complete_json(system, prompt, _json_schema(list(CRM_FIELDS)), max_tokens=1024, on_field=on_field)
         except Exception as e:
             print(f"Error extracting CRM data: {str(e)}")
-            # Return empty structure on error
-            return {
-                "contact_name": None,
-                "company": None,
-                "email": None,
-                "phone": None,
-                "deal_value": None,
-                "next_step": None,
-                "follow_up_date": None,
-                "notes": text
-            }
+            metrics.incr("llm.degraded.extraction")
+            # Return empty structure on error (not cached)
+            data = self._empty_crm_data(text)
+            mark_degraded(data, "extraction")
+            return data
+        
+        if not data.get(DEGRADED_KEY):
+            llm_cache.set(key, data)
+        return data
     
     def generate_summary(self, text: str, max_words: int = 50) -> str:
         """Generate a brief summary of the conversation"""
-        prompt = f"Summarize this conversation in {max_words} words or less:\n\n{text}"
+        return self._summarize(text, max_words)[0]
+    
+    def _summarize(self, text: str, max_words: int) -> Tuple[str, bool]:
+        """Summary plus whether it came from the LLM (False = truncated fallback)"""
+        key = self._cache_key("summary", text, max_words=max_words)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached, True
+        
+        system = SUMMARY_SYSTEM.format(max_words=max_words)
+        prompt = TEXT_PROMPT.format(text=text)
         
         try:
-            if self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=256,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text
-            elif self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3
-                )
-                return response.choices[0].message.content
-            elif self.provider == "google":
-                response = self.client.generate_content(prompt)
-                return response.text
+            summary = self._complete(prompt, max_tokens=256, temperature=0.3, system=system)
         except Exception as e:
             print(f"Error generating summary: {str(e)}")
-            return text[:100] + "..." if len(text) > 100 else text
-
-# Global extractor instance (default to Anthropic/Claude)
-try:
-    llm_extractor = LLMExtractor(provider="anthropic")
-except Exception:
-    # Fallback to OpenAI if Anthropic not configured
-    try:
-        llm_extractor = LLMExtractor(provider="openai")
-    except Exception:
-        # Final fallback to Google if available
-        llm_extractor = LLMExtractor(provider="google")
+            metrics.incr("llm.degraded.summary")
+            return self._fallback_summary(text), False
+        
+        llm_cache.set(key, summary)
+        return summary, True
+    
+    def extract_with_summary(self, text: str, max_words: int = 50,
+                             on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract CRM data and a summary from a single LLM call
+        
+        Falls back to running both calls in parallel if the combined
+        response cannot be parsed, or to a separate summary call if only
+        the summary is missing. on_field as in extract_crm_data.
+        
+        Returns:
+            (crm_data, summary)
+        """
+        key = self._cache_key("combined", text, max_words=max_words)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached["crm_data"], cached["summary"]
+        
+        system = COMBINED_SYSTEM.format(fields=CRM_FIELDS_PROMPT, max_words=max_words)
+        prompt = TEXT_PROMPT.format(text=text)
+
+        try:
+            data = self._complete_json(system, prompt, _json_schema(list(CRM_FIELDS), max_words), max_tokens=1280, on_field=on_field)
+        except Exception as e:
+            print(f"Combined extraction failed, falling back to parallel calls: {str(e)}")
+            return self.extract_and_summarize_parallel(text, max_words)
+        
+        summary = data.pop("summary", None)
+        if not summary:
+            summary, summarized = self._summarize(text, max_words)
+            if not summarized:
+                mark_degraded(data, "summary")
+                return data, summary
+        
+        if not data.get(DEGRADED_KEY):
+            llm_cache.set(key, {"crm_data": data, "summary": summary})
+        return data, summary
+    
+    def extract_and_summarize_parallel(self, text: str, max_words: int = 50,
+                                       on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Run extraction and summarization as two concurrent LLM calls
+        
+        Returns:
+            (crm_data, summary)
+        """
+        crm_future = _parallel_executor.submit(self.extract_crm_data, text, on_field)
+        summary_future = _parallel_executor.submit(self._summarize, text, max_words)
+        crm_data, (summary, summarized) = crm_future.result(), summary_future.result()
+        if not summarized:
+            mark_degraded(crm_data, "summary")
+        return crm_data, summary
+    
+    def extract_all(self, text: str, max_words: int = 50,
+                    on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract CRM data and summary using the configured EXTRACTION_MODE
+        
+        Modes: combined (one call), parallel (two concurrent calls),
+        sequential (two calls, one after the other)
+        
+        Inputs longer than LLM_CHUNK_TOKENS are split and extracted in
+        parallel chunks (see extract_chunked). Concurrent calls with the
+        same text are coalesced into one.
+        
+        on_field(name, value) is called from a worker thread as each CRM
+        field streams in; it is not called for cached, chunked or coalesced
+        results, so it can only be used to start work early.
+        """
+        key = self._cache_key("combined", text, max_words=max_words, mode=EXTRACTION_MODE)
+        return _inflight.do(key, self._extract_all, text, max_words, on_field)
+    
+    def _extract_all(self, text: str, max_words: int,
+                     on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        if estimate_tokens(text) > LLM_CHUNK_TOKENS:
+            return self.extract_chunked(text, max_words)
+        return self._extract_single(text, max_words, on_field)
+    
+    def _extract_single(self, text: str, max_words: int,
+                        on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        if EXTRACTION_MODE == "parallel":
+            return self.extract_and_summarize_parallel(text, max_words, on_field)
+        if EXTRACTION_MODE == "sequential":
+            crm_data = self.extract_crm_data(text, on_field)
+            summary, summarized = self._summarize(text, max_words)
+            if not summarized:
+                mark_degraded(crm_data, "summary")
+            return crm_data, summary
+        return self.extract_with_summary(text, max_words, on_field)
+    
+    def extract_chunked(self, text: str, max_words: int = 50) -> Tuple[Dict[str, Any], str]:
+        """
+        Map-reduce extraction for inputs too long for one prompt
+        
+        The text is split into chunks of at most LLM_CHUNK_TOKENS, each chunk
+        is extracted in parallel, and the results are merged deterministically
+        (see text_chunking.merge_crm_data). The chunk summaries are then
+        summarized into one.
+        
+        Returns:
+            (crm_data, summary)
+        """
+        chunks = split_text(text, LLM_CHUNK_TOKENS)
+        metrics.incr("llm_chunking.long_inputs")
+        metrics.incr("llm_chunking.chunks", len(chunks))
+        
+        futures = [_chunk_executor.submit(self._extract_single, chunk, max_words) for chunk in chunks]
+        results = [future.result() for future in futures]
+        
+        # A chunk whose extraction failed comes back as the empty structure
+        # with the whole chunk as notes; leave those out of the merge
+        partials, summaries, summarized = [], [], True
+        for crm_data, summary in results:
+            degraded = crm_data.get(DEGRADED_KEY, [])
+            if "extraction" in degraded:
+                metrics.incr("llm_chunking.failed_chunks")
+                continue
+            summarized &= "summary" not in degraded
+            partials.append(crm_data)
+            summaries.append(summary)
+        
+        if not partials:
+            crm_data = self._empty_crm_data(text)
+            mark_degraded(crm_data, "extraction")
+            mark_degraded(crm_data, "summary")
+            return crm_data, self._fallback_summary(text)
+        
+        crm_data = merge_crm_data(partials)
+        if len(partials) < len(chunks):
+            mark_degraded(crm_data, "partial_extraction")
+        if len(summaries) == 1:
+            summary = summaries[0]
+        else:
+            summary, reduced = self._reduce_summaries(summaries, max_words)
+            summarized &= reduced
+        if not summarized:
+            mark_degraded(crm_data, "summary")
+        return crm_data, summary
+    
+    def _reduce_summaries(self, summaries: List[str], max_words: int) -> Tuple[str, bool]:
+        """Summarize chunk summaries, in rounds while they exceed the chunk budget"""
+        joined, summarized = "\n".join(summaries), True
+        while estimate_tokens(joined) > LLM_CHUNK_TOKENS:
+            groups = split_text(joined, LLM_CHUNK_TOKENS)
+            results = list(_chunk_executor.map(lambda group: self._summarize(group, max_words), groups))
+            joined = "\n".join(summary for summary, _ in results)
+            summarized &= all(ok for _, ok in results)
+        summary, ok = self._summarize(joined, max_words)
+        return summary, summarized and ok
+    
+    def extract_batch(self, texts: List[str], max_words: int = 50) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Extract CRM data and summaries for many short documents, several per
+        LLM request
+        
+        Uncached documents up to LLM_BATCH_ITEM_TOKENS are packed into
+        requests sized to the token budget and answered as a JSON array keyed
+        by document id. Longer documents, and any document whose entry is
+        missing or malformed in the response, go through extract_all on
+        their own.
+        
+        Returns:
+            [(crm_data, summary), ...] in input order
+        """
+        results: List[Optional[Tuple[Dict[str, Any], str]]] = [None] * len(texts)
+        pending, singles = [], []
+        for i, text in enumerate(texts):
+            cached = llm_cache.get(self._cache_key("batch", text, max_words=max_words))
+            if cached is not None:
+                results[i] = (cached["crm_data"], cached["summary"])
+            elif estimate_tokens(text) <= LLM_BATCH_ITEM_TOKENS and LLM_BATCH_MAX_ITEMS > 1:
+                pending.append(i)
+            else:
+                singles.append(i)
+        
+        groups = self._pack_batches([texts[i] for i in pending], max_words)
+        offset, futures = 0, []
+        for group in groups:
+            indexes = pending[offset:offset + len(group)]
+            offset += len(group)
+            futures.append((indexes, _chunk_executor.submit(self._extract_packed, group, max_words)))
+        for indexes, future in futures:
+            for i, result in zip(indexes, future.result()):
+                if result is None:
+                    singles.append(i)
+                else:
+                    results[i] = result
+        
+        if singles:
+            metrics.incr("llm_batch.singles", len(singles))
+        single_futures = [(i, _single_executor.submit(self.extract_all, texts[i], max_words)) for i in singles]
+        for i, future in single_futures:
+            results[i] = future.result()
+        return results
+    
+    def _pack_batches(self, texts: List[str], max_words: int) -> List[List[str]]:
+        """Greedily group documents so each request fits the prompt and output budgets"""
+        overhead = _prompt_tokens(BATCH_SYSTEM.format(fields=CRM_FIELDS_PROMPT, max_words=max_words), BATCH_PROMPT.format(documents=""))
+        max_items = min(LLM_BATCH_MAX_ITEMS, BATCH_MAX_OUTPUT_TOKENS // BATCH_OUTPUT_TOKENS_PER_ITEM)
+        groups, current, size = [], [], overhead
+        for text in texts:
+            tokens = estimate_tokens(BATCH_DOCUMENT.format(id=len(current) + 1, text=text))
+            if current and (len(current) >= max_items or size + tokens > LLM_BATCH_TOKENS):
+                groups.append(current)
+                current, size = [], overhead
+            current.append(text)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _extract_packed(self, texts: List[str], max_words: int) -> List[Optional[Tuple[Dict[str, Any], str]]]:
+        """One request for several documents; None for entries that need a retry on their own"""
+        if len(texts) == 1:
+            return [None]
+        
+        documents = "\n\n".join(BATCH_DOCUMENT.format(id=i + 1, text=text) for i, text in enumerate(texts))
+        system = BATCH_SYSTEM.format(fields=CRM_FIELDS_PROMPT, max_words=max_words)
+        prompt = BATCH_PROMPT.format(documents=documents)
+        metrics.incr("llm_batch.requests")
+        metrics.incr("llm_batch.items", len(texts))
+        
+        try:
+            content = self._complete(prompt, max_tokens=min(BATCH_MAX_OUTPUT_TOKENS, BATCH_OUTPUT_TOKENS_PER_ITEM * len(texts)),
+                                     temperature=0, system=system)
+            entries = self._parse_json(content)
+            if not isinstance(entries, list):
+                raise ValueError("Batch response is not a JSON array")
+        except Exception as e:
+            print(f"Batch extraction of {len(texts)} documents failed, extracting one by one: {str(e)}")
+            metrics.incr("llm_batch.failed_requests")
+            return [None] * len(texts)
+        
+        by_id = {}
+        for entry in entries:
+            if isinstance(entry, dict) and entry.get("summary"):
+                by_id[str(entry.pop("id", ""))] = entry
+        
+        results = []
+        for i, text in enumerate(texts):
+            entry = by_id.get(str(i + 1))
+            if entry is None:
+                metrics.incr("llm_batch.item_fallbacks")
+                results.append(None)
+                continue
+            summary = entry.pop("summary")
+            crm_data = {field: entry.get(field) for field in CRM_FIELDS}
+            llm_cache.set(self._cache_key("batch", text, max_words=max_words), {"crm_data": crm_data, "summary": summary})
+            results.append((crm_data, summary))
+        
+        # Instructions sent once instead of once per document
+        single_system = COMBINED_SYSTEM.format(fields=CRM_FIELDS_PROMPT, max_words=max_words)
+        single_tokens = sum(_prompt_tokens(single_system, TEXT_PROMPT.format(text=t)) for t in texts)
+        metrics.incr("llm_batch.prompt_tokens_saved", max(0, single_tokens - _prompt_tokens(system, prompt)))
+        return results
+    
+    def extract_missing(self, text: str, known: Dict[str, Any], max_words: int = 50,
+                        default_summary: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract only the fields not already resolved by rule-based parsing
+        
+        Skips the LLM entirely when every REQUIRED_FIELDS entry is in known
+        (using default_summary as the summary), otherwise asks for just the
+        missing fields and the summary in one smaller prompt. Values in
+        known always win over the LLM's.
+        
+        Returns:
+            (crm_data, summary)
+        """
+        known = {k: v for k, v in known.items() if k in CRM_FIELDS and v not in (None, "")}
+        metrics.incr("llm_fast_path.fields_resolved", len(known))
+        full_tokens = _prompt_tokens(COMBINED_SYSTEM.format(fields=CRM_FIELDS_PROMPT, max_words=max_words), TEXT_PROMPT.format(text=text))
+        
+        if all(field in known for field in REQUIRED_FIELDS):
+            metrics.incr("llm_fast_path.calls_skipped")
+            metrics.incr("llm_fast_path.prompt_tokens_saved", full_tokens)
+            crm_data = {**{field: None for field in CRM_FIELDS}, **known}
+            return crm_data, default_summary or self._fallback_summary(text)
+        
+        if not known or estimate_tokens(text) > LLM_CHUNK_TOKENS:
+            # Long inputs go through the chunked path; rule-based values still win
+            crm_data, summary = self.extract_all(text, max_words)
+            return {**crm_data, **known}, summary
+        
+        missing = [field for field in CRM_FIELDS if field not in known]
+        key = self._cache_key("combined", text, max_words=max_words, fields=",".join(missing))
+        data, summary = _inflight.do(key, self._extract_fields, key, text, missing, max_words)
+        
+        prompt_tokens = _prompt_tokens(COMBINED_SYSTEM.format(fields=_fields_prompt(missing), max_words=max_words), TEXT_PROMPT.format(text=text))
+        metrics.incr("llm_fast_path.calls_shrunk")
+        metrics.incr("llm_fast_path.prompt_tokens_saved", full_tokens - prompt_tokens)
+        
+        crm_data = {field: data.get(field) for field in CRM_FIELDS}
+        crm_data.update(known)
+        if data.get(DEGRADED_KEY):
+            crm_data[DEGRADED_KEY] = data[DEGRADED_KEY]
+        return crm_data, summary
+    
+    def _extract_fields(self, key: str, text: str, fields: List[str], max_words: int) -> Tuple[Dict[str, Any], str]:
+        """Combined extraction + summary restricted to the given fields"""
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached["crm_data"], cached["summary"]
+        
+        system = COMBINED_SYSTEM.format(fields=_fields_prompt(fields), max_words=max_words)
+        prompt = TEXT_PROMPT.format(text=text)
+        
+        try:
+            data = self._complete_json(system, prompt, _json_schema(fields, max_words), max_tokens=1280)
+            if not data.get("summary"):
+                raise ValueError("Partial response missing summary")
+            summary = data.pop("summary")
+        except Exception as e:
+            print(f"Partial extraction failed, falling back to full extraction: {str(e)}")
+            return self._extract_all(text, max_words)
+        
+        if not data.get(DEGRADED_KEY):
+            llm_cache.set(key, {"crm_data": data, "summary": summary})
+        return data, summary
+
+def create_llm_extractor() -> LLMExtractor:
+    """Create an extractor routing across every configured provider"""
+    return LLMExtractor()
+
+# Global extractor instance, created on first use
+_llm_extractor: Optional[LLMExtractor] = None
+_llm_extractor_lock = threading.Lock()
+
+def get_llm_extractor() -> LLMExtractor:
+    global _llm_extractor
+    with _llm_extractor_lock:
+        if _llm_extractor is None:
+            _llm_extractor = create_llm_extractor()
+        return _llm_extractor
+
+def __getattr__(name: str):
+    # Keeps `from llm_extraction import llm_extractor` working
+    if name == "llm_extractor":
+        return get_llm_extractor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
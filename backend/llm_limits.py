@@ -0,0 +1,172 @@
+"""
+LLM rate limit module
+Client-side token buckets (requests and tokens per minute), concurrency caps
+and jittered exponential backoff honouring Retry-After for provider calls
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from metrics import metrics
+
+# Defaults for every provider; override per provider with e.g. LLM_RPM_ANTHROPIC.
+# 0 disables a limit.
+LLM_RPM = int(os.getenv("LLM_RPM", 300))
+LLM_TPM = int(os.getenv("LLM_TPM", 200000))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+# Longest a call waits for rate limit budget before giving up on this provider
+LLM_LIMIT_WAIT_SECONDS = float(os.getenv("LLM_LIMIT_WAIT_SECONDS", 30))
+
+# Retries on 429 / 5xx / connection errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 20))
+
+# 529 is Anthropic's "overloaded"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when local rate limit budget did not free up in time"""
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> float:
+        """
+        Block until `amount` units are available and take them
+
+        Returns the seconds spent waiting; raises RateLimitTimeout if that
+        would exceed timeout.
+        """
+        # A single request larger than the bucket can still go through once it is full
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return now - start
+                wait = (amount - self.tokens) / self.rate
+            if timeout is not None and now - start + wait > timeout:
+                raise RateLimitTimeout(f"Rate limit budget not available within {timeout}s")
+            time.sleep(min(wait, 1.0))
+
+
+class ProviderLimiter:
+    """Requests/minute, tokens/minute and in-flight caps for one provider"""
+
+    def __init__(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, wait_seconds: float = LLM_LIMIT_WAIT_SECONDS):
+        def setting(key: str, value: Optional[int], default: int) -> int:
+            if value is not None:
+                return value
+            return int(os.getenv(f"{key}_{name.upper()}", default))
+
+        self.name = name
+        self.rpm = setting("LLM_RPM", rpm, LLM_RPM)
+        self.tpm = setting("LLM_TPM", tpm, LLM_TPM)
+        self.max_concurrency = setting("LLM_MAX_CONCURRENCY", max_concurrency, LLM_MAX_CONCURRENCY)
+        self.wait_seconds = wait_seconds
+        self.requests = TokenBucket(self.rpm) if self.rpm > 0 else None
+        self.tokens = TokenBucket(self.tpm) if self.tpm > 0 else None
+        self.slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+
+    @contextmanager
+    def acquire(self, tokens: int):
+        """Wait for a concurrency slot and rate budget for a call of ~tokens input tokens"""
+        deadline = time.monotonic() + self.wait_seconds
+        if self.slots and not self.slots.acquire(timeout=self.wait_seconds):
+            metrics.incr(f"llm_limits.timeouts.{self.name}")
+            raise RateLimitTimeout(f"{self.name}: no concurrency slot within {self.wait_seconds}s")
+        try:
+            waited = 0.0
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket:
+                    waited += bucket.acquire(amount, timeout=max(0.0, deadline - time.monotonic()))
+            if waited > 0.001:
+                metrics.incr(f"llm_limits.throttled.{self.name}")
+                metrics.observe(f"llm_limits.wait_seconds.{self.name}", waited)
+            yield
+        except RateLimitTimeout:
+            metrics.incr(f"llm_limits.timeouts.{self.name}")
+            raise
+        finally:
+            if self.slots:
+                self.slots.release()
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider SDK error (anthropic/openai style), if any"""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After header of a provider SDK error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        # HTTP-date form is rare from LLM APIs; fall back to backoff
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # SDK connection/timeout errors carry no status
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+
+
+def call_with_retry(name: str, fn: Callable[[], Any], retries: int = LLM_MAX_RETRIES,
+                    base: float = LLM_RETRY_BASE_SECONDS, max_delay: float = LLM_RETRY_MAX_SECONDS) -> Any:
+    """
+    Call fn, retrying retryable provider errors with full-jitter exponential
+    backoff, or after Retry-After when the provider sends one
+
+    A Retry-After longer than max_delay is not waited out: the error is
+    raised so the router can move on to another provider.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            code = status_code(e)
+            if code == 429:
+                metrics.incr(f"llm_limits.rate_limited.{name}")
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base * 2 ** attempt))
+            elif delay > max_delay:
+                raise
+            metrics.incr(f"llm_limits.retries.{name}")
+            print(f"LLM provider '{name}' error ({code or type(e).__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
@@ -0,0 +1,340 @@
+"""
+LLM providers module
+Thin wrappers giving Claude/GPT/Gemini (and local fakes) one completion interface
+"""
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from dotenv import load_dotenv
+
+from metrics import metrics
+from text_chunking import estimate_tokens
+
+load_dotenv()
+
+# Provider API keys, in the order they are tried
+PROVIDER_KEYS = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "google": "GOOGLE_API_KEY"
+}
+
+
+def record_usage(provider: str, seconds: float, prompt_tokens: int,
+                 cached_tokens: int = 0, cache_write_tokens: int = 0):
+    """
+    Record one request's prompt cache usage: token counters, the cached
+    share of the prompt, and latency split by cache hit / miss
+    """
+    if not prompt_tokens:
+        return
+    metrics.incr(f"llm_prompt_cache.prompt_tokens.{provider}", prompt_tokens)
+    metrics.incr(f"llm_prompt_cache.cached_tokens.{provider}", cached_tokens)
+    if cache_write_tokens:
+        metrics.incr(f"llm_prompt_cache.write_tokens.{provider}", cache_write_tokens)
+    metrics.observe(f"llm_prompt_cache.hit_ratio.{provider}", cached_tokens / prompt_tokens)
+    metrics.observe(f"llm_prompt_cache.latency.{'hit' if cached_tokens else 'miss'}.{provider}", seconds)
+
+
+def _count(obj: Any, *path: str) -> int:
+    """Nested usage field, 0 when the SDK/model doesn't report it"""
+    for name in path:
+        obj = getattr(obj, name, None)
+    return obj if isinstance(obj, int) else 0
+
+
+def _joined(prompt: str, system: Optional[str]) -> str:
+    """System prefix and prompt as one text, for APIs without a separate system prompt"""
+    return f"{system}\n\n{prompt}" if system else prompt
+
+
+class LLMProvider:
+    """
+    A single LLM backend: name, model and a blocking completion call
+
+    system is the static instruction prefix of the prompt; providers send
+    it ahead of the prompt so it can be cached across requests.
+    """
+
+    name = "base"
+    model = ""
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+               system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield the completion as text deltas; with a JSON schema, the output
+        is constrained to a JSON object matching it where the API allows
+        """
+        yield self.complete(prompt, max_tokens, temperature, system)
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def __init__(self):
+        import anthropic
+        # Retries are handled by llm_limits.call_with_retry
+        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+        self.model = "claude-3-5-sonnet-20241022"
+
+    def _request(self, prompt: str, max_tokens: int, temperature: float,
+                 system: Optional[str], schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        request = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if system:
+            # Cache breakpoint after the static prefix (tools + system prompt);
+            # only the user message differs between requests
+            request["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        if schema:
+            # Forced tool call: the tool input is the structured output
+            request["tools"] = [{"name": "record_output", "description": "Record the extracted data",
+                                 "input_schema": schema}]
+            request["tool_choice"] = {"type": "tool", "name": "record_output"}
+        return request
+
+    def _record(self, usage: Any, start: float):
+        # input_tokens excludes the tokens read from or written to the cache
+        cached = _count(usage, "cache_read_input_tokens")
+        written = _count(usage, "cache_creation_input_tokens")
+        record_usage(self.name, time.perf_counter() - start,
+                     _count(usage, "input_tokens") + cached + written, cached, written)
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        response = self.client.messages.create(**self._request(prompt, max_tokens, temperature, system))
+        self._record(response.usage, start)
+        return response.content[0].text
+
+    def stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+               system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        start = time.perf_counter()
+        with self.client.messages.stream(**self._request(prompt, max_tokens, temperature, system, schema)) as stream:
+            for event in stream:
+                if event.type != "content_block_delta":
+                    continue
+                if event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+                elif event.delta.type == "text_delta":
+                    yield event.delta.text
+            self._record(stream.get_final_message().usage, start)
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self):
+        import openai
+        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        self.model = "gpt-4-turbo-preview"
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+        # Prompt caching is automatic for a repeated prefix, so the system
+        # message goes first
+        messages = [{"role": "system", "content": system}] if system else []
+        return messages + [{"role": "user", "content": prompt}]
+
+    def _record(self, usage: Any, start: float):
+        record_usage(self.name, time.perf_counter() - start, _count(usage, "prompt_tokens"),
+                     _count(usage, "prompt_tokens_details", "cached_tokens"))
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt, system),
+            temperature=temperature
+        )
+        self._record(response.usage, start)
+        return response.choices[0].message.content
+
+    def stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+               system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        kwargs = {"response_format": {"type": "json_object"}} if schema else {}
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt, system),
+            temperature=temperature,
+            stream=True,
+            # Usage arrives in a final chunk without choices
+            extra_body={"stream_options": {"include_usage": True}},
+            **kwargs
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                self._record(chunk.usage, start)
+
+
+def _google_json_mode(genai: Any, model: str) -> bool:
+    """Whether the SDK (0.5+) and model (Gemini 1.5+) support response_mime_type JSON mode"""
+    config = getattr(getattr(genai, "types", None), "GenerationConfig", None)
+    fields = getattr(config, "__dataclass_fields__", None) or getattr(config, "__annotations__", {})
+    return "response_mime_type" in fields and not model.startswith(("gemini-pro", "gemini-1.0"))
+
+
+class GoogleProvider(LLMProvider):
+    name = "google"
+
+    def __init__(self):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.client = genai.GenerativeModel('gemini-pro')
+        self.model = "gemini-pro"
+        self.json_mode = _google_json_mode(genai, self.model)
+
+    def _record(self, usage: Any, start: float):
+        record_usage(self.name, time.perf_counter() - start, _count(usage, "prompt_token_count"),
+                     _count(usage, "cached_content_token_count"))
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        response = self.client.generate_content(_joined(prompt, system))
+        self._record(getattr(response, "usage_metadata", None), start)
+        return response.text
+
+    def stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+               system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        if schema and not self.json_mode:
+            # Asking for JSON mode here fails the request; the prompt already asks for JSON
+            yield from super().stream(prompt, max_tokens, temperature, system)
+            return
+        config = {"response_mime_type": "application/json"} if schema else None
+        start = time.perf_counter()
+        response = self.client.generate_content(_joined(prompt, system), generation_config=config, stream=True)
+        for chunk in response:
+            yield chunk.text
+        self._record(getattr(response, "usage_metadata", None), start)
+
+
+class FakeAPIError(RuntimeError):
+    """Shaped like SDK API errors: status_code plus a response with headers"""
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in for load tests and router checks
+
+    latency may be a number of seconds or a callable returning one per call;
+    response may be a string or a callable taking the prompt (system prefix
+    included). A fraction error_rate of calls fail with error_status (e.g.
+    429 with retry_after). A system prefix seen before is reported as
+    cached in the prompt cache metrics.
+    """
+
+    def __init__(self, name: str, latency: Union[float, Callable[[], float]] = 0.1,
+                 error_rate: float = 0.0, response: Union[str, Callable[[str], str]] = "{}",
+                 error_status: int = 500, retry_after: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.name = name
+        self.model = f"fake-{name}"
+        self.latency = latency
+        self.error_rate = error_rate
+        self.response = response
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._prefixes = set()
+
+    def _fail(self):
+        if self._random.random() < self.error_rate:
+            headers = {"retry-after": str(self.retry_after)} if self.retry_after is not None else {}
+            raise FakeAPIError(f"{self.name}: simulated {self.error_status} error", self.error_status, headers)
+
+    def _respond(self, prompt: str, system: Optional[str], seconds: float) -> str:
+        cached = 0
+        if system:
+            cached = estimate_tokens(system) if system in self._prefixes else 0
+            self._prefixes.add(system)
+        text = _joined(prompt, system)
+        record_usage(self.name, seconds, estimate_tokens(text), cached)
+        return self.response(text) if callable(self.response) else self.response
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None) -> str:
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        time.sleep(latency)
+        self._fail()
+        return self._respond(prompt, system, latency)
+
+    def stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+               system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Half the latency before the first delta, the rest spread over ~20 deltas"""
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        time.sleep(latency / 2)
+        self._fail()
+        text = self._respond(prompt, system, latency)
+        step = max(1, len(text) // 20)
+        for i in range(0, len(text), step):
+            time.sleep(latency / 2 * step / max(1, len(text)))
+            yield text[i:i + step]
+
+
+PROVIDERS = {
+    "anthropic": AnthropicProvider,
+    "openai": OpenAIProvider,
+    "google": GoogleProvider
+}
+
+
+def provider_order() -> List[str]:
+    """
+    Providers to try: LLM_PROVIDER if set, otherwise those with an API key
+    configured (so unused SDKs are never imported), then the rest
+    """
+    preferred = os.getenv("LLM_PROVIDER")
+    if preferred:
+        return [preferred.lower()]
+    configured = [p for p, key in PROVIDER_KEYS.items() if os.getenv(key)]
+    return configured + [p for p in PROVIDER_KEYS if p not in configured]
+
+
+def create_provider(name: str) -> LLMProvider:
+    name = name.lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unsupported provider: {name}")
+    return PROVIDERS[name]()
+
+
+def create_providers() -> List[LLMProvider]:
+    """
+    Every configured provider that initializes, in provider_order(); if
+    none has an API key, the first one that initializes at all
+    """
+    order = provider_order()
+    configured = [p for p in order if os.getenv("LLM_PROVIDER") or os.getenv(PROVIDER_KEYS.get(p, ""))]
+    providers, errors = [], []
+    for name in configured or order:
+        try:
+            providers.append(create_provider(name))
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            continue
+        if not configured:
+            break
+    if not providers:
+        raise RuntimeError(f"No LLM provider available ({'; '.join(errors)})")
+    return providers
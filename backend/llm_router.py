@@ -0,0 +1,369 @@
+"""
+LLM router module
+Routes completions across providers by observed latency and errors, hedges
+slow requests to a second provider and trips circuit breakers on failing ones
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_limits import LLM_MAX_RETRIES, ProviderLimiter, RateLimitTimeout, call_with_retry
+from llm_providers import LLMProvider, create_providers
+from metrics import metrics
+from text_chunking import estimate_tokens
+
+# Hedge to the next provider once a request runs longer than this latency
+# percentile of the primary (never sooner than LLM_HEDGE_MIN_SECONDS)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", 1.0))
+# Used until a provider has LLM_MIN_SAMPLES latency samples
+LLM_HEDGE_DEFAULT_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", 10.0))
+LLM_MIN_SAMPLES = 20
+
+# Consecutive failures that open a provider's breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+
+# Recent calls kept per provider for latency percentiles and error rate
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", 200))
+
+# Provider calls run here so a slow primary can be raced against a hedge
+_router_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_ROUTER_WORKERS", 32)),
+    thread_name_prefix="llm-router"
+)
+
+
+class RouterError(RuntimeError):
+    """Raised when no provider could complete the request"""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; after `cooldown`
+    seconds one probe request is let through (half_open), which closes the
+    breaker on success or re-opens it on failure
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"  # closed | open | half_open
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether allow() would currently let a request through (no side effects)"""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return self.state == "closed"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+
+    def release_probe(self):
+        """The half-open probe never reached the provider; let the next request probe instead"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def probe_due(self) -> bool:
+        """Open, but cooled down long enough to let a probe through"""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self) -> bool:
+        """Record a success; returns True if this closed an open breaker"""
+        with self._lock:
+            recovered = self.state != "closed"
+            self.state = "closed"
+            self.consecutive_failures = 0
+            return recovered
+
+    def record_failure(self) -> bool:
+        """Record an error; returns True if this opened the breaker"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.consecutive_failures >= self.failures):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class ProviderStats:
+    """Sliding window of recent latencies and outcomes for one provider"""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latencies.append(seconds)
+            self.outcomes.append(ok)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < LLM_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def clear_errors(self):
+        """Forget recorded outcomes, e.g. once a provider recovers from an outage"""
+        with self._lock:
+            self.outcomes.clear()
+
+
+class _DeltaRelay:
+    """
+    Passes stream deltas to the caller from the first attempt that produces
+    one; deltas of hedges, failovers and retries are dropped, as they would
+    interleave with text already forwarded
+    """
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self.owner = None
+        self._lock = threading.Lock()
+
+    def forwarder(self) -> Callable[[str], None]:
+        token = object()
+
+        def forward(delta: str):
+            with self._lock:
+                if self.owner is None:
+                    self.owner = token
+                if self.owner is not token:
+                    return
+            self.on_delta(delta)
+        return forward
+
+
+class LLMRouter:
+    """
+    Sends each completion to the best available provider
+
+    Providers are ranked by recent median latency, penalized by error rate
+    (untried providers keep their configured order). If the primary has not
+    answered within its hedge delay, the same request is also sent to the
+    next provider and whichever answers first wins. A failed attempt fails
+    over to the next provider immediately. Providers with an open circuit
+    breaker are skipped.
+
+    Each provider call is rate limited and retried with backoff (see
+    llm_limits) before it counts as a failure; with more than one provider
+    it is retried at most once, since failing over is faster.
+
+    With a schema or on_delta, the completion is streamed (structured output
+    where the provider supports it); the returned text is always the full
+    completion of the winning attempt.
+    """
+
+    def __init__(self, providers: List[LLMProvider], hedge: bool = LLM_HEDGE_ENABLED,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_min_seconds: float = LLM_HEDGE_MIN_SECONDS,
+                 hedge_default_seconds: float = LLM_HEDGE_DEFAULT_SECONDS,
+                 breaker_failures: int = LLM_BREAKER_FAILURES,
+                 breaker_cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_default_seconds = hedge_default_seconds
+        self.stats = {p.name: ProviderStats() for p in providers}
+        self.breakers = {p.name: CircuitBreaker(breaker_failures, breaker_cooldown) for p in providers}
+        self.limiters = {p.name: ProviderLimiter(p.name) for p in providers}
+
+    @property
+    def name(self) -> str:
+        return "+".join(p.name for p in self.providers)
+
+    @property
+    def model(self) -> str:
+        return "+".join(p.model for p in self.providers)
+
+    def ranked(self) -> List[LLMProvider]:
+        """Providers whose breaker would let a request through, best first"""
+        available = [p for p in self.providers if self.breakers[p.name].available()]
+        medians = {p.name: self.stats[p.name].percentile(50) for p in available}
+        known = [m for m in medians.values() if m is not None]
+        # Providers without enough samples tie with the fastest known one, so
+        # the (stable) sort keeps them in configured order
+        baseline = min(known) if known else 0.0
+
+        def score(provider: LLMProvider) -> float:
+            median = medians[provider.name]
+            error_rate = self.stats[provider.name].error_rate()
+            return (baseline if median is None else median) * (1 + 4 * error_rate) + error_rate
+        ranked = sorted(available, key=score)
+        # A provider due for its half-open probe goes first, otherwise its
+        # error history would keep it from ever being tried again
+        return sorted(ranked, key=lambda p: not self.breakers[p.name].probe_due())
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        observed = self.stats[provider.name].percentile(self.hedge_percentile)
+        return max(self.hedge_min_seconds, observed if observed is not None else self.hedge_default_seconds)
+
+    def _attempt(self, provider: LLMProvider, prompt: str, max_tokens: int, temperature: float,
+                 system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None,
+                 relay: Optional[_DeltaRelay] = None) -> str:
+        # Waiting for local rate limit budget is not the provider's fault, so
+        # RateLimitTimeout skips the latency/breaker bookkeeping below; a
+        # probe that timed out here hands the half-open slot back
+        try:
+            with self.limiters[provider.name].acquire(estimate_tokens(prompt) + estimate_tokens(system or "")):
+                return self._call(provider, prompt, max_tokens, temperature, system, schema, relay)
+        except RateLimitTimeout:
+            self.breakers[provider.name].release_probe()
+            raise
+
+    def _call(self, provider: LLMProvider, prompt: str, max_tokens: int, temperature: float,
+              system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None,
+              relay: Optional[_DeltaRelay] = None) -> str:
+        def run() -> str:
+            if schema is None and relay is None:
+                return provider.complete(prompt, max_tokens=max_tokens, temperature=temperature, system=system)
+            forward = relay.forwarder() if relay else None
+            parts = []
+            for delta in provider.stream(prompt, max_tokens=max_tokens, temperature=temperature,
+                                         system=system, schema=schema):
+                parts.append(delta)
+                if forward:
+                    forward(delta)
+            return "".join(parts)
+
+        start = time.perf_counter()
+        try:
+            result = call_with_retry(
+                provider.name,
+                run,
+                # With another provider to fail over to, don't sit out long backoffs here
+                retries=LLM_MAX_RETRIES if len(self.providers) == 1 else min(1, LLM_MAX_RETRIES)
+            )
+        except Exception:
+            self.stats[provider.name].record(time.perf_counter() - start, ok=False)
+            metrics.incr(f"llm_router.errors.{provider.name}")
+            if self.breakers[provider.name].record_failure():
+                metrics.incr(f"llm_router.breaker_opened.{provider.name}")
+                metrics.set_gauge(f"llm_router.breaker_open.{provider.name}", 1)
+                print(f"LLM provider '{provider.name}' failing, circuit breaker opened")
+            raise
+        elapsed = time.perf_counter() - start
+        self.stats[provider.name].record(elapsed, ok=True)
+        if self.breakers[provider.name].record_success():
+            self.stats[provider.name].clear_errors()
+            metrics.incr(f"llm_router.breaker_closed.{provider.name}")
+            print(f"LLM provider '{provider.name}' recovered, circuit breaker closed")
+        metrics.set_gauge(f"llm_router.breaker_open.{provider.name}", 0)
+        metrics.observe(f"llm_router.latency.{provider.name}", elapsed)
+        return result
+
+    def complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0,
+                 system: Optional[str] = None, schema: Optional[Dict[str, Any]] = None,
+                 on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Complete the prompt on whichever provider answers first
+
+        system is the static instruction prefix (cached by providers that
+        support it); schema asks for a JSON object matching it; on_delta is
+        called (from a router thread) with each streamed text delta of one
+        attempt.
+        """
+        candidates = self.ranked()
+        relay = _DeltaRelay(on_delta) if on_delta else None
+        pending: Dict[Future, LLMProvider] = {}
+        errors: List[str] = []
+
+        def launch() -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if not self.breakers[provider.name].allow():
+                    continue
+                metrics.incr(f"llm_router.requests.{provider.name}")
+                pending[_router_executor.submit(self._attempt, provider, prompt, max_tokens,
+                                                temperature, system, schema, relay)] = provider
+                return True
+            return False
+
+        if not launch():
+            metrics.incr("llm_router.unavailable")
+            raise RouterError("No LLM provider available (all circuit breakers open)")
+        primary = next(iter(pending.values()))
+        metrics.incr(f"llm_router.primary.{primary.name}")
+        hedged = False
+
+        while pending:
+            timeout = self.hedge_delay(primary) if self.hedge and not hedged and candidates else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Primary is slower than usual: race it against the next provider
+                hedged = True
+                if launch():
+                    metrics.incr("llm_router.hedges")
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {str(e)}")
+                    continue
+                if provider is not primary:
+                    metrics.incr("llm_router.hedge_wins" if hedged and not errors else "llm_router.failovers")
+                return result
+
+            # Every attempt so far failed; fail over to the next provider
+            if not pending and launch():
+                continue
+
+        metrics.incr("llm_router.failures")
+        raise RouterError(f"All LLM providers failed ({'; '.join(errors)})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-provider routing state, for health/debug output"""
+        return {
+            p.name: {
+                "breaker": self.breakers[p.name].state,
+                "p50_seconds": self.stats[p.name].percentile(50),
+                f"p{self.hedge_percentile:g}_seconds": self.stats[p.name].percentile(self.hedge_percentile),
+                "error_rate": round(self.stats[p.name].error_rate(), 3)
+            }
+            for p in self.providers
+        }
+
+
+# Global router shared by extraction and queries, created on first use
+_llm_router: Optional[LLMRouter] = None
+_llm_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    global _llm_router
+    with _llm_router_lock:
+        if _llm_router is None:
+            _llm_router = LLMRouter(create_providers())
+            print(f"LLM router providers: {_llm_router.name}")
+        return _llm_router
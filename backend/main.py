@@ -2,22 +2,107 @@
 FastAPI Backend for Zero-Click CRM
 Handles audio uploads, transcription, and CRM data extraction
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from contextlib import asynccontextmanager
 import os
+import asyncio
+import json
 import tempfile
+from concurrent.futures import Future
 from datetime import datetime
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
 
-# Import our modules
-from database import db
-from speech_to_text import stt
-from llm_extraction import llm_extractor
-from query_agent import query_agent
+# Import our modules (services are created lazily, see services.py)
+from database import get_db, activity_row, missing_function
+from async_database import get_async_db
+from sqlite_database import get_sqlite_db
+from speech_to_text import stt_pool, get_stt
+from llm_extraction import get_llm_extractor, DEGRADED_KEY
+from query_agent import get_query_agent
 from email_parser import email_parser
+from concurrency import io_executor, run_io, shutdown_executors
+from contact_cache import contact_cache, contact_key, CONTACT_CACHE_WARM
+from services import registry
+from metrics import metrics
+from llm_cache import make_key
+from singleflight import AsyncSingleFlight
+from jobs import job_manager, Job, QueueFullError
+from activity_buffer import activity_buffer, ACTIVITY_WRITE_BEHIND
+from streaming_stt import StreamingTranscriber, StreamTooLongError
 
-app = FastAPI(title="Zero-Click CRM API", version="1.0.0")
+# Upload limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+# Room for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Batch ingestion limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 1000))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 50))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+
+# Largest page the list endpoints (/contacts, /deals, /activities) return
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", 1000))
+
+# Resolve sender/phone/amount from emails with rules before calling the LLM
+EXTRACTION_FAST_PATH = os.getenv("EXTRACTION_FAST_PATH", "1") == "1"
+
+# async: pooled keep-alive PostgREST client on the event loop (async_database);
+# sync: the supabase client on the I/O thread pool (database);
+# sqlite: embedded SQLite file at SQLITE_DB_PATH, no Supabase needed (sqlite_database)
+DB_CLIENT = os.getenv("DB_CLIENT", "async").lower()
+
+# Save each ingested record with one call to the ingest_crm_record database
+# function (one round trip, one transaction) instead of up to four requests;
+# falls back to separate requests if the database doesn't have the function
+DB_ATOMIC_INGEST = os.getenv("DB_ATOMIC_INGEST", "1") == "1"
+
+def _load_stt():
+    """Warm the transcription workers (or the in-process model)"""
+    if stt_pool.workers <= 0:
+        get_stt()
+    else:
+        stt_pool.start()
+    return stt_pool
+
+# Duplicate ingestions in flight at the same time (retries, double clicks)
+# run the pipeline once and share the resulting ids
+ingest_flight = AsyncSingleFlight("ingest")
+
+_DB_LOADERS = {"async": get_async_db, "sync": get_db, "sqlite": get_sqlite_db}
+if DB_CLIENT not in _DB_LOADERS:
+    raise ValueError(f"Unsupported DB_CLIENT: {DB_CLIENT} (expected one of {', '.join(_DB_LOADERS)})")
+db = registry.register("db", _DB_LOADERS[DB_CLIENT])
+llm_extractor = registry.register("llm", get_llm_extractor)
+query_agent = registry.register("query", get_query_agent)
+registry.register("stt", _load_stt)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_manager.start()
+    if ACTIVITY_WRITE_BEHIND:
+        await activity_buffer.start(write=_write_activity_rows, reserve=_reserve_activity_ids)
+    # Load services in parallel in the background so the server binds right away
+    registry.preload()
+    warm_task = asyncio.create_task(warm_contact_cache())
+    yield
+    warm_task.cancel()
+    await job_manager.stop()
+    if activity_buffer.started:
+        await activity_buffer.stop()
+    if DB_CLIENT == "async" and registry.services["db"].status == "ready":
+        await db.aclose()
+    elif DB_CLIENT == "sqlite" and registry.services["db"].status == "ready":
+        db.close()
+    stt_pool.shutdown(wait=False)
+    shutdown_executors(wait=False)
+
+app = FastAPI(title="Zero-Click CRM API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -28,6 +113,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads by Content-Length before the body is read"""
+    if request.url.path == "/upload_audio":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds maximum size of {MAX_UPLOAD_BYTES} bytes"}
+            )
+    return await call_next(request)
+
+async def warm_contact_cache():
+    """Load the most recent contacts into the contact cache once the database is up"""
+    if CONTACT_CACHE_WARM <= 0:
+        return
+    try:
+        await registry.ensure("db")
+        rows = await run_db(db.get_all_contacts, limit=CONTACT_CACHE_WARM, fields=["name", "company"])
+        print(f"Contact cache warmed with {contact_cache.warm(rows)} contacts")
+    except Exception as e:
+        print(f"Contact cache warm-up failed: {str(e)}")
+
+async def _write_activity_rows(rows: List[Dict[str, Any]]):
+    await registry.ensure("db")
+    await run_db(db.save_activity_rows, rows)
+
+async def _reserve_activity_ids(count: int) -> List[int]:
+    await registry.ensure("db")
+    return await run_db(db.reserve_activity_ids, count)
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await an AsyncDatabaseClient method, or run a DatabaseClient one on the I/O pool"""
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await run_io(func, *args, **kwargs)
+
 # ==================== Models ====================
 
 class TextInput(BaseModel):
@@ -40,6 +162,356 @@ class QueryInput(BaseModel):
 class EmailInput(BaseModel):
     email_text: str
 
+class BatchItem(BaseModel):
+    type: str = "text"  # text or email
+    text: str
+    source: Optional[str] = None  # activity type for text items
+    id: Optional[str] = None  # caller's reference, echoed back in results
+
+class BatchInput(BaseModel):
+    items: List[BatchItem]
+
+# ==================== Helpers ====================
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+def _remove_file(path: str):
+    """Delete a temp file if it still exists"""
+    if os.path.exists(path):
+        os.unlink(path)
+
+class UploadFormError(Exception):
+    """Raised when an upload is not multipart/form-data with the expected file field"""
+
+async def save_upload_to_temp(request: Request, field: str = "file",
+                              max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, Optional[str]]:
+    """
+    Stream the file in a multipart upload's `field` to a temp file
+    
+    The body is parsed as it arrives from request.stream(), so it is not
+    spooled anywhere first, and an upload is rejected as soon as it passes
+    max_bytes, with or without Content-Length. File data is written in
+    UPLOAD_CHUNK_SIZE pieces; the temp file is removed if anything fails.
+    
+    Returns:
+        (temp file path, uploaded filename); the caller deletes the file
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise UploadFormError("Expected a multipart/form-data upload")
+    
+    part = {"header": b"", "value": b"", "target": False}
+    found: Dict[str, Any] = {}
+    data: List[bytes] = []
+    
+    def on_part_begin():
+        part["target"] = False
+    
+    def on_header_field(chunk: bytes, start: int, end: int):
+        part["header"] += chunk[start:end]
+    
+    def on_header_value(chunk: bytes, start: int, end: int):
+        part["value"] += chunk[start:end]
+    
+    def on_header_end():
+        if part["header"].lower() == b"content-disposition" and not found:
+            _, disposition = parse_options_header(part["value"])
+            if disposition.get(b"name") == field.encode():
+                part["target"] = True
+                found["filename"] = disposition.get(b"filename", b"").decode("utf-8", "replace")
+        part["header"] = part["value"] = b""
+    
+    def on_part_data(chunk: bytes, start: int, end: int):
+        if part["target"]:
+            data.append(chunk[start:end])
+    
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+    })
+    tmp_file = None
+    received = written = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise UploadTooLargeError(f"Upload exceeds maximum size of {max_bytes} bytes")
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise UploadFormError(f"Malformed multipart upload: {str(e)}")
+            buffered = sum(len(piece) for piece in data)
+            if written + buffered > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds maximum size of {max_bytes} bytes")
+            if tmp_file is None and found:
+                suffix = os.path.splitext(found["filename"])[1]
+                tmp_file = await run_io(tempfile.NamedTemporaryFile, delete=False, suffix=suffix)
+            if buffered >= UPLOAD_CHUNK_SIZE:
+                await run_io(tmp_file.write, b"".join(data))
+                written += buffered
+                data.clear()
+        if tmp_file is None:
+            raise UploadFormError(f"Missing file field '{field}'")
+        await run_io(tmp_file.write, b"".join(data))
+        await run_io(tmp_file.close)
+        return tmp_file.name, found["filename"] or None
+    except BaseException:
+        if tmp_file is not None:
+            await run_io(tmp_file.close)
+            await run_io(_remove_file, tmp_file.name)
+        raise
+
+def _apply_email_fallbacks(crm_data: Dict[str, Any], parsed_email: Dict[str, Any]):
+    """Fill contact email/name from parsed headers when the LLM missed them"""
+    # "From: jane@x.com" parses as a name
+    from_name = (parsed_email.get("from_name") or "").strip().strip('"\'')
+    from_email = parsed_email.get("from_email")
+    if not from_email and "@" in from_name:
+        from_email, from_name = from_name.strip("<>"), ""
+    
+    # Override email if found in parsed data
+    if from_email and not crm_data.get("email"):
+        crm_data["email"] = from_email
+    
+    # Override contact name if found
+    if from_name and not crm_data.get("contact_name"):
+        crm_data["contact_name"] = from_name
+
+async def extract_email(email_text: str) -> Tuple[Dict[str, Any], str, Dict[str, Any], str]:
+    """
+    Parse an email and extract CRM data and summary from its body
+    
+    With EXTRACTION_FAST_PATH, fields the parser resolves with high
+    confidence are not asked of the LLM, and the call is skipped when
+    all required fields are resolved.
+    
+    Returns:
+        (parsed_email, text_to_analyze, crm_data, summary)
+    """
+    # Parse email structure
+    parsed_email = email_parser.parse_email(email_text)
+    
+    # Use body for CRM extraction (or full text if no body)
+    text_to_analyze = parsed_email.get("body") or email_text
+    
+    if EXTRACTION_FAST_PATH:
+        known = email_parser.pre_extract(email_text, parsed_email)
+        crm_data, summary = await run_io(
+            llm_extractor.extract_missing, text_to_analyze, known,
+            default_summary=email_parser.quick_summary(parsed_email)
+        )
+    else:
+        crm_data, summary = await run_io(llm_extractor.extract_all, text_to_analyze)
+    
+    # Fill in sender details from the email headers
+    _apply_email_fallbacks(crm_data, parsed_email)
+    return parsed_email, text_to_analyze, crm_data, summary
+
+def _content_key(*parts: str) -> str:
+    """Hash of the request content, used to coalesce duplicate ingestions"""
+    return make_key("ingest", "\x00".join(parts), "", "", "")
+
+class ContactLookup:
+    """
+    Looks the contact up while the rest of the extraction is still
+    streaming: pass on_field to llm_extractor.extract_all, then the lookup
+    to save_crm_record
+
+    Only a lookup is started early (answered from the contact cache when
+    possible); the contact is created (if missing) once the final
+    extraction confirms the name, so a wrong early guess never leaves an
+    orphan row.
+    """
+    
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.key: Optional[Tuple[str, Optional[str]]] = None
+        self.future = None
+        self.loop = asyncio.get_running_loop()
+    
+    def on_field(self, name: str, value: Any):
+        # Called from an LLM router thread
+        if name not in ("contact_name", "company") or self.future is not None:
+            return
+        self.fields[name] = value
+        if self.fields.get("contact_name") and "company" in self.fields:
+            self.key = (self.fields["contact_name"], self.fields["company"] or None)
+            cached = contact_cache.get(*self.key)
+            if cached is not None:
+                self.future = Future()
+                self.future.set_result(cached)
+            elif asyncio.iscoroutinefunction(db.find_contact):
+                self.future = asyncio.run_coroutine_threadsafe(db.find_contact(*self.key), self.loop)
+            else:
+                self.future = io_executor.submit(db.find_contact, *self.key)
+    
+    async def result(self, name: str, company: Optional[str]) -> Tuple[bool, Optional[int]]:
+        """(matched, contact_id): whether the early lookup was for this contact, and what it found"""
+        if self.future is None or self.key != (name, company or None):
+            return False, None
+        try:
+            contact_id = await asyncio.wrap_future(self.future)
+            contact_cache.put(name, company, contact_id)
+            return True, contact_id
+        except Exception as e:
+            print(f"Early contact lookup failed: {str(e)}")
+            return False, None
+
+# Set once the database turns out not to have ingest_crm_record
+_ingest_rpc_missing = False
+
+def _disable_atomic_ingest():
+    global _ingest_rpc_missing
+    if not _ingest_rpc_missing:
+        _ingest_rpc_missing = True
+        metrics.incr("ingest.atomic_unavailable")
+        print("ingest_crm_record not found in the database, saving ingests with separate requests; "
+              "re-run backend/setup_database.sql to enable atomic ingests")
+
+async def save_crm_record(crm_data: Dict[str, Any], activity_type: str,
+                          transcript: str, summary: str,
+                          lookup: Optional[ContactLookup] = None) -> Dict[str, Any]:
+    """
+    Persist extracted CRM data: find/create contact, log activity, create deal,
+    all in one transaction via the ingest_crm_record function unless
+    DB_ATOMIC_INGEST=0, the database lacks the function, or the activity is
+    written behind (ACTIVITY_WRITE_BEHIND=1)
+    
+    lookup: early contact lookup started during extraction, reused when
+    it was for the final contact name/company
+    
+    Returns dict with contact_id, activity_id, deal_id and degraded (the
+    parts of the extraction that fell back because an LLM call failed)
+    """
+    degraded = crm_data.pop(DEGRADED_KEY, [])
+    
+    contact = None
+    contact_id = None
+    if crm_data.get("contact_name"):
+        contact = {
+            "name": crm_data["contact_name"],
+            "company": crm_data.get("company"),
+            "email": crm_data.get("email"),
+            "phone": crm_data.get("phone")
+        }
+        matched, contact_id = await lookup.result(contact["name"], contact["company"]) if lookup else (False, None)
+        if matched:
+            metrics.incr("ingest.early_contact_lookups")
+        else:
+            contact_id = contact_cache.get(contact["name"], contact["company"])
+    
+    deal = None
+    if crm_data.get("deal_value") or crm_data.get("next_step"):
+        deal = {
+            "deal_value": crm_data.get("deal_value"),
+            "next_step": crm_data.get("next_step"),
+            "follow_up_date": crm_data.get("follow_up_date"),
+            "notes": crm_data.get("notes")
+        }
+    
+    ids = None
+    if DB_ATOMIC_INGEST and not ACTIVITY_WRITE_BEHIND and not _ingest_rpc_missing:
+        try:
+            ids = await run_db(
+                db.ingest_crm_record,
+                activity_type=activity_type,
+                transcript=transcript,
+                summary=summary,
+                contact=contact,
+                contact_id=contact_id,
+                deal=deal
+            )
+        except Exception as e:
+            if not missing_function(e):
+                raise
+            _disable_atomic_ingest()
+    if ids is None:
+        ids = await _save_crm_record_steps(contact, contact_id, deal, activity_type, transcript, summary)
+    if contact:
+        contact_cache.put(contact["name"], contact["company"], ids["contact_id"])
+    
+    if degraded:
+        metrics.incr("ingest.degraded")
+    
+    return {
+        "contact_id": ids["contact_id"],
+        "activity_id": ids["activity_id"],
+        "deal_id": ids["deal_id"],
+        "degraded": degraded
+    }
+
+async def _save_crm_record_steps(contact: Optional[Dict[str, Any]], contact_id: Optional[int],
+                                 deal: Optional[Dict[str, Any]], activity_type: str,
+                                 transcript: str, summary: str) -> Dict[str, Optional[int]]:
+    """save_crm_record with separate requests per table, or a buffered activity"""
+    # Create or find contact
+    if contact and contact_id is None:
+        contact_id = await run_db(db.find_or_create_contact, **contact)
+    
+    # Log activity
+    if ACTIVITY_WRITE_BEHIND:
+        activity_id = await activity_buffer.add(activity_row(activity_type, transcript, summary, contact_id))
+    else:
+        activity = await run_db(
+            db.create_activity,
+            activity_type=activity_type,
+            transcript=transcript,
+            summary=summary,
+            contact_id=contact_id
+        )
+        activity_id = activity["id"]
+    
+    # Create deal if relevant
+    created = None
+    if contact_id and deal:
+        created = await run_db(db.create_deal, contact_id=contact_id, **deal)
+    
+    return {
+        "contact_id": contact_id,
+        "activity_id": activity_id,
+        "deal_id": created["id"] if created else None
+    }
+
+async def process_audio_job(job: Job, tmp_path: str, filename: str) -> Dict[str, Any]:
+    """
+    Background pipeline for an uploaded recording:
+    transcribe -> extract -> save, reporting each stage on the job
+    """
+    try:
+        await registry.ensure("stt", "llm", "db")
+        
+        # Transcribe audio
+        job.update("transcribing", 0.1)
+        print(f"Transcribing audio file: {filename}")
+        transcription = await stt_pool.transcribe_async(tmp_path)
+        transcript_text = transcription["text"]
+    finally:
+        # Clean up temp file
+        await run_io(_remove_file, tmp_path)
+    
+    # Extract CRM data and summary using LLM
+    job.update("extracting", 0.6)
+    print(f"Extracting CRM data from transcript...")
+    lookup = ContactLookup()
+    crm_data, summary = await run_io(llm_extractor.extract_all, transcript_text, on_field=lookup.on_field)
+    
+    # Save to database
+    job.update("saving", 0.9)
+    print(f"Saving to database...")
+    record = await save_crm_record(crm_data, "call", transcript_text, summary, lookup)
+    
+    return {
+        "success": True,
+        "transcript": transcript_text,
+        "summary": summary,
+        "extracted_data": crm_data,
+        **record
+    }
+
 # ==================== Routes ====================
 
 @app.get("/")
@@ -48,238 +520,458 @@ async def root():
         "message": "Zero-Click CRM API",
         "version": "1.0.0",
         "endpoints": {
+            "healthz": "/healthz",
+            "readyz": "/readyz",
+            "metrics": "/metrics",
             "upload_audio": "/upload_audio",
+            "jobs": "/jobs/{job_id}",
+            "transcribe_stream": "/ws/transcribe",
             "process_text": "/process_text",
             "contacts": "/contacts",
             "deals": "/deals",
             "activities": "/activities",
             "query": "/query",
             "process_email": "/process_email",
+            "process_batch": "/process_batch",
             "sample_emails": "/sample_emails"
         }
     }
 
-@app.post("/upload_audio")
-async def upload_audio(file: UploadFile = File(...)):
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: per-subsystem load status; 503 until preloaded services are ready"""
+    readiness = registry.readiness()
+    readiness["services"]["stt"]["pool"] = stt_pool.health()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and latency summaries (cache hit rates, etc.)"""
+    return metrics.snapshot()
+
+@app.post("/upload_audio", openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {
+    "schema": {"type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}}}
+}}}})
+async def upload_audio(request: Request):
     """
-    Upload audio file, transcribe it, and extract CRM data
+    Upload audio file and queue it for transcription and CRM extraction
+    
+    Returns a job id immediately; poll /jobs/{job_id} or stream
+    /jobs/{job_id}/events for progress and the final activity_id/deal_id
     """
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        # Stream uploaded file to disk as the body arrives
+        tmp_path, filename = await save_upload_to_temp(request)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadFormError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"Error saving audio upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    try:
+        job = job_manager.submit("upload_audio", process_audio_job, tmp_path, filename,
+                                 on_cancel=lambda: _remove_file(tmp_path))
+    except QueueFullError as e:
+        await run_io(_remove_file, tmp_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        await run_io(_remove_file, tmp_path)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    })
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get status, current stage and result of a background job"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events stream of job progress until it finishes"""
+    if not job_manager.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_manager.stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/transcribe")
+async def stream_transcription(websocket: WebSocket, language: Optional[str] = None,
+                               source: str = "call"):
+    """
+    Live transcription of audio that is still being recorded
+    
+    Client sends binary frames of 16 kHz mono little-endian PCM16 audio
+    and a text frame "end" when done. Server sends {"type": "partial"}
+    messages as audio arrives, then {"type": "final"} with the same
+    payload as a completed /upload_audio job. CRM extraction and saving
+    run when the stream ends, even if the client has disconnected.
+    """
+    await websocket.accept()
+    try:
+        await registry.ensure("stt")
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1011)
+        return
+    transcriber = StreamingTranscriber(lambda samples: stt_pool.transcribe_async(samples, language))
+    connected = True
+    decode_task: Optional[asyncio.Task] = None
+    
+    async def send_partial():
+        try:
+            partial = await transcriber.partial()
+            if connected:
+                await websocket.send_json({"type": "partial", **partial})
+        except Exception as e:
+            print(f"Error decoding stream: {str(e)}")
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                transcriber.add_audio(message["bytes"])
+            elif message.get("text") == "end":
+                break
+            
+            # Only one decode per stream at a time; newer audio waits for the next one
+            if transcriber.ready_for_partial() and (decode_task is None or decode_task.done()):
+                decode_task = asyncio.create_task(send_partial())
+    except WebSocketDisconnect:
+        connected = False
+    except StreamTooLongError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+    
+    try:
+        if decode_task:
+            await decode_task
+        if transcriber.total_samples == 0:
+            if connected:
+                await websocket.send_json({"type": "error", "detail": "No audio received"})
+                await websocket.close()
+            return
         
-        # Transcribe audio
-        print(f"Transcribing audio file: {file.filename}")
-        transcription = stt.transcribe_audio(tmp_path)
+        transcription = await transcriber.finish()
         transcript_text = transcription["text"]
         
-        # Extract CRM data using LLM
-        print(f"Extracting CRM data from transcript...")
-        crm_data = llm_extractor.extract_crm_data(transcript_text)
-        
-        # Generate summary
-        summary = llm_extractor.generate_summary(transcript_text)
-        
-        # Save to database
-        print(f"Saving to database...")
-        
-        # Create or find contact
-        contact_id = None
-        if crm_data.get("contact_name"):
-            contact_id = db.find_or_create_contact(
-                name=crm_data["contact_name"],
-                company=crm_data.get("company"),
-                email=crm_data.get("email"),
-                phone=crm_data.get("phone")
-            )
-        
-        # Log activity
-        activity = db.create_activity(
-            activity_type="call",
-            transcript=transcript_text,
-            summary=summary,
-            contact_id=contact_id
-        )
-        
-        # Create deal if relevant
-        deal = None
-        if contact_id and (crm_data.get("deal_value") or crm_data.get("next_step")):
-            deal = db.create_deal(
-                contact_id=contact_id,
-                deal_value=crm_data.get("deal_value"),
-                next_step=crm_data.get("next_step"),
-                follow_up_date=crm_data.get("follow_up_date"),
-                notes=crm_data.get("notes")
-            )
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
-        
-        return {
-            "success": True,
-            "transcript": transcript_text,
-            "summary": summary,
-            "extracted_data": crm_data,
-            "contact_id": contact_id,
-            "activity_id": activity["id"],
-            "deal_id": deal["id"] if deal else None
-        }
+        await registry.ensure("llm", "db")
+        lookup = ContactLookup()
+        crm_data, summary = await run_io(llm_extractor.extract_all, transcript_text, on_field=lookup.on_field)
+        record = await save_crm_record(crm_data, source, transcript_text, summary, lookup)
         
+        if connected:
+            await websocket.send_json({
+                "type": "final",
+                "success": True,
+                "transcript": transcript_text,
+                "segments": transcription["segments"],
+                "summary": summary,
+                "extracted_data": crm_data,
+                **record
+            })
+            await websocket.close()
     except Exception as e:
-        print(f"Error processing audio: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Error finishing stream: {str(e)}")
+        if connected:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            await websocket.send_json({"type": "error", "detail": detail})
+            await websocket.close(code=1011)
 
-@app.post("/process_text")
+@app.post("/process_text", dependencies=[Depends(registry.require("llm", "db"))])
 async def process_text(input_data: TextInput):
     """
     Process raw text (from email, manual entry, etc.) and extract CRM data
+    
+    Identical requests that arrive while one is in progress share its result.
     """
     try:
-        text = input_data.text
-        source = input_data.source
-        
-        # Extract CRM data
-        crm_data = llm_extractor.extract_crm_data(text)
-        summary = llm_extractor.generate_summary(text)
-        
-        # Save to database
-        contact_id = None
-        if crm_data.get("contact_name"):
-            contact_id = db.find_or_create_contact(
-                name=crm_data["contact_name"],
-                company=crm_data.get("company"),
-                email=crm_data.get("email"),
-                phone=crm_data.get("phone")
-            )
-        
-        # Log activity
-        activity = db.create_activity(
-            activity_type=source,
-            transcript=text,
-            summary=summary,
-            contact_id=contact_id
-        )
-        
-        # Create deal if relevant
-        deal = None
-        if contact_id and (crm_data.get("deal_value") or crm_data.get("next_step")):
-            deal = db.create_deal(
-                contact_id=contact_id,
-                deal_value=crm_data.get("deal_value"),
-                next_step=crm_data.get("next_step"),
-                follow_up_date=crm_data.get("follow_up_date"),
-                notes=crm_data.get("notes")
-            )
-        
-        return {
-            "success": True,
-            "summary": summary,
-            "extracted_data": crm_data,
-            "contact_id": contact_id,
-            "activity_id": activity["id"],
-            "deal_id": deal["id"] if deal else None
-        }
+        key = _content_key("process_text", input_data.source, input_data.text)
+        return await ingest_flight.do(key, _ingest_text, input_data.text, input_data.source)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/contacts")
-async def get_contacts():
-    """Get all contacts"""
-    try:
-        contacts = db.get_all_contacts()
-        return {"contacts": contacts}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _ingest_text(text: str, source: str) -> Dict[str, Any]:
+    # Extract CRM data and summary
+    lookup = ContactLookup()
+    crm_data, summary = await run_io(llm_extractor.extract_all, text, on_field=lookup.on_field)
+    
+    # Save to database
+    record = await save_crm_record(crm_data, source, text, summary, lookup)
+    
+    return {
+        "success": True,
+        "summary": summary,
+        "extracted_data": crm_data,
+        **record
+    }
 
-@app.get("/deals")
-async def get_deals():
-    """Get all deals"""
-    try:
-        deals = db.get_all_deals()
-        return {"deals": deals}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _list_page(table: str, method: Callable[..., Any], limit: Optional[int],
+                     after: Optional[int], fields: Optional[str]) -> Dict[str, Any]:
+    """
+    One page of a list endpoint, newest first
 
-@app.get("/activities")
-async def get_activities():
-    """Get all activities"""
+    next_after is the cursor for the following page (pass it as after), or
+    None on the last page; without limit every row is returned.
+    """
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
     try:
-        activities = db.get_all_activities()
-        return {"activities": activities}
+        rows = await run_db(method, limit=limit, after=after, fields=columns)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    next_after = rows[-1]["id"] if limit and len(rows) == limit else None
+    return {table: rows, "next_after": next_after}
+
+@app.get("/contacts", dependencies=[Depends(registry.require("db"))])
+async def get_contacts(limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT),
+                       after: Optional[int] = None, fields: Optional[str] = None):
+    """Get contacts, optionally a page at a time (limit/after) with only some fields"""
+    return await _list_page("contacts", db.get_all_contacts, limit, after, fields)
+
+@app.get("/deals", dependencies=[Depends(registry.require("db"))])
+async def get_deals(limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT),
+                    after: Optional[int] = None, fields: Optional[str] = None):
+    """Get deals, optionally a page at a time (limit/after) with only some fields"""
+    return await _list_page("deals", db.get_all_deals, limit, after, fields)
 
-@app.post("/process_email")
+@app.get("/activities", dependencies=[Depends(registry.require("db"))])
+async def get_activities(limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT),
+                         after: Optional[int] = None, fields: Optional[str] = None):
+    """
+    Get activities, optionally a page at a time (limit/after) with only some fields
+    
+    e.g. /activities?limit=50&fields=type,summary,timestamp,contacts leaves out transcripts
+    """
+    return await _list_page("activities", db.get_all_activities, limit, after, fields)
+
+@app.post("/process_email", dependencies=[Depends(registry.require("llm", "db"))])
 async def process_email(email_input: EmailInput):
     """
     Process email content and extract CRM data
+    
+    Identical requests that arrive while one is in progress share its result.
     """
     try:
-        email_text = email_input.email_text
-        
-        # Parse email structure
-        parsed_email = email_parser.parse_email(email_text)
-        
-        # Use body for CRM extraction (or full text if no body)
-        text_to_analyze = parsed_email.get("body") or email_text
-        
-        # Extract CRM data
-        crm_data = llm_extractor.extract_crm_data(text_to_analyze)
-        summary = llm_extractor.generate_summary(text_to_analyze)
+        key = _content_key("process_email", email_input.email_text)
+        return await ingest_flight.do(key, _ingest_email, email_input.email_text)
         
-        # Override email if found in parsed data
-        if parsed_email.get("from_email") and not crm_data.get("email"):
-            crm_data["email"] = parsed_email["from_email"]
-        
-        # Override contact name if found
-        if parsed_email.get("from_name") and not crm_data.get("contact_name"):
-            crm_data["contact_name"] = parsed_email["from_name"]
-        
-        # Save to database
-        contact_id = None
-        if crm_data.get("contact_name"):
-            contact_id = db.find_or_create_contact(
-                name=crm_data["contact_name"],
-                company=crm_data.get("company"),
-                email=crm_data.get("email"),
-                phone=crm_data.get("phone")
-            )
-        
-        # Log activity
-        activity = db.create_activity(
-            activity_type="email",
-            transcript=text_to_analyze,
-            summary=summary,
-            contact_id=contact_id
-        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _ingest_email(email_text: str) -> Dict[str, Any]:
+    # Parse email and extract CRM data and summary
+    parsed_email, text_to_analyze, crm_data, summary = await extract_email(email_text)
+    
+    # Save to database
+    record = await save_crm_record(crm_data, "email", text_to_analyze, summary)
+    
+    return {
+        "success": True,
+        "parsed_email": parsed_email,
+        "summary": summary,
+        "extracted_data": crm_data,
+        **record
+    }
+
+async def _extract_batch_item(item: BatchItem, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Run extraction for one batch item, bounded by the shared semaphore"""
+    async with semaphore:
+        if item.type == "email":
+            _, text_to_analyze, crm_data, summary = await extract_email(item.text)
+            activity_type = "email"
+        else:
+            text_to_analyze = item.text
+            crm_data, summary = await run_io(llm_extractor.extract_all, text_to_analyze)
+            activity_type = item.source or "text"
+    
+    return {
+        "crm_data": crm_data,
+        "summary": summary,
+        "activity_type": activity_type,
+        "transcript": text_to_analyze
+    }
+
+async def _extract_batch_chunk(chunk: List[BatchItem], semaphore: asyncio.Semaphore) -> List[Any]:
+    """
+    Extract a chunk of batch items: text items are packed several per LLM
+    request (llm_extractor.extract_batch), emails go through the email
+    fast path one by one. Returns a result dict or exception per item.
+    """
+    outcomes: List[Any] = [None] * len(chunk)
+    texts = [i for i, item in enumerate(chunk) if item.type != "email"]
+    emails = [i for i, item in enumerate(chunk) if item.type == "email"]
+    
+    async def extract_texts():
+        try:
+            results = await run_io(llm_extractor.extract_batch, [chunk[i].text for i in texts])
+        except Exception as e:
+            for i in texts:
+                outcomes[i] = e
+            return
+        for i, (crm_data, summary) in zip(texts, results):
+            outcomes[i] = {
+                "crm_data": crm_data,
+                "summary": summary,
+                "activity_type": chunk[i].source or "text",
+                "transcript": chunk[i].text
+            }
+    
+    email_outcomes = await asyncio.gather(
+        extract_texts(),
+        *[_extract_batch_item(chunk[i], semaphore) for i in emails],
+        return_exceptions=True
+    )
+    for i, outcome in zip(emails, email_outcomes[1:]):
+        outcomes[i] = outcome
+    return outcomes
+
+async def resolve_contacts(contacts: List[Dict[str, Any]]) -> List[int]:
+    """
+    Contact ids for many contacts: from the contact cache where possible,
+    the rest with one find_or_create_contacts call
+    """
+    ids: Dict[Tuple[str, str], Optional[int]] = {}
+    missing: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for contact in contacts:
+        key = contact_key(contact["name"], contact.get("company"))
+        if key not in ids:
+            ids[key] = contact_cache.get(contact["name"], contact.get("company"))
+            if ids[key] is None:
+                missing[key] = contact
+    if missing:
+        # Sorted so concurrent batches take row locks in the same order
+        keys = sorted(missing)
+        resolved = await run_db(db.find_or_create_contacts, [missing[key] for key in keys])
+        for key, contact_id in zip(keys, resolved):
+            ids[key] = contact_id
+            contact_cache.put(missing[key]["name"], missing[key].get("company"), contact_id)
+    return [ids[contact_key(c["name"], c.get("company"))] for c in contacts]
+
+async def _save_batch_chunk(extracted: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Persist a chunk of extracted items with multi-row writes:
+    one contact resolution, one activity insert (or buffered), one deal insert
+    """
+    for e in extracted:
+        e["degraded"] = e["crm_data"].pop(DEGRADED_KEY, [])
+        if e["degraded"]:
+            metrics.incr("ingest.degraded")
+    with_contact = [e for e in extracted if e["crm_data"].get("contact_name")]
+    contact_ids = await resolve_contacts([{
+        "name": e["crm_data"]["contact_name"],
+        "company": e["crm_data"].get("company"),
+        "email": e["crm_data"].get("email"),
+        "phone": e["crm_data"].get("phone")
+    } for e in with_contact])
+    for e, contact_id in zip(with_contact, contact_ids):
+        e["contact_id"] = contact_id
+    
+    if ACTIVITY_WRITE_BEHIND:
+        activity_ids = await activity_buffer.add_many([
+            activity_row(e["activity_type"], e["transcript"], e["summary"], e.get("contact_id"))
+            for e in extracted
+        ])
+    else:
+        activities = await run_db(db.create_activities, [{
+            "activity_type": e["activity_type"],
+            "transcript": e["transcript"],
+            "summary": e["summary"],
+            "contact_id": e.get("contact_id")
+        } for e in extracted])
+        activity_ids = [activity["id"] for activity in activities]
+    
+    # Create deal if relevant
+    with_deal = [e for e in extracted
+                 if e.get("contact_id") and (e["crm_data"].get("deal_value") or e["crm_data"].get("next_step"))]
+    deals = await run_db(db.create_deals, [{
+        "contact_id": e["contact_id"],
+        "deal_value": e["crm_data"].get("deal_value"),
+        "next_step": e["crm_data"].get("next_step"),
+        "follow_up_date": e["crm_data"].get("follow_up_date"),
+        "notes": e["crm_data"].get("notes")
+    } for e in with_deal])
+    for e, deal in zip(with_deal, deals):
+        e["deal_id"] = deal["id"]
+    
+    return [{
+        "success": True,
+        "summary": e["summary"],
+        "extracted_data": e["crm_data"],
+        "contact_id": e.get("contact_id"),
+        "activity_id": activity_id,
+        "deal_id": e.get("deal_id"),
+        "degraded": e["degraded"]
+    } for e, activity_id in zip(extracted, activity_ids)]
+
+async def _process_batch_stream(items: List[BatchItem]):
+    """Yield one NDJSON line per item as each chunk is saved"""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk = items[start:start + BATCH_CHUNK_SIZE]
+        outcomes = await _extract_batch_chunk(chunk, semaphore)
         
-        # Create deal if relevant
-        deal = None
-        if contact_id and (crm_data.get("deal_value") or crm_data.get("next_step")):
-            deal = db.create_deal(
-                contact_id=contact_id,
-                deal_value=crm_data.get("deal_value"),
-                next_step=crm_data.get("next_step"),
-                follow_up_date=crm_data.get("follow_up_date"),
-                notes=crm_data.get("notes")
-            )
+        results: Dict[int, Dict[str, Any]] = {}
+        ok = [(i, o) for i, o in enumerate(outcomes) if not isinstance(o, BaseException)]
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                results[i] = {"success": False, "error": str(outcome)}
         
-        return {
-            "success": True,
-            "parsed_email": parsed_email,
-            "summary": summary,
-            "extracted_data": crm_data,
-            "contact_id": contact_id,
-            "activity_id": activity["id"],
-            "deal_id": deal["id"] if deal else None
-        }
+        try:
+            saved = await _save_batch_chunk([o for _, o in ok])
+            for (i, _), result in zip(ok, saved):
+                results[i] = result
+        except Exception as e:
+            print(f"Error saving batch chunk: {str(e)}")
+            for i, _ in ok:
+                results[i] = {"success": False, "error": str(e)}
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        for i, item in enumerate(chunk):
+            yield json.dumps({"index": start + i, "id": item.id, **results[i]}) + "\n"
+
+@app.post("/process_batch", dependencies=[Depends(registry.require("llm", "db"))])
+async def process_batch(batch_input: BatchInput):
+    """
+    Process many texts/emails in one request
+    
+    Short texts are extracted several per LLM request, emails with bounded
+    concurrency, and each chunk of items is saved with multi-row inserts. Results are streamed back as
+    newline-delimited JSON, one line per item in input order.
+    """
+    items = batch_input.items
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    for item in items:
+        if item.type not in ("text", "email"):
+            raise HTTPException(status_code=422, detail=f"Unsupported item type: {item.type}")
+    
+    return StreamingResponse(_process_batch_stream(items), media_type="application/x-ndjson")
 
 @app.get("/sample_emails")
 async def get_sample_emails():
@@ -290,7 +982,7 @@ async def get_sample_emails():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/query")
+@app.post("/query", dependencies=[Depends(registry.require("query", "db"))])
 async def natural_language_query(query_input: QueryInput):
     """
     Execute natural language query on CRM data
@@ -300,13 +992,15 @@ async def natural_language_query(query_input: QueryInput):
         query = query_input.query
         
         # Convert query to filters
-        filters = query_agent.natural_language_to_filter(query)
+        filters = await run_io(query_agent.natural_language_to_filter, query)
+        # Set when the LLM call failed and results are unfiltered
+        degraded = bool(filters.pop(DEGRADED_KEY, False))
         
         # Get appropriate data
         if filters.get("table") == "contacts":
-            data = db.get_all_contacts()
+            data = await run_db(db.get_all_contacts)
         else:
-            data = db.get_all_deals()
+            data = await run_db(db.get_all_deals)
         
         # Apply filters
         filtered_data = query_agent.apply_filters(data, filters)
@@ -315,7 +1009,8 @@ async def natural_language_query(query_input: QueryInput):
             "query": query,
             "filters_applied": filters,
             "results": filtered_data,
-            "count": len(filtered_data)
+            "count": len(filtered_data),
+            "degraded": degraded
         }
         
     except Exception as e:
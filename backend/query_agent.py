@@ -2,33 +2,20 @@
 Query Agent module
 Converts natural language queries to database operations
 """
-import os
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
+from json_stream import parse_json_text
+from llm_extraction import DEGRADED_KEY
+from llm_providers import create_provider
+from llm_router import LLMRouter, get_llm_router
+from metrics import metrics
+
 load_dotenv()
 
-class QueryAgent:
-    def __init__(self, provider: str = "anthropic"):
-        """Initialize query agent with LLM"""
-        self.provider = provider.lower()
-        
-        if self.provider == "anthropic":
-            import anthropic
-            self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-            self.model = "claude-3-5-sonnet-20241022"
-        elif self.provider == "openai":
-            import openai
-            self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            self.model = "gpt-4-turbo-preview"
-    
-    def natural_language_to_filter(self, query: str) -> Dict[str, Any]:
-        """
-        Convert natural language query to filter parameters
-        
-        Returns a dict with filter criteria that can be applied to data
-        """
-        prompt = f"""Convert this user query into structured filter parameters for a CRM database.
+# Static instructions sent as the (cacheable) system prefix; only the query varies
+QUERY_SYSTEM = """Convert the user's query into structured filter parameters for a CRM database.
 
 Database schema:
 - contacts: id, name, company, email, phone, created_at
@@ -45,43 +32,55 @@ Return ONLY a JSON object with these optional keys:
 - stage: deal stage
 - has_follow_up: boolean
 
-Query: "{query}"
-
 Return ONLY the JSON object."""
 
+# Structured output schema for natural_language_to_filter
+FILTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table": {"type": "string", "enum": ["contacts", "deals"]},
+        "company": {"type": ["string", "null"]},
+        "deal_value_min": {"type": ["number", "null"]},
+        "deal_value_max": {"type": ["number", "null"]},
+        "date_from": {"type": ["string", "null"], "description": "YYYY-MM-DD"},
+        "date_to": {"type": ["string", "null"], "description": "YYYY-MM-DD"},
+        "name_contains": {"type": ["string", "null"]},
+        "stage": {"type": ["string", "null"]},
+        "has_follow_up": {"type": ["boolean", "null"]}
+    },
+    "required": ["table"]
+}
+
+class QueryAgent:
+    def __init__(self, provider: Optional[str] = None, router: Optional[LLMRouter] = None):
+        """Initialize query agent with LLM (the shared router unless provider is given)"""
+        if router is None:
+            router = LLMRouter([create_provider(provider)]) if provider else get_llm_router()
+        self.router = router
+        self.provider = router.name
+        self.model = router.model
+    
+    def natural_language_to_filter(self, query: str) -> Dict[str, Any]:
+        """
+        Convert natural language query to filter parameters
+        
+        Returns a dict with filter criteria that can be applied to data
+        """
+        prompt = f'Query: "{query}"'
+
         try:
-            if self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=512,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                content = response.content[0].text
-            elif self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0
-                )
-                content = response.choices[0].message.content
-            
-            # Clean and parse JSON
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            import json
-            filters = json.loads(content)
+            content = self.router.complete(prompt, max_tokens=512, temperature=0,
+                                           system=QUERY_SYSTEM, schema=FILTER_SCHEMA)
+            filters = parse_json_text(content)
+            if not isinstance(filters, dict):
+                raise ValueError("Expected a JSON object of filters")
             return filters
             
         except Exception as e:
             print(f"Error converting query: {str(e)}")
-            return {"table": "deals"}
+            metrics.incr("llm.degraded.query")
+            # Unfiltered deals, flagged so the caller can report it
+            return {"table": "deals", DEGRADED_KEY: True}
     
     def apply_filters(self, data: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Apply filter parameters to dataset"""
@@ -119,8 +118,23 @@ Return ONLY the JSON object."""
         
         return filtered
 
-# Global query agent
-try:
-    query_agent = QueryAgent(provider="anthropic")
-except Exception:
-    query_agent = QueryAgent(provider="openai")
+# Global query agent, created on first use
+_query_agent: Optional[QueryAgent] = None
+_query_agent_lock = threading.Lock()
+
+def create_query_agent() -> QueryAgent:
+    """Create a query agent routing across every configured provider"""
+    return QueryAgent()
+
+def get_query_agent() -> QueryAgent:
+    global _query_agent
+    with _query_agent_lock:
+        if _query_agent is None:
+            _query_agent = create_query_agent()
+        return _query_agent
+
+def __getattr__(name: str):
+    # Keeps `from query_agent import query_agent` working
+    if name == "query_agent":
+        return get_query_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
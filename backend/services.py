@@ -0,0 +1,128 @@
+"""
+Service registry module
+Lazy, parallel initialization of backend services with readiness tracking
+"""
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from concurrency import io_executor
+
+# Services loaded in the background at startup; others load on first use.
+# A text-only deployment can drop "stt" so the Whisper model is never loaded.
+PRELOAD_SERVICES = [name.strip() for name in os.getenv("PRELOAD_SERVICES", "db,llm,query,stt").split(",")
+                    if name.strip()]
+
+
+class Service:
+    """A lazily created backend dependency"""
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.status = "not_loaded"  # not_loaded | loading | ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._instance: Any = None
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Any:
+        start = time.perf_counter()
+        try:
+            instance = self.loader()
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            self.load_seconds = time.perf_counter() - start
+            print(f"Service '{self.name}' failed to load: {str(e)}")
+            raise
+        self._instance = instance
+        self.status = "ready"
+        self.error = None
+        self.load_seconds = time.perf_counter() - start
+        print(f"Service '{self.name}' ready in {self.load_seconds:.2f}s")
+        return instance
+
+    def load_async(self) -> Future:
+        """Start loading on the I/O pool (once) and return the shared future"""
+        with self._lock:
+            # A failed load is retried on the next request
+            if self._future is None or (self._future.done() and self.status == "failed"):
+                self.status = "loading"
+                self._future = io_executor.submit(self._load)
+            return self._future
+
+    def get(self) -> Any:
+        """Return the instance, loading it in the calling thread if needed"""
+        if self.status == "ready":
+            return self._instance
+        return self.load_async().result()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error
+        }
+
+
+class ServiceProxy:
+    """Module-level stand-in that forwards attribute access to the loaded service"""
+
+    def __init__(self, service: Service):
+        self._service = service
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service.get(), name)
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self.services: Dict[str, Service] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> ServiceProxy:
+        self.services[name] = Service(name, loader)
+        return ServiceProxy(self.services[name])
+
+    def preload(self, names: List[str] = PRELOAD_SERVICES):
+        """Start loading services in parallel without waiting for them"""
+        for name in names:
+            if name in self.services:
+                self.services[name].load_async()
+
+    async def ensure(self, *names: str):
+        """
+        Wait until the named services are loaded, without blocking the loop
+
+        Raises HTTPException(503) if a service cannot be loaded
+        """
+        for name in names:
+            service = self.services[name]
+            if service.status == "ready":
+                continue
+            try:
+                await asyncio.wrap_future(service.load_async())
+            except Exception as e:
+                raise HTTPException(status_code=503, detail=f"Service '{name}' unavailable: {str(e)}")
+
+    def require(self, *names: str):
+        """FastAPI dependency that waits for the named services"""
+        async def dependency():
+            await self.ensure(*names)
+        return dependency
+
+    def readiness(self, names: List[str] = PRELOAD_SERVICES) -> Dict[str, Any]:
+        """Per-service status; ready when every preloaded service is ready"""
+        statuses = {name: service.to_dict() for name, service in self.services.items()}
+        ready = all(self.services[name].status == "ready" for name in names if name in self.services)
+        return {"ready": ready, "services": statuses}
+
+
+# Global service registry
+registry = ServiceRegistry()
@@ -4,6 +4,12 @@ Run this to create the necessary tables in your Supabase database
 """
 
 SETUP_SQL = """
+-- Trimmed, lower-cased, single-spaced form of a contact name or company
+-- (contact_cache.normalize_contact_part in the backend does the same)
+CREATE OR REPLACE FUNCTION normalize_contact_part(p_value TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$ SELECT lower(regexp_replace(btrim(coalesce(p_value, '')), '[[:space:]]+', ' ', 'g')) $$;
+
 -- Create contacts table
 CREATE TABLE IF NOT EXISTS contacts (
     id BIGSERIAL PRIMARY KEY,
@@ -11,9 +17,15 @@ CREATE TABLE IF NOT EXISTS contacts (
     company VARCHAR(255),
     email VARCHAR(255),
     phone VARCHAR(50),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    name_key TEXT GENERATED ALWAYS AS (normalize_contact_part(name)) STORED,
+    company_key TEXT GENERATED ALWAYS AS (normalize_contact_part(company)) STORED
 );
 
+-- Contacts tables created before the unique contact key
+ALTER TABLE contacts ADD COLUMN IF NOT EXISTS name_key TEXT GENERATED ALWAYS AS (normalize_contact_part(name)) STORED;
+ALTER TABLE contacts ADD COLUMN IF NOT EXISTS company_key TEXT GENERATED ALWAYS AS (normalize_contact_part(company)) STORED;
+
 -- Create deals table
 CREATE TABLE IF NOT EXISTS deals (
     id BIGSERIAL PRIMARY KEY,
@@ -44,6 +56,28 @@ CREATE INDEX IF NOT EXISTS idx_deals_follow_up_date ON deals(follow_up_date);
 CREATE INDEX IF NOT EXISTS idx_activities_contact_id ON activities(contact_id);
 CREATE INDEX IF NOT EXISTS idx_activities_timestamp ON activities(timestamp);
 
+-- Merge contacts that share a key into the oldest one, then make the key unique.
+-- The kept row first takes the email/phone it lacks from its duplicates (oldest first).
+UPDATE contacts c
+SET email = COALESCE(c.email, m.email), phone = COALESCE(c.phone, m.phone)
+FROM (SELECT keep_id,
+             (array_agg(email ORDER BY id) FILTER (WHERE email IS NOT NULL))[1] AS email,
+             (array_agg(phone ORDER BY id) FILTER (WHERE phone IS NOT NULL))[1] AS phone
+      FROM (SELECT id, email, phone, min(id) OVER (PARTITION BY name_key, company_key) AS keep_id FROM contacts) k
+      WHERE id <> keep_id
+      GROUP BY keep_id) m
+WHERE c.id = m.keep_id AND (c.email IS NULL OR c.phone IS NULL);
+UPDATE deals d SET contact_id = k.keep_id
+FROM (SELECT id, min(id) OVER (PARTITION BY name_key, company_key) AS keep_id FROM contacts) k
+WHERE d.contact_id = k.id AND k.id <> k.keep_id;
+UPDATE activities a SET contact_id = k.keep_id
+FROM (SELECT id, min(id) OVER (PARTITION BY name_key, company_key) AS keep_id FROM contacts) k
+WHERE a.contact_id = k.id AND k.id <> k.keep_id;
+DELETE FROM contacts c
+USING (SELECT id, min(id) OVER (PARTITION BY name_key, company_key) AS keep_id FROM contacts) k
+WHERE c.id = k.id AND k.id <> k.keep_id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_key ON contacts(name_key, company_key);
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE contacts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE deals ENABLE ROW LEVEL SECURITY;
@@ -78,6 +112,114 @@ CREATE POLICY "Enable insert for all users" ON activities FOR INSERT WITH CHECK
 
 DROP POLICY IF EXISTS "Enable update for all users" ON activities;
 CREATE POLICY "Enable update for all users" ON activities FOR UPDATE USING (true);
+
+-- Find or create a contact by its unique key in one statement, so
+-- concurrent callers get the same row. Without a company, any contact with
+-- the name matches (oldest first). Fills in a missing email/phone on an
+-- existing contact without overwriting one.
+CREATE OR REPLACE FUNCTION resolve_contact(
+    p_name VARCHAR,
+    p_company VARCHAR DEFAULT NULL,
+    p_email VARCHAR DEFAULT NULL,
+    p_phone VARCHAR DEFAULT NULL
+) RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_contact_id BIGINT;
+BEGIN
+    IF normalize_contact_part(p_company) = '' THEN
+        SELECT id INTO v_contact_id FROM contacts
+        WHERE name_key = normalize_contact_part(p_name)
+        ORDER BY id
+        LIMIT 1;
+        IF v_contact_id IS NOT NULL THEN
+            RETURN v_contact_id;
+        END IF;
+    END IF;
+
+    INSERT INTO contacts (name, company, email, phone)
+    VALUES (p_name, NULLIF(p_company, ''), p_email, p_phone)
+    ON CONFLICT (name_key, company_key) DO UPDATE
+        SET email = COALESCE(contacts.email, EXCLUDED.email),
+            phone = COALESCE(contacts.phone, EXCLUDED.phone)
+    RETURNING id INTO v_contact_id;
+    RETURN v_contact_id;
+END;
+$$;
+
+-- resolve_contact for a JSON array of {name, company, email, phone};
+-- returns the ids in the same order
+CREATE OR REPLACE FUNCTION resolve_contacts(p_contacts JSONB) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_contact JSONB;
+    v_ids JSONB := '[]'::jsonb;
+BEGIN
+    FOR v_contact IN SELECT value FROM jsonb_array_elements(p_contacts) WITH ORDINALITY ORDER BY ordinality LOOP
+        v_ids := v_ids || to_jsonb(resolve_contact(v_contact->>'name', v_contact->>'company',
+                                                   v_contact->>'email', v_contact->>'phone'));
+    END LOOP;
+    RETURN v_ids;
+END;
+$$;
+
+-- Ingest one extracted record in a single round trip and transaction:
+-- find or create the contact (resolve_contact), log the
+-- activity, and create a deal when p_create_deal is set and there is a
+-- contact. Returns {"contact_id", "activity_id", "deal_id"}.
+CREATE OR REPLACE FUNCTION ingest_crm_record(
+    p_activity_type VARCHAR,
+    p_transcript TEXT,
+    p_summary TEXT DEFAULT NULL,
+    p_contact_name VARCHAR DEFAULT NULL,
+    p_company VARCHAR DEFAULT NULL,
+    p_email VARCHAR DEFAULT NULL,
+    p_phone VARCHAR DEFAULT NULL,
+    p_contact_id BIGINT DEFAULT NULL,
+    p_create_deal BOOLEAN DEFAULT FALSE,
+    p_deal_value DECIMAL DEFAULT NULL,
+    p_next_step TEXT DEFAULT NULL,
+    p_follow_up_date DATE DEFAULT NULL,
+    p_notes TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_contact_id BIGINT := p_contact_id;
+    v_activity_id BIGINT;
+    v_deal_id BIGINT;
+BEGIN
+    IF v_contact_id IS NULL AND normalize_contact_part(p_contact_name) <> '' THEN
+        v_contact_id := resolve_contact(p_contact_name, p_company, p_email, p_phone);
+    END IF;
+
+    INSERT INTO activities (type, transcript, summary, contact_id)
+    VALUES (p_activity_type, p_transcript, p_summary, v_contact_id)
+    RETURNING id INTO v_activity_id;
+
+    IF p_create_deal AND v_contact_id IS NOT NULL THEN
+        INSERT INTO deals (contact_id, deal_value, next_step, follow_up_date, notes)
+        VALUES (v_contact_id, p_deal_value, p_next_step, p_follow_up_date, p_notes)
+        RETURNING id INTO v_deal_id;
+    END IF;
+
+    RETURN jsonb_build_object('contact_id', v_contact_id, 'activity_id', v_activity_id, 'deal_id', v_deal_id);
+END;
+$$;
+
+-- Hand out a block of activity ids for write-behind logging, which
+-- inserts the rows later with these ids
+CREATE OR REPLACE FUNCTION reserve_activity_ids(p_count INTEGER) RETURNS BIGINT[]
+LANGUAGE sql
+AS $$
+    SELECT array_agg(nextval(pg_get_serial_sequence('activities', 'id')))
+    FROM generate_series(1, p_count)
+$$;
+
+-- Let PostgREST pick up the new functions
+NOTIFY pgrst, 'reload schema';
 """
 
 print("=== Supabase Database Setup SQL ===")
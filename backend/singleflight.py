@@ -0,0 +1,94 @@
+"""
+Single-flight module
+Coalesces concurrent calls with the same key into one computation
+"""
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight: while a call for a key is running, other
+    threads asking for the same key wait for it and get a copy of its
+    result (or its exception) instead of running their own. The leader
+    gets a copy too, so the shared result is never modified while
+    followers are still copying it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Callers may modify what they get back, so each gets its own copy
+            return copy.deepcopy(call.result)
+
+        metrics.incr(f"singleflight.{self.name}.executed")
+        try:
+            call.result = fn(*args, **kwargs)
+            return copy.deepcopy(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight for coroutines on one event loop"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            # shield: a follower disconnecting must not cancel the leader's work
+            result = await asyncio.shield(future)
+            return copy.deepcopy(result)
+
+        metrics.incr(f"singleflight.{self.name}.executed")
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn(*args, **kwargs)
+            future.set_result(result)
+            # Followers copy the shared result once they resume; keep it untouched
+            return copy.deepcopy(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
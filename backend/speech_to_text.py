@@ -1,44 +1,162 @@
 """
 Speech-to-text module using OpenAI Whisper
-Handles audio transcription
+Handles audio transcription with a pluggable engine backend
 """
-import whisper
 import os
-from typing import Optional
+import io
+import asyncio
+import shutil
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, BinaryIO, Dict, Optional, Union
 import tempfile
 
+from concurrency import run_cpu
+from audio_chunking import SAMPLE_RATE, load_audio, merge_transcripts, split_audio
+
+# Copy buffer size used when spooling audio streams to disk
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+# Engine backend: whisper (reference PyTorch) or faster-whisper (CTranslate2)
+STT_ENGINE = os.getenv("STT_ENGINE", "whisper").lower()
+# Weight precision for engines that support quantization (int8, int8_float32, float32)
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+
+# Transcription worker processes; 0 transcribes in the API process instead.
+# Each worker loads its own model, all at startup, so the default stays
+# small; raise it as far as memory allows (about one model per worker)
+STT_WORKERS = int(os.getenv("STT_WORKERS", min(2, os.cpu_count() or 1)))
+# Jobs allowed in flight (running + queued) before callers have to wait
+STT_MAX_PENDING = int(os.getenv("STT_MAX_PENDING", max(1, STT_WORKERS) * 2))
+# Seconds a caller waits for a free slot before giving up
+STT_SUBMIT_TIMEOUT = float(os.getenv("STT_SUBMIT_TIMEOUT", 300))
+# Recordings longer than this are split at silences and transcribed in parallel
+STT_LONG_AUDIO_SECONDS = float(os.getenv("STT_LONG_AUDIO_SECONDS", 120))
+# Smallest chunk worth a separate job (Whisper decodes in 30s windows)
+STT_MIN_CHUNK_SECONDS = float(os.getenv("STT_MIN_CHUNK_SECONDS", 60))
+# Recycle a worker after this many jobs (0 = never)
+STT_MAX_TASKS_PER_CHILD = int(os.getenv("STT_MAX_TASKS_PER_CHILD", 0))
+
+# Audio input: a file path, or 16 kHz mono float32 samples
+AudioInput = Union[str, Any]
+
+# ==================== Engines ====================
+
+class STTEngine:
+    """
+    Base class for transcription backends
+    
+    Engines return {"text", "language", "segments"} where each segment has
+    at least id, start, end and text.
+    """
+    name = "base"
+    
+    def __init__(self, model_size: str, threads: Optional[int] = None):
+        self.model_size = model_size
+        self.threads = threads
+    
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> dict:
+        raise NotImplementedError
+
+
+class WhisperEngine(STTEngine):
+    """Reference openai-whisper model (PyTorch, fp32 on CPU)"""
+    name = "whisper"
+    
+    def __init__(self, model_size: str, threads: Optional[int] = None):
+        super().__init__(model_size, threads)
+        import whisper
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_size)
+    
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> dict:
+        options = {"language": language} if language else {}
+        result = self.model.transcribe(audio, **options)
+        return {
+            "text": result["text"],
+            "language": result.get("language", "unknown"),
+            "segments": result.get("segments", [])
+        }
+
+
+class FasterWhisperEngine(STTEngine):
+    """CTranslate2 Whisper with int8 quantized weights, much faster on CPU"""
+    name = "faster-whisper"
+    
+    def __init__(self, model_size: str, threads: Optional[int] = None,
+                 compute_type: str = STT_COMPUTE_TYPE):
+        super().__init__(model_size, threads)
+        from faster_whisper import WhisperModel
+        self.compute_type = compute_type
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                  cpu_threads=threads or 0)
+    
+    def transcribe(self, audio: AudioInput, language: Optional[str] = None) -> dict:
+        segments, info = self.model.transcribe(audio, language=language)
+        # segments is a lazy generator; decoding happens while we iterate
+        segment_dicts = [{
+            "id": segment.id,
+            "seek": segment.seek,
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "tokens": list(segment.tokens),
+            "temperature": segment.temperature,
+            "avg_logprob": segment.avg_logprob,
+            "compression_ratio": segment.compression_ratio,
+            "no_speech_prob": segment.no_speech_prob
+        } for segment in segments]
+        return {
+            "text": "".join(segment["text"] for segment in segment_dicts),
+            "language": info.language or "unknown",
+            "segments": segment_dicts
+        }
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine
+}
+
+def create_engine(engine: str, model_size: str, threads: Optional[int] = None) -> STTEngine:
+    """Instantiate an engine by name (see ENGINES)"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported STT engine: {engine}")
+    return ENGINES[engine](model_size, threads)
+
+# ==================== Speech to text ====================
+
 class SpeechToText:
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", engine: str = STT_ENGINE,
+                 threads: Optional[int] = None):
         """
-        Initialize Whisper model
+        Initialize Whisper model with the selected engine
         Available sizes: tiny, base, small, medium, large
         base is good for hackathon speed/accuracy balance
         """
-        print(f"Loading Whisper model: {model_size}")
-        self.model = whisper.load_model(model_size)
+        print(f"Loading Whisper model: {model_size} ({engine})")
+        self.engine = create_engine(engine, model_size, threads)
         print("Whisper model loaded successfully")
     
-    def transcribe_audio(self, audio_path: str, language: Optional[str] = None) -> dict:
+    def transcribe_audio(self, audio_path: AudioInput, language: Optional[str] = None) -> dict:
         """
         Transcribe audio file to text
         
         Args:
-            audio_path: Path to audio file (wav, mp3, m4a, etc.)
+            audio_path: Path to audio file (wav, mp3, m4a, etc.) or 16 kHz samples
             language: Optional language code (e.g., 'en', 'es')
         
         Returns:
             dict with 'text', 'language', 'segments' keys
         """
         try:
-            # Transcribe
-            options = {"language": language} if language else {}
-            result = self.model.transcribe(audio_path, **options)
-            
-            return {
-                "text": result["text"],
-                "language": result.get("language", "unknown"),
-                "segments": result.get("segments", [])
-            }
+            return self.engine.transcribe(audio_path, language)
         except Exception as e:
             print(f"Error transcribing audio: {str(e)}")
             raise
@@ -51,21 +169,236 @@ class SpeechToText:
             audio_bytes: Audio file as bytes
             format: Audio format extension (wav, mp3, etc.)
         
+        Returns:
+            dict with transcription results
+        """
+        return self.transcribe_from_stream(io.BytesIO(audio_bytes), format=format)
+    
+    def transcribe_from_stream(self, stream: BinaryIO, format: str = "wav",
+                               max_bytes: Optional[int] = None) -> dict:
+        """
+        Transcribe audio from a file-like object without buffering it in memory
+        
+        Args:
+            stream: Readable binary stream of the audio file
+            format: Audio format extension (wav, mp3, etc.)
+            max_bytes: Optional size limit; raises ValueError when exceeded
+        
         Returns:
             dict with transcription results
         """
         # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{format}") as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_path = tmp_file.name
+        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{format}")
+        tmp_path = tmp_file.name
         
         try:
-            result = self.transcribe_audio(tmp_path)
-            return result
+            with tmp_file:
+                if max_bytes is None:
+                    shutil.copyfileobj(stream, tmp_file, STREAM_CHUNK_SIZE)
+                else:
+                    written = 0
+                    while True:
+                        chunk = stream.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise ValueError(f"Audio exceeds maximum size of {max_bytes} bytes")
+                        tmp_file.write(chunk)
+            
+            return self.transcribe_audio(tmp_path)
         finally:
             # Clean up temporary file
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
 
-# Global instance
-stt = SpeechToText()
+# ==================== Worker pool ====================
+
+# Model instance owned by each worker process
+_worker_stt: Optional[SpeechToText] = None
+
+def _init_worker(model_size: str, engine: str, threads: int):
+    """Process pool initializer: load the model once per worker"""
+    global _worker_stt
+    _worker_stt = SpeechToText(model_size, engine=engine, threads=threads)
+
+def _worker_transcribe(audio_path: AudioInput, language: Optional[str]) -> dict:
+    return _worker_stt.transcribe_audio(audio_path, language)
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+class PoolBusyError(Exception):
+    """Raised when no transcription slot frees up within STT_SUBMIT_TIMEOUT"""
+
+
+class TranscriptionPool:
+    """
+    Pool of worker processes, each holding its own Whisper model
+    
+    At most max_pending jobs are in flight; further callers block until a
+    slot frees up. If a worker dies the pool is rebuilt and the job retried once.
+    Async callers wait on the pool's own dispatch threads, not the shared
+    I/O pool, so queued transcriptions can't starve database and LLM calls.
+    """
+    
+    def __init__(self, workers: int = STT_WORKERS, model_size: str = WHISPER_MODEL,
+                 engine: str = STT_ENGINE, max_pending: int = STT_MAX_PENDING, submit_timeout: float = STT_SUBMIT_TIMEOUT,
+                 max_tasks_per_child: int = STT_MAX_TASKS_PER_CHILD):
+        self.workers = workers
+        self.model_size = model_size
+        self.engine = engine
+        self.submit_timeout = submit_timeout
+        self.max_tasks_per_child = max_tasks_per_child or None
+        # Split cores between workers instead of every worker using all of them
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // max(1, workers))
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # More dispatch threads than slots would only wait for a slot
+        self._dispatch = ThreadPoolExecutor(max_workers=max(1, max_pending), thread_name_prefix="stt-dispatch")
+    
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that has model runtimes/threads loaded is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_size, self.engine, self.threads_per_worker),
+            max_tasks_per_child=self.max_tasks_per_child
+        )
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            return self._executor
+    
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a broken executor (only once if several callers notice)"""
+        with self._lock:
+            if self._executor is broken:
+                print("Transcription worker died, restarting pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+                self.restarts += 1
+    
+    def start(self):
+        """Spawn the workers so models load ahead of the first request"""
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_worker_ping) for _ in range(self.workers)]:
+            future.result()
+        print(f"Transcription pool started with {self.workers} workers")
+    
+    def transcribe(self, audio_path: AudioInput, language: Optional[str] = None) -> dict:
+        """Transcribe a file or samples on a worker, blocking while the pool is saturated"""
+        if self.workers <= 0:
+            return get_stt().transcribe_audio(audio_path, language)
+        
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            raise PoolBusyError("Transcription pool is busy, try again later")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    result = executor.submit(_worker_transcribe, audio_path, language).result()
+                    with self._lock:
+                        self.completed += 1
+                    return result
+                except BrokenProcessPool:
+                    self._restart(executor)
+                    if attempt == 1:
+                        raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+    
+    def transcribe_long(self, audio_path: AudioInput, language: Optional[str] = None) -> dict:
+        """
+        Transcribe a recording, splitting long audio at silences and
+        transcribing the chunks in parallel across workers
+        
+        Audio up to STT_LONG_AUDIO_SECONDS goes to a single worker. Longer
+        audio is cut into about one chunk per worker (at least
+        STT_MIN_CHUNK_SECONDS each) and the results are stitched back
+        together with timestamps shifted to the original timeline.
+        """
+        if self.workers <= 1:
+            return self.transcribe(audio_path, language)
+        
+        samples = load_audio(audio_path) if isinstance(audio_path, str) else audio_path
+        duration = len(samples) / SAMPLE_RATE
+        if duration <= STT_LONG_AUDIO_SECONDS:
+            return self.transcribe(samples, language)
+        
+        target = max(STT_MIN_CHUNK_SECONDS, duration / self.workers)
+        chunks = split_audio(samples, target_seconds=target, max_seconds=target * 1.5)
+        print(f"Transcribing {duration:.0f}s of audio as {len(chunks)} chunks")
+        
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.workers)) as dispatch:
+            results = list(dispatch.map(lambda chunk: self.transcribe(chunk[1], language), chunks))
+        return merge_transcripts(results, [offset for offset, _ in chunks])
+    
+    async def transcribe_async(self, audio_path: AudioInput, language: Optional[str] = None) -> dict:
+        """Transcribe from the event loop without blocking it"""
+        if self.workers <= 0:
+            return await run_cpu(get_stt().transcribe_audio, audio_path, language)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._dispatch, self.transcribe_long, audio_path, language)
+    
+    def health(self) -> Dict[str, Any]:
+        """Pool status for health checks"""
+        return {
+            "workers": self.workers,
+            "engine": self.engine,
+            "running": self._executor is not None,
+            "in_flight": self.in_flight,
+            "max_pending": self._max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts
+        }
+    
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# In-process instance, created on first use so worker processes and
+# pool-only deployments don't load an extra model
+_stt: Optional[SpeechToText] = None
+_stt_lock = threading.Lock()
+
+def get_stt() -> SpeechToText:
+    """Return the in-process SpeechToText, loading the model on first call"""
+    global _stt
+    with _stt_lock:
+        if _stt is None:
+            _stt = SpeechToText(WHISPER_MODEL, engine=STT_ENGINE)
+        return _stt
+
+def __getattr__(name: str):
+    # Keeps `from speech_to_text import stt` working
+    if name == "stt":
+        return get_stt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Global transcription pool
+stt_pool = TranscriptionPool()
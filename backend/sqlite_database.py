@@ -0,0 +1,361 @@
+"""
+SQLite database module
+Embedded storage for single-node deployments and offline benchmarks:
+the same CRM operations as the Supabase client on a local file, no
+server or credentials needed (DB_CLIENT=sqlite)
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Iterator
+
+from contact_cache import normalize_contact_part
+from database import LIST_COLUMNS, activity_row, list_fields
+from storage import Storage
+
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(os.path.dirname(__file__), ".cache", "crm.db"))
+# NORMAL: a commit survives a crash of the app, the last ones may be lost on power failure
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+
+# Same tables and keys as setup_database.sql. name_key/company_key are filled
+# in by the client (normalize_contact_part) rather than generated, so the
+# file stays readable by tools that don't have the function.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    company TEXT,
+    email TEXT,
+    phone TEXT,
+    created_at TEXT,
+    name_key TEXT NOT NULL,
+    company_key TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS deals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    contact_id INTEGER REFERENCES contacts(id) ON DELETE CASCADE,
+    deal_value REAL,
+    stage TEXT DEFAULT 'initial',
+    next_step TEXT,
+    follow_up_date TEXT,
+    notes TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    transcript TEXT,
+    summary TEXT,
+    contact_id INTEGER REFERENCES contacts(id) ON DELETE SET NULL,
+    timestamp TEXT
+);
+
+-- Contact resolution (name, company) and name-only lookups (name prefix)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_key ON contacts(name_key, company_key);
+CREATE INDEX IF NOT EXISTS idx_deals_contact_id ON deals(contact_id);
+-- Follow-up and value filters of the query agent
+CREATE INDEX IF NOT EXISTS idx_deals_follow_up ON deals(follow_up_date, deal_value);
+CREATE INDEX IF NOT EXISTS idx_activities_contact ON activities(contact_id, timestamp);
+"""
+
+
+class SQLiteDatabaseClient(Storage):
+    """
+    Storage in a local SQLite file (WAL mode)
+
+    One connection shared by the I/O pool threads behind a lock: SQLite
+    writes one transaction at a time anyway, and each call is a few
+    microseconds of local I/O rather than a network round trip.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_PATH, synchronous: str = SQLITE_SYNCHRONOUS):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA_SQL)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """The connection inside BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        cursor = conn.execute(f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                              tuple(row.values()))
+        return {**row, 'id': cursor.lastrowid}
+
+    # ==================== CONTACTS ====================
+
+    def _resolve_contact(self, conn: sqlite3.Connection, name: str, company: Optional[str],
+                         email: Optional[str], phone: Optional[str]) -> int:
+        """resolve_contact from setup_database.sql, inside the caller's transaction"""
+        name_key, company_key = normalize_contact_part(name), normalize_contact_part(company)
+        if company_key == '':
+            row = conn.execute("SELECT id FROM contacts WHERE name_key = ? ORDER BY id LIMIT 1",
+                               (name_key,)).fetchone()
+            if row:
+                return row['id']
+
+        conn.execute("""
+            INSERT INTO contacts (name, company, email, phone, created_at, name_key, company_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name_key, company_key) DO UPDATE
+                SET email = COALESCE(contacts.email, excluded.email),
+                    phone = COALESCE(contacts.phone, excluded.phone)
+        """, (name, company or None, email, phone, datetime.now().isoformat(), name_key, company_key))
+        return conn.execute("SELECT id FROM contacts WHERE name_key = ? AND company_key = ?",
+                            (name_key, company_key)).fetchone()['id']
+
+    def find_or_create_contact(self, name: str, company: Optional[str] = None,
+                               email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Find existing contact or create new one, in one transaction"""
+        with self._transaction() as conn:
+            return self._resolve_contact(conn, name, company, email, phone)
+
+    def find_contact(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        """Id of an existing contact with this name (and company, if given), or None"""
+        sql, params = "SELECT id FROM contacts WHERE name_key = ?", (normalize_contact_part(name),)
+        if normalize_contact_part(company):
+            sql, params = sql + " AND company_key = ?", params + (normalize_contact_part(company),)
+        rows = self._query(sql + " ORDER BY id LIMIT 1", params)
+        return rows[0]['id'] if rows else None
+
+    def create_contact(self, name: str, company: Optional[str] = None,
+                       email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Insert a new contact and return its id"""
+        with self._transaction() as conn:
+            return self._insert(conn, 'contacts', {
+                'name': name,
+                'company': company,
+                'email': email,
+                'phone': phone,
+                'created_at': datetime.now().isoformat(),
+                'name_key': normalize_contact_part(name),
+                'company_key': normalize_contact_part(company)
+            })['id']
+
+    def find_or_create_contacts(self, contacts: List[Dict[str, Any]]) -> List[int]:
+        """Resolve many contacts in one transaction; ids in input order"""
+        if not contacts:
+            return []
+
+        with self._transaction() as conn:
+            return [self._resolve_contact(conn, c['name'], c.get('company'), c.get('email'), c.get('phone'))
+                    for c in contacts]
+
+    def _page(self, table: str, fields: Optional[List[str]], embed: bool,
+              limit: Optional[int], after: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Newest first by id; after is the last id of the previous page (keyset)
+
+        embed: attach each row's contact as "contacts" when all columns are
+        selected, like PostgREST's contacts(*)
+        """
+        columns = list_fields(table, fields) if fields else list(LIST_COLUMNS[table])
+        embed = 'contacts' in columns and (embed or bool(fields))
+        selected = [c for c in columns if c != 'contacts']
+        if embed and 'contact_id' not in selected:
+            selected.append('contact_id')
+
+        sql, params = f"SELECT {'*' if not fields else ', '.join(selected)} FROM {table}", ()
+        if after is not None:
+            sql, params = sql + " WHERE id < ?", (after,)
+        sql += " ORDER BY id DESC"
+        if limit:
+            sql, params = sql + " LIMIT ?", params + (limit,)
+
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+            if embed:
+                ids = list({row['contact_id'] for row in rows if row['contact_id'] is not None})
+                contacts = {}
+                # Stay under SQLite's bound parameter limit
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    for contact in self._conn.execute(
+                            f"SELECT * FROM contacts WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                        contacts[contact['id']] = dict(contact)
+                for row in rows:
+                    row['contacts'] = contacts.get(row['contact_id'])
+                    if fields and 'contact_id' not in fields:
+                        del row['contact_id']
+        return rows
+
+    def get_all_contacts(self, limit: Optional[int] = None, after: Optional[int] = None,
+                         fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve contacts, newest first (all of them unless limit is given)"""
+        return self._page('contacts', fields, False, limit, after)
+
+    def get_contact_by_id(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """Get specific contact by ID"""
+        rows = self._query("SELECT * FROM contacts WHERE id = ?", (contact_id,))
+        return rows[0] if rows else None
+
+    # ==================== DEALS ====================
+
+    def create_deal(self, contact_id: int, deal_value: Optional[float] = None,
+                    stage: str = "initial", next_step: Optional[str] = None,
+                    follow_up_date: Optional[str] = None, notes: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new deal"""
+        return self.create_deals([{
+            'contact_id': contact_id,
+            'deal_value': deal_value,
+            'stage': stage,
+            'next_step': next_step,
+            'follow_up_date': follow_up_date,
+            'notes': notes
+        }])[0]
+
+    def create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create many deals in one transaction"""
+        if not deals:
+            return []
+
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            return [self._insert(conn, 'deals', {
+                'contact_id': deal['contact_id'],
+                'deal_value': deal.get('deal_value'),
+                'stage': deal.get('stage', 'initial'),
+                'next_step': deal.get('next_step'),
+                'follow_up_date': deal.get('follow_up_date'),
+                'notes': deal.get('notes'),
+                'created_at': now
+            }) for deal in deals]
+
+    def get_all_deals(self, limit: Optional[int] = None, after: Optional[int] = None,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve deals with contact information, newest first"""
+        return self._page('deals', fields, True, limit, after)
+
+    def get_deals_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all deals for a specific contact"""
+        return self._query("SELECT * FROM deals WHERE contact_id = ?", (contact_id,))
+
+    # ==================== INGESTION ====================
+
+    def ingest_crm_record(self, activity_type: str, transcript: str, summary: Optional[str] = None,
+                          contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                          deal: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[int]]:
+        """
+        Save one ingested record in a single transaction, like the
+        ingest_crm_record function in setup_database.sql
+        """
+        with self._transaction() as conn:
+            if contact_id is None and contact and normalize_contact_part(contact.get('name')):
+                contact_id = self._resolve_contact(conn, contact['name'], contact.get('company'),
+                                                   contact.get('email'), contact.get('phone'))
+
+            activity = self._insert(conn, 'activities', activity_row(activity_type, transcript, summary, contact_id))
+
+            deal_id = None
+            if deal and contact_id is not None:
+                deal_id = self._insert(conn, 'deals', {
+                    'contact_id': contact_id,
+                    'deal_value': deal.get('deal_value'),
+                    'stage': 'initial',
+                    'next_step': deal.get('next_step'),
+                    'follow_up_date': deal.get('follow_up_date'),
+                    'notes': deal.get('notes'),
+                    'created_at': datetime.now().isoformat()
+                })['id']
+
+        return {'contact_id': contact_id, 'activity_id': activity['id'], 'deal_id': deal_id}
+
+    # ==================== ACTIVITIES ====================
+
+    def create_activity(self, activity_type: str, transcript: str,
+                        summary: Optional[str] = None, contact_id: Optional[int] = None) -> Dict[str, Any]:
+        """Log an activity (email, call, meeting)"""
+        with self._transaction() as conn:
+            return self._insert(conn, 'activities', activity_row(activity_type, transcript, summary, contact_id))
+
+    def create_activities(self, activities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Log many activities in one transaction"""
+        if not activities:
+            return []
+
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            return [self._insert(conn, 'activities', {
+                **activity_row(a['activity_type'], a['transcript'], a.get('summary'), a.get('contact_id')),
+                'timestamp': now
+            }) for a in activities]
+
+    def reserve_activity_ids(self, count: int) -> List[int]:
+        """
+        Reserve count ids by advancing the activities AUTOINCREMENT counter,
+        which SQLite never hands out again
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'activities'").fetchone()
+            highest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM activities").fetchone()[0]
+            start = max(row['seq'] if row else 0, highest)
+            if row:
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'activities'", (start + count,))
+            else:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('activities', ?)", (start + count,))
+        return list(range(start + 1, start + count + 1))
+
+    def save_activity_rows(self, rows: List[Dict[str, Any]]):
+        """
+        Insert activity rows that already carry their ids, skipping ids that
+        exist, so replaying a write-behind batch is harmless
+        """
+        if not rows:
+            return
+
+        columns = ('id', 'type', 'transcript', 'summary', 'contact_id', 'timestamp')
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO activities ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                "ON CONFLICT (id) DO NOTHING",
+                [tuple(row.get(c) for c in columns) for row in rows]
+            )
+
+    def get_all_activities(self, limit: Optional[int] = None, after: Optional[int] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve activities, newest first; leave transcript out of fields for list views"""
+        return self._page('activities', fields, True, limit, after)
+
+    def get_activities_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all activities for a specific contact"""
+        return self._query("SELECT * FROM activities WHERE contact_id = ?", (contact_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Global SQLite database instance, opened on first use
+_sqlite_db: Optional[SQLiteDatabaseClient] = None
+_sqlite_db_lock = threading.Lock()
+
+def get_sqlite_db() -> SQLiteDatabaseClient:
+    """Return the shared SQLiteDatabaseClient, opening the file on first call"""
+    global _sqlite_db
+    with _sqlite_db_lock:
+        if _sqlite_db is None:
+            _sqlite_db = SQLiteDatabaseClient()
+        return _sqlite_db
@@ -0,0 +1,208 @@
+"""
+Storage interface module
+The CRM operations every blocking database backend provides: the Supabase
+client (database.DatabaseClient) and embedded SQLite
+(sqlite_database.SQLiteDatabaseClient). AsyncStorage is the same interface
+as coroutines, for async_database.AsyncDatabaseClient.
+"""
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, List, Any
+
+
+class Storage(ABC):
+    """
+    Contacts, deals and activities for the API
+
+    Contacts are unique on their normalized name and company
+    (contact_cache.contact_key); list methods return rows newest first by
+    id, with keyset pagination and fields limited to database.LIST_COLUMNS.
+    """
+
+    # ==================== CONTACTS ====================
+
+    @abstractmethod
+    def find_or_create_contact(self, name: str, company: Optional[str] = None,
+                               email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """
+        Id of the contact with this name and company, created if missing;
+        without a company, any contact with the name matches (oldest first).
+        Fills in a missing email/phone on an existing contact.
+        """
+
+    @abstractmethod
+    def find_contact(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        """Id of an existing contact with this name (and company, if given), or None"""
+
+    @abstractmethod
+    def create_contact(self, name: str, company: Optional[str] = None,
+                       email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """Insert a new contact and return its id"""
+
+    @abstractmethod
+    def find_or_create_contacts(self, contacts: List[Dict[str, Any]]) -> List[int]:
+        """find_or_create_contact for dicts with name, company, email, phone; ids in input order"""
+
+    @abstractmethod
+    def get_all_contacts(self, limit: Optional[int] = None, after: Optional[int] = None,
+                         fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve contacts, newest first (all of them unless limit is given)"""
+
+    @abstractmethod
+    def get_contact_by_id(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """Get specific contact by ID"""
+
+    # ==================== DEALS ====================
+
+    @abstractmethod
+    def create_deal(self, contact_id: int, deal_value: Optional[float] = None,
+                    stage: str = "initial", next_step: Optional[str] = None,
+                    follow_up_date: Optional[str] = None, notes: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new deal; returns the row"""
+
+    @abstractmethod
+    def create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create many deals (dicts with create_deal's arguments) in one write"""
+
+    @abstractmethod
+    def get_all_deals(self, limit: Optional[int] = None, after: Optional[int] = None,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve deals with their contact embedded as "contacts", newest first"""
+
+    @abstractmethod
+    def get_deals_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all deals for a specific contact"""
+
+    def execute_raw_query(self, query: str) -> List[Dict[str, Any]]:
+        """Execute raw SQL query (for AI-generated queries)"""
+        return []
+
+    # ==================== INGESTION ====================
+
+    @abstractmethod
+    def ingest_crm_record(self, activity_type: str, transcript: str, summary: Optional[str] = None,
+                          contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                          deal: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[int]]:
+        """
+        Save one ingested record (contact, activity, deal) in one transaction;
+        returns dict with contact_id, activity_id and deal_id
+        """
+
+    # ==================== ACTIVITIES ====================
+
+    @abstractmethod
+    def create_activity(self, activity_type: str, transcript: str,
+                        summary: Optional[str] = None, contact_id: Optional[int] = None) -> Dict[str, Any]:
+        """Log an activity (email, call, meeting); returns the row"""
+
+    @abstractmethod
+    def create_activities(self, activities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Log many activities (dicts with create_activity's arguments) in one write"""
+
+    @abstractmethod
+    def reserve_activity_ids(self, count: int) -> List[int]:
+        """Reserve count activity ids that no insert will use (for write-behind logging)"""
+
+    @abstractmethod
+    def save_activity_rows(self, rows: List[Dict[str, Any]]):
+        """Insert activity rows that already carry their ids, skipping ids that exist"""
+
+    @abstractmethod
+    def get_all_activities(self, limit: Optional[int] = None, after: Optional[int] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve activities with their contact embedded, newest first"""
+
+    @abstractmethod
+    def get_activities_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """Get all activities for a specific contact"""
+
+    def close(self):
+        """Release connections; the client is not used afterwards"""
+
+
+class AsyncStorage(ABC):
+    """Storage's operations as coroutines, same arguments and results"""
+
+    @abstractmethod
+    async def find_or_create_contact(self, name: str, company: Optional[str] = None,
+                                     email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """See Storage.find_or_create_contact"""
+
+    @abstractmethod
+    async def find_contact(self, name: str, company: Optional[str] = None) -> Optional[int]:
+        """See Storage.find_contact"""
+
+    @abstractmethod
+    async def create_contact(self, name: str, company: Optional[str] = None,
+                             email: Optional[str] = None, phone: Optional[str] = None) -> int:
+        """See Storage.create_contact"""
+
+    @abstractmethod
+    async def find_or_create_contacts(self, contacts: List[Dict[str, Any]]) -> List[int]:
+        """See Storage.find_or_create_contacts"""
+
+    @abstractmethod
+    async def get_all_contacts(self, limit: Optional[int] = None, after: Optional[int] = None,
+                               fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """See Storage.get_all_contacts"""
+
+    @abstractmethod
+    async def get_contact_by_id(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """See Storage.get_contact_by_id"""
+
+    @abstractmethod
+    async def create_deal(self, contact_id: int, deal_value: Optional[float] = None,
+                          stage: str = "initial", next_step: Optional[str] = None,
+                          follow_up_date: Optional[str] = None, notes: Optional[str] = None) -> Dict[str, Any]:
+        """See Storage.create_deal"""
+
+    @abstractmethod
+    async def create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """See Storage.create_deals"""
+
+    @abstractmethod
+    async def get_all_deals(self, limit: Optional[int] = None, after: Optional[int] = None,
+                            fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """See Storage.get_all_deals"""
+
+    @abstractmethod
+    async def get_deals_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """See Storage.get_deals_by_contact"""
+
+    async def execute_raw_query(self, query: str) -> List[Dict[str, Any]]:
+        """See Storage.execute_raw_query"""
+        return []
+
+    @abstractmethod
+    async def ingest_crm_record(self, activity_type: str, transcript: str, summary: Optional[str] = None,
+                                contact: Optional[Dict[str, Any]] = None, contact_id: Optional[int] = None,
+                                deal: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[int]]:
+        """See Storage.ingest_crm_record"""
+
+    @abstractmethod
+    async def create_activity(self, activity_type: str, transcript: str,
+                              summary: Optional[str] = None, contact_id: Optional[int] = None) -> Dict[str, Any]:
+        """See Storage.create_activity"""
+
+    @abstractmethod
+    async def create_activities(self, activities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """See Storage.create_activities"""
+
+    @abstractmethod
+    async def reserve_activity_ids(self, count: int) -> List[int]:
+        """See Storage.reserve_activity_ids"""
+
+    @abstractmethod
+    async def save_activity_rows(self, rows: List[Dict[str, Any]]):
+        """See Storage.save_activity_rows"""
+
+    @abstractmethod
+    async def get_all_activities(self, limit: Optional[int] = None, after: Optional[int] = None,
+                                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """See Storage.get_all_activities"""
+
+    @abstractmethod
+    async def get_activities_by_contact(self, contact_id: int) -> List[Dict[str, Any]]:
+        """See Storage.get_activities_by_contact"""
+
+    async def aclose(self):
+        """See Storage.close"""
@@ -0,0 +1,117 @@
+"""
+Streaming transcription module
+Rolling-window Whisper decoding for audio that is still being recorded
+"""
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from audio_chunking import SAMPLE_RATE, find_silences, merge_transcripts
+
+# Re-decode the open window after this much new audio
+STREAM_PARTIAL_SECONDS = float(os.getenv("STREAM_PARTIAL_SECONDS", 2))
+# Once the open window is longer than this, finalize it up to its last silence
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", 20))
+# Hard cap on a single stream
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", 2 * 60 * 60))
+
+Transcribe = Callable[[np.ndarray], Awaitable[Dict[str, Any]]]
+
+
+class StreamTooLongError(Exception):
+    """Raised when a stream exceeds STREAM_MAX_SECONDS"""
+
+
+class StreamingTranscriber:
+    """
+    Accumulates 16 kHz mono PCM16 audio and produces partial transcripts
+
+    Audio is kept in an open window that is re-transcribed as it grows.
+    When the window gets longer than window_seconds, everything up to its
+    last silence is transcribed one final time and committed, so decoding
+    cost and memory stay bounded however long the stream runs.
+    """
+
+    def __init__(self, transcribe: Transcribe,
+                 partial_seconds: float = STREAM_PARTIAL_SECONDS,
+                 window_seconds: float = STREAM_WINDOW_SECONDS,
+                 max_seconds: float = STREAM_MAX_SECONDS):
+        self.transcribe = transcribe
+        self.partial_samples = int(partial_seconds * SAMPLE_RATE)
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+
+        self._window = np.zeros(0, dtype=np.float32)
+        self._window_offset = 0.0  # seconds of audio already committed
+        self._remainder = b""  # odd trailing byte from the last frame
+        self._decoded_at = 0  # total samples when the last partial started
+        self.total_samples = 0
+        self._committed: List[Tuple[Dict[str, Any], float]] = []
+
+    def add_audio(self, pcm: bytes):
+        """Append little-endian int16 mono samples"""
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+        samples = np.frombuffer(pcm[:usable], np.int16).astype(np.float32) / 32768.0
+
+        self.total_samples += len(samples)
+        if self.total_samples > self.max_samples:
+            raise StreamTooLongError(f"Stream exceeds {self.max_samples // SAMPLE_RATE} seconds")
+        self._window = np.concatenate([self._window, samples])
+
+    @property
+    def duration(self) -> float:
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(r["text"].strip() for r, _ in self._committed if r["text"].strip())
+
+    def ready_for_partial(self) -> bool:
+        return self.total_samples - self._decoded_at >= self.partial_samples
+
+    async def _commit_window(self):
+        """Finalize the open window up to its last silence"""
+        window = self._window
+        silences = find_silences(window)
+        # Cut in the last silence, but keep at least a partial interval open
+        cuts = [int((start + end) / 2 * SAMPLE_RATE) for start, end in silences]
+        cuts = [c for c in cuts if c <= len(window) - self.partial_samples]
+        cut = cuts[-1] if cuts else self.window_samples
+
+        result = await self.transcribe(window[:cut])
+        self._committed.append((result, self._window_offset))
+        self._window_offset += cut / SAMPLE_RATE
+        # Audio may have arrived while we were decoding; only drop what was committed
+        self._window = self._window[cut:]
+
+    async def partial(self) -> Dict[str, Any]:
+        """
+        Transcribe the open window and return the transcript so far
+
+        Returns:
+            {"text": full text so far, "stable_text": text that won't change}
+        """
+        self._decoded_at = self.total_samples
+        if len(self._window) > self.window_samples:
+            await self._commit_window()
+
+        result = await self.transcribe(self._window) if len(self._window) else {"text": ""}
+        committed = self.committed_text
+        return {
+            "text": " ".join(t for t in (committed, result["text"].strip()) if t),
+            "stable_text": committed,
+            "duration": round(self.duration, 2)
+        }
+
+    async def finish(self) -> Dict[str, Any]:
+        """Transcribe the remaining audio and return the stitched transcript"""
+        if len(self._window):
+            result = await self.transcribe(self._window)
+            self._committed.append((result, self._window_offset))
+            self._window_offset += len(self._window) / SAMPLE_RATE
+            self._window = np.zeros(0, dtype=np.float32)
+
+        return merge_transcripts([r for r, _ in self._committed], [o for _, o in self._committed])
@@ -0,0 +1,110 @@
+"""
+Text chunking module
+Token-aware splitting of long transcripts for map-reduce extraction, and
+deterministic merging of the per-chunk CRM results
+"""
+import re
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# Rough token estimate; good enough for budgeting English text
+CHARS_PER_TOKEN = 4
+
+# Fields where the value mentioned most often wins
+_IDENTITY_FIELDS = ("contact_name", "company", "email", "phone")
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_oversized(segment: str, max_chars: int) -> List[str]:
+    """Split one segment longer than max_chars at whitespace (or hard, if none)"""
+    pieces = []
+    while len(segment) > max_chars:
+        cut = segment.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(segment[:cut])
+        segment = segment[cut:].lstrip()
+    if segment:
+        pieces.append(segment)
+    return pieces
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens (estimated), breaking at
+    paragraph, then sentence, then word boundaries
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return [text]
+
+    segments = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        for sentence in _SENTENCE_END.split(paragraph.strip()):
+            segments.extend(_split_oversized(sentence, max_chars))
+
+    chunks, current = [], ""
+    for segment in segments:
+        if current and len(current) + 1 + len(segment) > max_chars:
+            chunks.append(current)
+            current = segment
+        else:
+            current = f"{current} {segment}" if current else segment
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _most_common(values: List[Any]) -> Any:
+    """Most frequent value; ties go to the one seen first"""
+    counts = Counter(values)
+    return max(values, key=lambda v: (counts[v], -values.index(v))) if values else None
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _parse_amount(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace("$", "").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def merge_crm_data(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk extraction results, in transcript order, into one record
+
+    - contact_name, company, email, phone: most frequently mentioned value
+    - deal_value: largest amount
+    - follow_up_date: latest valid date
+    - next_step: the last one mentioned
+    - notes: distinct notes joined in order
+    """
+    def present(field: str) -> List[Any]:
+        return [p[field] for p in partials if p.get(field) not in (None, "")]
+
+    merged = {field: _most_common(present(field)) for field in _IDENTITY_FIELDS}
+
+    amounts = [a for a in map(_parse_amount, present("deal_value")) if a is not None]
+    merged["deal_value"] = max(amounts) if amounts else None
+
+    dates = [d for d in map(_parse_date, present("follow_up_date")) if d is not None]
+    merged["follow_up_date"] = max(dates).isoformat() if dates else None
+
+    next_steps = present("next_step")
+    merged["next_step"] = next_steps[-1] if next_steps else None
+
+    notes = list(dict.fromkeys(str(n) for n in present("notes")))
+    merged["notes"] = "; ".join(notes) if notes else None
+    return merged
@@ -83,6 +83,13 @@ def fetch_data(endpoint):
         st.error(f"Error connecting to API: {str(e)}")
         return None
 
+def show_degraded(result):
+    """Warn when the AI step fell back instead of returning real results"""
+    degraded = result.get("degraded")
+    if degraded:
+        parts = ", ".join(degraded) if isinstance(degraded, list) else "results"
+        st.warning(f"⚠️ AI service unavailable, fallback used for: {parts}. Please review before relying on it.")
+
 def format_currency(value):
     """Format value as currency"""
     if value is None:
@@ -106,7 +113,8 @@ if page == "🏠 Dashboard":
     # Fetch data
     contacts_data = fetch_data("contacts")
     deals_data = fetch_data("deals")
-    activities_data = fetch_data("activities")
+    # Only counted here, so skip transcripts and the contact join
+    activities_data = fetch_data("activities?fields=id")
     
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -186,14 +194,27 @@ elif page == "🎤 Voice Input":
         if st.button("🚀 Process Audio", type="primary"):
             with st.spinner("🎯 Transcribing and extracting CRM data..."):
                 try:
-                    # Send to API
+                    # Send to API (returns a background job)
                     files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
                     response = requests.post(f"{API_URL}/upload_audio", files=files)
+
+                    # Poll the job until it finishes
+                    job = None
+                    if response.status_code == 202:
+                        job_id = response.json()["job_id"]
+                        progress_bar = st.progress(0.0, text="Queued")
+                        while True:
+                            job = requests.get(f"{API_URL}/jobs/{job_id}").json()
+                            progress_bar.progress(job["progress"], text=job["stage"].capitalize())
+                            if job["status"] in ("completed", "failed"):
+                                break
+                            time.sleep(1)
                     
-                    if response.status_code == 200:
-                        result = response.json()
+                    if job and job["status"] == "completed":
+                        result = job["result"]
                         
                         st.success("✅ Successfully processed!")
+                        show_degraded(result)
                         
                         # Display results
                         st.subheader("📝 Transcript")
@@ -221,6 +242,8 @@ elif page == "🎤 Voice Input":
                         # Auto-refresh to show new data
                         time.sleep(1)
                         st.rerun()
+                    elif job:
+                        st.error(f"Error: {job['error']}")
                     else:
                         st.error(f"Error: {response.text}")
                         
@@ -265,6 +288,7 @@ elif page == "✉️ Text Input":
                             result = response.json()
                             
                             st.success("✅ Successfully extracted CRM data!")
+                            show_degraded(result)
                             
                             st.subheader("🤖 AI Summary")
                             st.info(result.get("summary", ""))
@@ -324,6 +348,7 @@ elif page == "✉️ Text Input":
                                     if response.status_code == 200:
                                         result = response.json()
                                         st.success("✅ Email processed successfully!")
+                                        show_degraded(result)
                                         
                                         st.subheader("📊 Extracted Data")
                                         extracted = result.get("extracted_data", {})
@@ -372,6 +397,7 @@ elif page == "🔍 Smart Search":
                         result = response.json()
                         
                         st.success(f"✅ Found {result.get('count', 0)} results")
+                        show_degraded(result)
                         
                         st.subheader("🎯 Search Results")
                         
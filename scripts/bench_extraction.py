@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Extraction Latency Benchmark
+Compares sequential, parallel and combined extraction + summary per request,
+then one-by-one vs multi-document batched extraction of short notes
+Uses the provider configured in .env:  python scripts/bench_extraction.py --runs 5 --notes 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Measure real LLM calls, not cache hits
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from llm_extraction import llm_extractor
+from email_parser import email_parser
+from metrics import metrics
+
+NOTE_TEMPLATES = [
+    "Called {name} at {company}, ${value}k, follow up Monday",
+    "Met {name} ({company}) - wants a demo, budget around ${value}k",
+    "{name} from {company} asked for pricing, maybe ${value}k, send proposal",
+]
+NAMES = ["Mike", "Priya", "Tom", "Ana", "Lee", "Sam", "Jo", "Kim"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli"]
+
+MODES = {
+    "sequential": lambda text: (llm_extractor.extract_crm_data(text), llm_extractor.generate_summary(text)),
+    "parallel": llm_extractor.extract_and_summarize_parallel,
+    "combined": llm_extractor.extract_with_summary,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extraction modes")
+    parser.add_argument("--runs", type=int, default=3, help="Requests per mode per sample")
+    parser.add_argument("--notes", type=int, default=20, help="Short notes for the batching comparison")
+    args = parser.parse_args()
+
+    texts = [sample["body"] for sample in email_parser.create_sample_emails()]
+
+    print(f"⏱️  Extraction latency ({llm_extractor.provider}/{llm_extractor.model}, "
+          f"{len(texts)} samples x {args.runs} runs)")
+    print(f"{'mode':<12} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'speedup':>8}")
+
+    baseline = None
+    for mode, fn in MODES.items():
+        latencies = []
+        for _ in range(args.runs):
+            for text in texts:
+                start = time.perf_counter()
+                fn(text)
+                latencies.append(time.perf_counter() - start)
+
+        mean = statistics.mean(latencies)
+        if baseline is None:
+            baseline = mean
+        print(f"{mode:<12} {mean * 1000:>9.1f} {statistics.median(latencies) * 1000:>9.1f} "
+              f"{max(latencies) * 1000:>9.1f} {baseline / mean:>7.2f}x")
+
+    notes = [NOTE_TEMPLATES[i % len(NOTE_TEMPLATES)].format(
+        name=NAMES[i % len(NAMES)], company=COMPANIES[i % len(COMPANIES)], value=5 + i)
+        for i in range(args.notes)]
+    print(f"\n📦 {len(notes)} short notes")
+    print(f"{'mode':<12} {'total ms':>9} {'per note':>9} {'requests':>9}")
+    start = time.perf_counter()
+    for note in notes:
+        llm_extractor.extract_with_summary(note)
+    single = time.perf_counter() - start
+    print(f"{'one-by-one':<12} {single * 1000:>9.1f} {single / len(notes) * 1000:>9.1f} {len(notes):>9}")
+
+    start = time.perf_counter()
+    llm_extractor.extract_batch(notes)
+    batched = time.perf_counter() - start
+    requests = metrics.get("llm_batch.requests") + metrics.get("llm_batch.singles")
+    print(f"{'batched':<12} {batched * 1000:>9.1f} {batched / len(notes) * 1000:>9.1f} {requests:>9.0f}"
+          f"  (~{metrics.get('llm_batch.prompt_tokens_saved'):.0f} prompt tokens saved)")
+
+
+if __name__ == "__main__":
+    main()
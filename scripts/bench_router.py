@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+LLM Router Benchmark
+Exercises the provider router offline against fake providers:
+  1. tail latency: a primary with occasional slow responses, with and
+     without hedging to a second provider
+  2. outage: the primary starts failing, its circuit breaker opens and
+     traffic moves over, then it recovers after the cooldown
+  3. throttling: a provider that answers 20% of calls with 429 + Retry-After,
+     behind a client-side requests-per-minute limit
+Usage:  python scripts/bench_router.py --requests 300 --concurrency 8
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from llm_limits import ProviderLimiter
+from llm_providers import FakeProvider
+from llm_router import LLMRouter, RouterError
+from metrics import metrics
+
+
+def run(router: LLMRouter, requests: int, concurrency: int):
+    """Send requests through the router; returns (latencies, failures)"""
+    def one(_):
+        start = time.perf_counter()
+        try:
+            router.complete("ping")
+            return time.perf_counter() - start
+        except RouterError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    return [r for r in results if r is not None], results.count(None)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+def router_counters():
+    return {k: v for k, v in metrics.snapshot()["counters"].items() if k.startswith(("llm_router.", "llm_limits."))}
+
+
+def tail_latency(args):
+    print("🐢 Tail latency: primary 100ms, 3% of calls take 1.5s; secondary 150ms")
+    print(f"{'hedging':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}  hedges")
+    for hedge in (False, True):
+        rng = random.Random(1)
+        primary = FakeProvider("primary", latency=lambda: 1.5 if rng.random() < 0.03 else 0.1)
+        secondary = FakeProvider("secondary", latency=0.15)
+        router = LLMRouter([primary, secondary], hedge=hedge, hedge_percentile=90,
+                           hedge_min_seconds=0.05, hedge_default_seconds=0.3)
+        before = metrics.get("llm_router.hedges")
+        latencies, _ = run(router, args.requests, args.concurrency)
+        print(f"{'on' if hedge else 'off':<10} {percentile(latencies, 50) * 1000:>8.0f} "
+              f"{percentile(latencies, 95) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+              f"{statistics.mean(latencies) * 1000:>8.0f}  {metrics.get('llm_router.hedges') - before:.0f}")
+
+
+def outage(args):
+    print("\n💥 Outage: primary fails for the first half of the run, then recovers")
+    primary = FakeProvider("flaky", latency=0.05, error_rate=1.0)
+    secondary = FakeProvider("backup", latency=0.08)
+    router = LLMRouter([primary, secondary], hedge=False, breaker_failures=5, breaker_cooldown=0.5)
+
+    phases = [("outage", 1.0), ("recovered", 0.0)]
+    for label, error_rate in phases:
+        primary.error_rate = error_rate
+        primary.calls, secondary.calls = 0, 0
+        latencies, failures = run(router, args.requests // 2, args.concurrency)
+        if label == "outage":
+            time.sleep(0.6)  # let the breaker cool down so recovery can be probed
+        print(f"   {label:<10} ok={len(latencies):<4} failed={failures:<3} "
+              f"calls flaky={primary.calls:<4} backup={secondary.calls:<4} "
+              f"breaker={router.breakers['flaky'].state}")
+
+
+def throttling(args):
+    print("\n🚦 Throttling: 20% of calls get 429 with Retry-After 0.1s; at most 4 in flight")
+    provider = FakeProvider("limited", latency=0.02, error_rate=0.2, error_status=429, retry_after=0.1, seed=3)
+    router = LLMRouter([provider], hedge=False, breaker_failures=1000)
+    router.limiters["limited"] = ProviderLimiter("limited", rpm=1200, tpm=0, max_concurrency=4)
+    latencies, failures = run(router, args.requests // 2, args.concurrency)
+    print(f"   ok={len(latencies)} failed={failures} calls={provider.calls} "
+          f"p50={percentile(latencies, 50) * 1000:.0f}ms p99={percentile(latencies, 99) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM router hedging and circuit breaker benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    tail_latency(args)
+    outage(args)
+    throttling(args)
+
+    print("\n📊 Routing metrics")
+    for name, value in router_counters().items():
+        if name.startswith("llm_limits.wait_seconds"):
+            continue
+        print(f"   {name:<40} {value:.0f}")
+
+
+if __name__ == "__main__":
+    main()
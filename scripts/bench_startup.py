@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+Measures backend import time, time until the server answers /healthz and
+time until /readyz reports every preloaded service ready.
+Exits non-zero when a budget is exceeded, so it can gate CI/deploys.
+Usage:  python scripts/bench_startup.py --import-budget 1.5 --live-budget 3 --ready-budget 60
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+def measure_import() -> float:
+    """Import main in a fresh interpreter and time it"""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url: str, deadline: float, expect_ok: bool = True) -> float:
+    """Poll url until it answers (200 if expect_ok) and return the time it took"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            response = httpx.get(url, timeout=1)
+            if not expect_ok or response.status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {deadline}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup budget check")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--import-budget", type=float, default=1.5, help="Seconds to import main")
+    parser.add_argument("--live-budget", type=float, default=3.0, help="Seconds until /healthz answers")
+    parser.add_argument("--ready-budget", type=float, default=60.0, help="Seconds until /readyz is 200")
+    args = parser.parse_args()
+
+    import_seconds = measure_import()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy()
+    )
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        live_seconds = wait_for(f"{base}/healthz", args.live_budget * 5)
+        ready_seconds = live_seconds + wait_for(f"{base}/readyz", args.ready_budget * 2)
+        services = httpx.get(f"{base}/readyz").json()["services"]
+    finally:
+        server.terminate()
+        server.wait()
+
+    print("🚀 Backend startup")
+    results = [("import main", import_seconds, args.import_budget),
+               ("/healthz answers", live_seconds, args.live_budget),
+               ("/readyz ready", ready_seconds, args.ready_budget)]
+    failed = False
+    for label, seconds, budget in results:
+        ok = seconds <= budget
+        failed |= not ok
+        print(f"   {'✅' if ok else '❌'} {label:<18} {seconds:>7.2f}s  (budget {budget:.2f}s)")
+    for name, service in services.items():
+        print(f"      {name:<8} {service['status']:<11} {service['load_seconds'] or 0:>6.2f}s")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+STT Engine Benchmark
+Compares real-time factor (processing time / audio length), load time and
+peak memory of each speech-to-text engine
+Usage:  python scripts/bench_stt.py path/to/sample.wav --engines whisper,faster-whisper
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+
+def run_engine(engine, compute_type, model_size, audio, runs, queue):
+    """Measure one engine in a fresh process so peak memory is its own"""
+    import speech_to_text
+    if compute_type:
+        speech_to_text.STT_COMPUTE_TYPE = compute_type
+
+    start = time.perf_counter()
+    if engine == "faster-whisper":
+        stt = speech_to_text.FasterWhisperEngine(model_size, compute_type=compute_type or "int8")
+    else:
+        stt = speech_to_text.create_engine(engine, model_size)
+    load_seconds = time.perf_counter() - start
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = stt.transcribe(audio)
+        timings.append(time.perf_counter() - start)
+
+    # ru_maxrss is reported in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put({"load": load_seconds, "best": min(timings), "peak_mb": peak_mb,
+               "text": result["text"].strip()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare STT engines")
+    parser.add_argument("audio", help="Audio file to transcribe")
+    parser.add_argument("--engines", default="whisper,faster-whisper:int8,faster-whisper:float32",
+                        help="Comma-separated engine[:compute_type] list")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import librosa
+    duration = librosa.get_duration(path=args.audio)
+
+    print(f"🎤 STT engines on {args.audio} ({duration:.1f}s audio, model '{args.model}')")
+    print(f"{'engine':<24} {'load s':>7} {'best s':>7} {'RTF':>6} {'peak MB':>8}")
+
+    ctx = multiprocessing.get_context("spawn")
+    for spec in args.engines.split(","):
+        engine, _, compute_type = spec.partition(":")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_engine,
+                           args=(engine, compute_type or None, args.model, args.audio, args.runs, queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0 or queue.empty():
+            print(f"{spec:<24} failed (is the engine installed?)")
+            continue
+        stats = queue.get()
+        print(f"{spec:<24} {stats['load']:>7.1f} {stats['best']:>7.2f} "
+              f"{stats['best'] / duration:>6.3f} {stats['peak_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Transcription Pool Benchmark
+Measures STT throughput as the number of worker processes grows
+Usage:  python scripts/bench_stt_pool.py path/to/sample.wav --jobs 16
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from speech_to_text import TranscriptionPool, WHISPER_MODEL
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT pool scaling benchmark")
+    parser.add_argument("audio", help="Audio file to transcribe repeatedly")
+    parser.add_argument("--jobs", type=int, default=16, help="Transcriptions per pool size")
+    parser.add_argument("--sizes", default=None, help="Comma-separated worker counts (default 1,2,4..cores)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.sizes:
+        sizes = [int(x) for x in args.sizes.split(",")]
+    else:
+        sizes = [1]
+        while sizes[-1] * 2 <= cores:
+            sizes.append(sizes[-1] * 2)
+
+    print(f"🎤 Whisper '{WHISPER_MODEL}' pool scaling, {args.jobs} jobs per size, {cores} cores")
+    print(f"{'workers':>8} {'seconds':>9} {'jobs/min':>9} {'speedup':>8} {'efficiency':>11}")
+
+    baseline = None
+    for size in sizes:
+        pool = TranscriptionPool(workers=size, max_pending=size * 2)
+        pool.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=size * 2) as clients:
+            list(clients.map(pool.transcribe, [args.audio] * args.jobs))
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+
+        throughput = args.jobs / elapsed * 60
+        if baseline is None:
+            baseline = throughput
+        speedup = throughput / baseline
+        print(f"{size:>8} {elapsed:>9.1f} {throughput:>9.1f} {speedup:>7.2f}x {speedup / size:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Activity Write-Behind Check
+Runs save_crm_record against an in-process PostgREST stand-in with a
+simulated query time and checks:
+  1. with ACTIVITY_WRITE_BEHIND, ingests of known contacts skip the
+     activity insert and every buffered row reaches the database once
+  2. rows buffered while the database is down survive a crash (no stop())
+     and are written when the next process starts, without duplicates even
+     if a segment is replayed after it was already written
+  3. rows the database rejects are moved to the dead-letter file without
+     holding up the rest, and an outage dead-letters nothing
+  4. flush latency and queue depth are reported in metrics
+Exits non-zero on failure.
+Usage:  python scripts/check_activity_buffer.py --ingests 500 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("PRELOAD_SERVICES", "")
+
+# Add backend and scripts to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+
+import main as backend
+from activity_buffer import ActivityWriteBuffer, DEAD_LETTER_FILE
+from async_database import AsyncDatabaseClient
+from database import activity_row
+from metrics import metrics
+from postgrest_standin import create_app
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+async def ingest_all(args, tag: str):
+    """Ingests for a few known contacts, concurrency at a time; returns per-ingest latencies"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def ingest(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            crm_data = {"contact_name": f"Contact {i % 20}", "company": "Acme"}
+            await backend.save_crm_record(crm_data, "email", f"{tag} email {i}", "summary")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(ingest(i) for i in range(args.ingests)))
+    return sorted(latencies)
+
+
+async def write_behind_checks(args, spill_dir: str):
+    standin = create_app(args.latency_ms)
+    db = AsyncDatabaseClient(rest_url="http://standin", key="check", transport=httpx.ASGITransport(app=standin))
+    backend.db = db
+    activities = standin.state.tables["activities"]
+
+    print(f"📨 {args.ingests} ingests, {args.latency_ms:g}ms per database request")
+    for write_behind in (False, True):
+        backend.ACTIVITY_WRITE_BEHIND = write_behind
+        if write_behind:
+            buffer = backend.activity_buffer = ActivityWriteBuffer(spill_dir=spill_dir)
+            await buffer.start(write=db.save_activity_rows, reserve=db.reserve_activity_ids)
+        before, requests = len(activities), standin.state.requests
+        latencies = await ingest_all(args, "write-behind" if write_behind else "direct")
+        if write_behind:
+            await buffer.stop()
+        p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+        print(f"   {'write-behind' if write_behind else 'direct':<13} p50 {p50 * 1000:6.1f}ms  p95 {p95 * 1000:6.1f}ms  "
+              f"{standin.state.requests - requests} database requests")
+        if write_behind:
+            ids = [row["id"] for row in activities[before:]]
+            check("every buffered activity written once", len(ids) == args.ingests == len(set(ids)), f"{len(ids)} rows")
+            check("no spill files left", not os.listdir(spill_dir))
+    backend.ACTIVITY_WRITE_BEHIND = False
+    await db.aclose()
+
+
+async def crash_checks(args, spill_dir: str):
+    print("\n💥 Database down, then a crash before the buffer is stopped")
+    standin = create_app()
+    db = AsyncDatabaseClient(rest_url="http://standin", key="check", transport=httpx.ASGITransport(app=standin))
+
+    async def unavailable(rows):
+        raise ConnectionError("database unavailable")
+
+    buffer = ActivityWriteBuffer(flush_rows=50, flush_seconds=0.05, spill_dir=spill_dir, max_attempts=2)
+    await buffer.start(write=unavailable, reserve=db.reserve_activity_ids)
+    ids = await buffer.add_many([activity_row("call", f"crash {i}") for i in range(120)])
+    await asyncio.sleep(0.2)
+    check("rows spilled while the database is down", metrics.snapshot()["gauges"]["activity_buffer.queue_depth"] == 120
+          and metrics.get("activity_buffer.flush_errors") > 0)
+    check("nothing dead-lettered during the outage", not os.path.exists(os.path.join(spill_dir, DEAD_LETTER_FILE)))
+    buffer._task.cancel()  # the process dies: no stop(), no final flush
+
+    # A segment written just before a crash, but not yet deleted, is replayed too
+    segments = sorted(os.listdir(spill_dir))
+    shutil.copy(os.path.join(spill_dir, segments[0]), os.path.join(spill_dir, "activities-99999998.jsonl"))
+
+    restarted = ActivityWriteBuffer(flush_seconds=0.05, spill_dir=spill_dir)
+    await restarted.start(write=db.save_activity_rows, reserve=db.reserve_activity_ids)
+    await asyncio.sleep(0.2)
+    await restarted.stop()
+    written = [row["id"] for row in standin.state.tables["activities"]]
+    check("spilled rows written after restart", sorted(written) == sorted(ids), f"{len(written)} rows")
+    check("replayed segment did not duplicate rows", len(written) == len(set(written)))
+    await db.aclose()
+
+
+async def dead_letter_checks(spill_dir: str):
+    print("\n☠️  Rows the database refuses")
+    standin = create_app()
+    db = AsyncDatabaseClient(rest_url="http://standin", key="check", transport=httpx.ASGITransport(app=standin))
+    request = httpx.Request("POST", "http://standin/rest/v1/activities")
+
+    async def refusing(rows):
+        # "poison" rows fail with an error that doesn't say it's the rows' fault
+        if any(row["transcript"].startswith("poison") for row in rows):
+            raise RuntimeError("server closed the connection")
+        if any(row["transcript"].startswith("orphan") for row in rows):
+            raise httpx.HTTPStatusError("409 Conflict: violates foreign key constraint", request=request,
+                                        response=httpx.Response(409, request=request))
+        await db.save_activity_rows(rows)
+
+    dead_before = metrics.get("activity_buffer.dead_letter_rows")
+    buffer = ActivityWriteBuffer(flush_seconds=0.05, spill_dir=spill_dir, max_attempts=2)
+    await buffer.start(write=refusing, reserve=db.reserve_activity_ids)
+    good = await buffer.add_many([activity_row("email", f"good {i}") for i in range(40)])
+    bad = await buffer.add_many([activity_row("email", f"orphan {i}") for i in range(3)]
+                                + [activity_row("email", f"poison {i}") for i in range(2)])
+    await asyncio.sleep(0.3)
+    written = {row["id"] for row in standin.state.tables["activities"]}
+    check("good rows in a failing segment still written", set(good) <= written, f"{len(written)} rows")
+    later = await buffer.add_many([activity_row("email", f"later {i}") for i in range(10)])
+    await asyncio.sleep(0.2)
+    await buffer.stop()
+    written = {row["id"] for row in standin.state.tables["activities"]}
+    check("later segments not held up", set(later) <= written)
+    dead_letter = os.path.join(spill_dir, DEAD_LETTER_FILE)
+    with open(dead_letter, encoding="utf-8") as f:
+        dead = [json.loads(line)["id"] for line in f]
+    check("refused rows dead-lettered once, nothing else", sorted(dead) == sorted(bad) and not written & set(bad),
+          f"{len(dead)} rows")
+    check("no segments left", os.listdir(spill_dir) == [DEAD_LETTER_FILE], str(os.listdir(spill_dir)))
+    check("dead-lettered rows counted", metrics.get("activity_buffer.dead_letter_rows") - dead_before == len(bad))
+    await db.aclose()
+
+    print("\n📈 Metrics")
+    summaries = metrics.snapshot()["summaries"]
+    latency = summaries.get("activity_buffer.flush_latency", {})
+    check("flush latency reported", latency.get("count", 0) > 0, str(latency))
+    check("queue depth back to zero", metrics.snapshot()["gauges"]["activity_buffer.queue_depth"] == 0)
+
+
+async def run(args):
+    spill_dir = tempfile.mkdtemp(prefix="activity_spill_")
+    try:
+        await write_behind_checks(args, os.path.join(spill_dir, "ingest"))
+        await crash_checks(args, os.path.join(spill_dir, "crash"))
+        await dead_letter_checks(os.path.join(spill_dir, "dead-letter"))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity write-behind check")
+    parser.add_argument("--ingests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stand-in query time per request")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All activity write-behind checks passed")
+
+
+if __name__ == "__main__":
+    main()
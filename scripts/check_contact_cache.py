@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Contact Cache Check
+Runs save_crm_record against an in-process PostgREST stand-in for a
+skewed stream of contact mentions (some re-cased or re-spaced) and checks:
+  1. each contact exists once, however it was spelled or how many ingests
+     raced on its first mention
+  2. only first mentions miss the contact cache, with at most a few
+     database resolutions per distinct contact
+  3. after a restart the warmed cache answers repeat contacts right away
+Exits non-zero on failure.
+Usage:  python scripts/check_contact_cache.py --ingests 3000 --contacts 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ.setdefault("PRELOAD_SERVICES", "")
+
+# Add backend and scripts to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+
+import main as backend
+from async_database import AsyncDatabaseClient
+from contact_cache import contact_cache
+from metrics import metrics
+from postgrest_standin import create_app
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+def respell(name: str, rng: random.Random) -> str:
+    """The same contact as an LLM might write it another time"""
+    return rng.choice([name.upper(), name.lower(), f"  {name} ", name.replace(" ", "  ")])
+
+
+def mentions(args, rng: random.Random):
+    people = [(f"Contact {i}", f"Company {i % 40}") for i in range(args.contacts)]
+    # Zipf-like: a few accounts come up constantly, most only now and then
+    weights = [1 / (rank + 1) for rank in range(len(people))]
+    for name, company in rng.choices(people, weights=weights, k=args.ingests):
+        yield respell(name, rng) if rng.random() < 0.2 else name, company
+
+
+async def ingest_all(args, rng: random.Random, items):
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def ingest(i, name, company):
+        async with semaphore:
+            crm_data = {"contact_name": name, "company": company, "deal_value": 1000.0 + i}
+            await backend.save_crm_record(crm_data, "call", f"transcript {i}", "summary")
+
+    await asyncio.gather(*(ingest(i, name, company) for i, (name, company) in enumerate(items)))
+
+
+def counter(name: str) -> float:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+async def run(args):
+    standin = create_app()
+    backend.db = AsyncDatabaseClient(rest_url="http://standin", key="check",
+                                     transport=httpx.ASGITransport(app=standin))
+    rng = random.Random(args.seed)
+    items = list(mentions(args, rng))
+    distinct = {(" ".join(name.split()).lower(), company) for name, company in items}
+
+    print(f"👥 {args.ingests} ingests of {len(distinct)} distinct contacts, {args.concurrency} at a time")
+    await ingest_all(args, rng, items)
+    contacts = standin.state.tables["contacts"]
+    resolutions = standin.state.contact_resolutions
+    hits, misses = counter("contact_cache.hits"), counter("contact_cache.misses")
+    check("one row per contact", len(contacts) == len(distinct), f"{len(contacts)} rows")
+    # Only a contact's first mention (or a race on it) can miss
+    ideal = 1 - len(distinct) / args.ingests
+    check("cache misses only on first mentions", hits / (hits + misses) > ideal - 0.05,
+          f"hit ratio {hits / (hits + misses):.2f} (ideal {ideal:.2f}), {resolutions} database resolutions")
+    check("few database resolutions per contact", resolutions <= 2 * len(distinct),
+          f"{resolutions / len(distinct):.2f} per contact")
+
+    print("\n🔄 Restart: empty cache, warmed from the most recent contacts")
+    contact_cache.clear()
+    warmed = contact_cache.warm(await backend.db.get_all_contacts(limit=args.warm, fields=["name", "company"]))
+    before = standin.state.contact_resolutions
+    hits, misses = counter("contact_cache.hits"), counter("contact_cache.misses")
+    await ingest_all(args, rng, list(mentions(args, rng))[:args.ingests // 5])
+    hits, misses = counter("contact_cache.hits") - hits, counter("contact_cache.misses") - misses
+    check("warmed cache answers repeat contacts", hits / (hits + misses) > 0.8,
+          f"{warmed} warmed, hit ratio {hits / (hits + misses):.2f}, "
+          f"{standin.state.contact_resolutions - before} database resolutions")
+    check("still one row per contact", len(standin.state.tables["contacts"]) == len(contacts))
+    await backend.db.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contact resolution cache check")
+    parser.add_argument("--ingests", type=int, default=3000)
+    parser.add_argument("--contacts", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warm", type=int, default=1000, help="contacts loaded into the cache after the restart")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All contact cache checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Ingest RPC Check
+Runs backend/setup_database.sql in a scratch schema of a local Postgres
+(over tables in their pre-contact-key shape, holding duplicate contacts)
+and checks the contact key migration and the ingestion functions:
+  1. duplicate contacts are merged, with their activities moved over and
+     the email/phone the kept row lacked copied from the duplicate
+  2. a new contact, activity and deal come back as ids in one call
+  3. a repeat ingest reuses the contact despite case/whitespace changes,
+     filling in a missing email
+  4. without a contact name only the activity is written
+  5. a failing deal insert rolls back the contact and activity too
+  6. concurrent ingests for the same new name create one contact
+  7. resolve_contacts returns ids in input order
+The scratch schema is dropped afterwards. Exits non-zero on failure.
+Usage:  DATABASE_URL=postgresql://postgres@localhost:5432/postgres python scripts/check_ingest_rpc.py
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import psycopg2
+
+SETUP_PATH = Path(__file__).parent.parent / "backend" / "setup_database.sql"
+SCHEMA = "ingest_rpc_check"
+
+# Tables as created before contacts had name_key/company_key
+OLD_SCHEMA = """
+CREATE TABLE contacts (id BIGSERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, company VARCHAR(255),
+                       email VARCHAR(255), phone VARCHAR(50), created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW());
+CREATE TABLE deals (id BIGSERIAL PRIMARY KEY, contact_id BIGINT REFERENCES contacts(id) ON DELETE CASCADE,
+                    deal_value DECIMAL(12, 2), stage VARCHAR(100) DEFAULT 'initial', next_step TEXT,
+                    follow_up_date DATE, notes TEXT, created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW());
+CREATE TABLE activities (id BIGSERIAL PRIMARY KEY, type VARCHAR(50) NOT NULL, transcript TEXT, summary TEXT,
+                         contact_id BIGINT REFERENCES contacts(id) ON DELETE SET NULL,
+                         timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW());
+INSERT INTO contacts (name, company, phone) VALUES ('Old Duplicate', 'Acme', '555-0100');
+INSERT INTO contacts (name, company, email, phone) VALUES ('  old duplicate', 'ACME', 'old@acme.com', '555-0199');
+INSERT INTO activities (type, transcript, contact_id) VALUES ('call', 'old', 2);
+"""
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+def setup_sql() -> str:
+    """SETUP_SQL from setup_database.sql, without running its print statements"""
+    for node in ast.parse(SETUP_PATH.read_text()).body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "SETUP_SQL":
+            return ast.literal_eval(node.value)
+    raise RuntimeError(f"SETUP_SQL not found in {SETUP_PATH}")
+
+
+def connect(url: str):
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}")
+    return conn
+
+
+def ingest(conn, **params):
+    """Call ingest_crm_record with named arguments, as PostgREST does"""
+    args = ", ".join(f"{name} => %({name})s" for name in params)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT ingest_crm_record({args})", params)
+        result = cur.fetchone()[0]
+    return result if isinstance(result, dict) else json.loads(result)
+
+
+def count(conn, table: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {table}")
+        return cur.fetchone()[0]
+
+
+def run_checks(url: str, workers: int):
+    conn = connect(url)
+
+    print("🔑 Contact key migration")
+    with conn.cursor() as cur:
+        cur.execute("SELECT array_agg(id) FROM contacts WHERE name_key = 'old duplicate'")
+        merged = cur.fetchone()[0]
+        cur.execute("SELECT contact_id FROM activities WHERE transcript = 'old'")
+        moved = cur.fetchone()[0]
+        cur.execute("SELECT email, phone FROM contacts WHERE id = 1")
+        email, phone = cur.fetchone()
+    check("duplicates merged into the oldest", merged == [1] and moved == 1, f"contacts {merged}, activity on {moved}")
+    check("missing email copied, own phone kept", (email, phone) == ("old@acme.com", "555-0100"), f"{email}, {phone}")
+
+    print("\n📥 Single ingests")
+    first = ingest(conn, p_activity_type="call", p_transcript="t1", p_summary="s",
+                   p_contact_name="Dana", p_company="Globex", p_create_deal=True,
+                   p_deal_value=5000, p_next_step="Send proposal")
+    check("ids for contact, activity and deal", all(first[k] for k in ("contact_id", "activity_id", "deal_id")), str(first))
+
+    again = ingest(conn, p_activity_type="email", p_transcript="t2", p_contact_name="  dana ",
+                   p_company="GLOBEX", p_email="dana@globex.com")
+    with conn.cursor() as cur:
+        cur.execute("SELECT email FROM contacts WHERE id = %s", (first["contact_id"],))
+        email = cur.fetchone()[0]
+    check("repeat ingest reuses the contact", again["contact_id"] == first["contact_id"] and again["deal_id"] is None)
+    check("missing email filled in", email == "dana@globex.com")
+
+    anonymous = ingest(conn, p_activity_type="call", p_transcript="t3", p_create_deal=True, p_deal_value=10)
+    check("no contact name: activity only", anonymous["contact_id"] is None and anonymous["deal_id"] is None
+          and anonymous["activity_id"] is not None)
+
+    print("\n↩️  Rollback")
+    before = [count(conn, t) for t in ("contacts", "activities", "deals")]
+    try:
+        # DECIMAL(12, 2) overflows after the contact and activity are inserted
+        ingest(conn, p_activity_type="call", p_transcript="t4", p_contact_name="Overflow",
+               p_create_deal=True, p_deal_value=10 ** 13)
+        check("failing deal insert raises", False)
+    except psycopg2.Error as e:
+        check("failing deal insert raises", True, e.pgcode or "")
+    after = [count(conn, t) for t in ("contacts", "activities", "deals")]
+    check("nothing from the failed ingest is left", before == after, f"rows {before} -> {after}")
+
+    print(f"\n🔀 {workers} concurrent ingests for one new contact")
+
+    def concurrent(i: int):
+        worker = connect(url)
+        try:
+            return ingest(worker, p_activity_type="call", p_transcript=f"c{i}",
+                          p_contact_name="Concurrent", p_company="Initech")["contact_id"]
+        finally:
+            worker.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        contact_ids = set(pool.map(concurrent, range(workers)))
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM contacts WHERE name = 'Concurrent'")
+        created = cur.fetchone()[0]
+    check("one contact created", len(contact_ids) == 1 and created == 1, f"{created} row(s)")
+
+    print("\n📚 Batch resolution")
+    batch = [{"name": "Concurrent", "company": "initech"}, {"name": "Batch New", "company": None},
+             {"name": "DANA", "company": None}, {"name": "Batch New"}]
+    with conn.cursor() as cur:
+        cur.execute("SELECT resolve_contacts(%s::jsonb)", (json.dumps(batch),))
+        ids = cur.fetchone()[0]
+    check("ids in input order", len(ids) == 4 and ids[0] in contact_ids and ids[2] == first["contact_id"]
+          and ids[1] == ids[3], str(ids))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the contact key migration and ingestion database functions")
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL", "postgresql://postgres@localhost:5432/postgres"))
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    admin = psycopg2.connect(args.url)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        cur.execute(OLD_SCHEMA)
+        cur.execute(setup_sql())
+    try:
+        run_checks(args.url, args.workers)
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.close()
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All ingest RPC checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Long Transcript Extraction Check
+Runs map-reduce extraction over synthetic transcripts (up to millions of
+characters) against an offline fake provider, and checks that every prompt
+stays within the token budget, that small inputs still make a single call,
+that the merged record is correct and deterministic, and that a batch of
+more long documents than chunk workers completes.
+Exits non-zero on failure.
+Usage:  python scripts/check_long_extraction.py --words 1000000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import llm_extraction
+from llm_extraction import LLMExtractor, LLM_CHUNK_TOKENS
+from text_chunking import estimate_tokens
+
+FILLER = ("we went over the rollout plan and the reporting dashboards",
+          "they asked about onboarding for the new sales reps",
+          "pricing for additional seats came up again",
+          "the integration with their ticketing system looks straightforward")
+
+# Prompt template overhead on top of the chunk itself
+TEMPLATE_TOKENS = 400
+
+
+class FakeExtractor(LLMExtractor):
+    """Extractor whose provider reads planted facts back out of the prompt"""
+
+    def __init__(self):
+        self.provider = "fake"
+        self.model = "fake"
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def _complete(self, prompt: str, max_tokens: int = 1024, temperature: float = 0, **options) -> str:
+        if options.get("system"):
+            prompt = f"{options['system']}\n\n{prompt}"
+        with self._lock:
+            self.prompts.append(prompt)
+        if prompt.startswith("Summarize"):
+            return "Merged summary."
+        names = re.findall(r"this is (\w+ \w+) from", prompt)
+        amounts = [float(a.replace(",", "")) for a in re.findall(r"\$([\d,]+)", prompt)]
+        dates = re.findall(r"follow up on (\d{4}-\d{2}-\d{2})", prompt)
+        steps = re.findall(r"next step: ([\w ]+)\.", prompt)
+        return json.dumps({
+            "contact_name": names[0] if names else None,
+            "company": "Globex" if names else None,
+            "email": None,
+            "phone": None,
+            "deal_value": max(amounts) if amounts else None,
+            "next_step": steps[-1] if steps else None,
+            "follow_up_date": max(dates) if dates else None,
+            "notes": None,
+            # Long enough that big inputs need more than one reduce round
+            "summary": " ".join(["Chunk summary."] * 50)
+        })
+
+
+def make_transcript(words: int, seed: int = 0) -> str:
+    """Synthetic call with facts planted at known positions"""
+    rng = random.Random(seed)
+    sentences = ["Hi, this is Dana Scully from Globex."]
+    count = 0
+    while count < words:
+        sentence = rng.choice(FILLER).capitalize() + "."
+        sentences.append(sentence)
+        count += len(sentence.split())
+    n = len(sentences)
+    sentences[n // 4] = "Budget is around $5,000 for the pilot."
+    sentences[n // 2] = "Let's follow up on 2024-03-01 about the pilot."
+    sentences[3 * n // 4] = "For the full rollout we are looking at $42,000, next step: send the contract."
+    sentences[-1] = "Final answer, we follow up on 2024-04-15 after legal review."
+    return " ".join(sentences)
+
+
+def check(label: str, ok: bool, detail: str = "") -> bool:
+    print(f"   {'✅' if ok else '❌'} {label}{'  ' + detail if detail else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map-reduce extraction check")
+    parser.add_argument("--words", type=int, default=1000000, help="Words in the largest transcript")
+    args = parser.parse_args()
+
+    print(f"🧩 Long transcript extraction (chunk budget {LLM_CHUNK_TOKENS} tokens)")
+    ok = True
+
+    small = FakeExtractor()
+    small.extract_all(make_transcript(200))
+    ok &= check("small input uses one call", len(small.prompts) == 1, f"{len(small.prompts)} call(s)")
+
+    for words in sorted({10000, args.words}):
+        text = make_transcript(words)
+        extractor = FakeExtractor()
+        start = time.perf_counter()
+        crm_data, summary = extractor.extract_all(text)
+        elapsed = time.perf_counter() - start
+
+        largest = max(estimate_tokens(p) for p in extractor.prompts)
+        print(f"   {words:>9,} words, {estimate_tokens(text):>9,} tokens -> "
+              f"{len(extractor.prompts)} calls, {elapsed:.2f}s")
+        ok &= check("prompts within budget", largest <= LLM_CHUNK_TOKENS + TEMPLATE_TOKENS,
+                    f"largest {largest} tokens")
+        ok &= check("contact merged", crm_data["contact_name"] == "Dana Scully")
+        ok &= check("largest deal value", crm_data["deal_value"] == 42000, str(crm_data["deal_value"]))
+        ok &= check("latest follow-up", crm_data["follow_up_date"] == "2024-04-15", str(crm_data["follow_up_date"]))
+        ok &= check("next step", crm_data["next_step"] == "send the contract", str(crm_data["next_step"]))
+        rounds = sum(p.startswith("Summarize") for p in extractor.prompts)
+        ok &= check("summary reduced", summary == "Merged summary.", f"{rounds} summary call(s)")
+
+        again, _ = FakeExtractor().extract_all(text)
+        ok &= check("deterministic merge", again == crm_data)
+
+    # Each long batch item fans out to the chunk workers; more of them than
+    # workers must not leave every worker waiting on chunks queued behind it
+    workers = int(os.getenv("LLM_CHUNK_WORKERS", 8))
+    texts = [make_transcript(LLM_CHUNK_TOKENS * 2, seed) for seed in range(workers + 2)]
+    extractor = FakeExtractor()
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(extractor.extract_batch(texts)), daemon=True)
+    start = time.perf_counter()
+    worker.start()
+    worker.join(timeout=60)
+    ok &= check(f"batch of {len(texts)} long documents completes", not worker.is_alive(),
+                f"{time.perf_counter() - start:.2f}s, {LLM_CHUNK_TOKENS * 2} words each")
+    if worker.is_alive():
+        # The chunk pool is wedged; exiting normally would wait on it forever
+        os._exit(1)
+    ok &= check("every long batch item extracted", len(results) == len(texts)
+                and all(crm_data["contact_name"] == "Dana Scully" for crm_data, _ in results))
+
+    llm_extraction._chunk_executor.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
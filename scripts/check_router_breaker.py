@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Router Circuit Breaker Check
+Drives a single fake provider through an outage offline and checks:
+  1. failures open its circuit breaker and calls are refused meanwhile
+  2. a half-open probe that times out waiting for local rate limit budget
+     hands the probe back instead of leaving the breaker half-open for good
+  3. the next probe reaches the recovered provider and closes the breaker
+Exits non-zero on failure.
+Usage:  python scripts/check_router_breaker.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_MAX_RETRIES", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from llm_limits import ProviderLimiter
+from llm_providers import FakeProvider
+from llm_router import LLMRouter
+
+COOLDOWN = 0.2
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+def attempt(router: LLMRouter) -> str:
+    """Outcome of one call: ok, or the error's class name"""
+    try:
+        router.complete("ping")
+        return "ok"
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def main():
+    provider = FakeProvider("solo", latency=0.0, error_rate=1.0)
+    router = LLMRouter([provider], hedge=False, breaker_failures=1, breaker_cooldown=COOLDOWN)
+    limiter = router.limiters["solo"] = ProviderLimiter("solo", rpm=0, tpm=0, max_concurrency=1, wait_seconds=0.05)
+    breaker = router.breakers["solo"]
+
+    print("💥 Outage")
+    attempt(router)
+    check("breaker opens", breaker.state == "open", breaker.state)
+    refused = attempt(router)
+    check("calls refused while open", "circuit breakers open" in refused, refused)
+
+    print("\n🚦 Probe throttled locally")
+    provider.error_rate = 0.0
+    time.sleep(COOLDOWN)
+    limiter.slots.acquire()  # another call holds the only slot
+    throttled = attempt(router)
+    limiter.slots.release()
+    check("probe times out on the rate limiter", "no concurrency slot" in throttled, throttled)
+    check("breaker not left half-open", breaker.state == "open", breaker.state)
+
+    print("\n✅ Recovery")
+    calls = provider.calls
+    recovered = attempt(router)
+    check("next probe reaches the provider", recovered == "ok" and provider.calls == calls + 1, recovered)
+    check("breaker closes", breaker.state == "closed", breaker.state)
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All router circuit breaker checks passed")
+
+
+if __name__ == "__main__":
+    main()
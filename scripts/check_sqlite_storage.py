@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SQLite Storage Check
+Runs the API with DB_CLIENT=sqlite on a throwaway database file (no
+Supabase, no network) and checks:
+  1. concurrent ingests, with contacts re-cased or re-spaced, create each
+     contact once and return ids for every activity and deal
+  2. a failing ingest leaves nothing behind
+  3. /contacts, /deals and /activities page through every row once, with
+     field projection and the embedded contact
+  4. write-behind activity ids come from reserved blocks that inserts never
+     reuse, and replaying a flushed batch adds nothing
+  5. lookups use the indexes, and the data is still there after a reopen
+  6. every database client implements the whole storage interface
+Exits non-zero on failure.
+Usage:  python scripts/check_sqlite_storage.py --ingests 500
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+workdir = tempfile.mkdtemp(prefix="sqlite_storage_")
+os.environ["DB_CLIENT"] = "sqlite"
+os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "crm.db")
+os.environ.setdefault("PRELOAD_SERVICES", "")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import httpx
+
+import main as backend
+from activity_buffer import ActivityWriteBuffer
+from async_database import AsyncDatabaseClient
+from database import DatabaseClient, activity_row
+from sqlite_database import SQLiteDatabaseClient
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+async def page_all(client: httpx.AsyncClient, table: str, limit: int, fields: str = None):
+    rows, after = [], None
+    while True:
+        params = {"limit": limit, **({"after": after} if after else {}), **({"fields": fields} if fields else {})}
+        page = (await client.get(f"/{table}", params=params)).json()
+        rows += page[table]
+        after = page["next_after"]
+        if after is None:
+            return rows
+
+
+async def run(args):
+    await backend.registry.ensure("db")
+    db = backend.db
+
+    print(f"📥 {args.ingests} ingests of 50 contacts, {args.concurrency} at a time")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    spellings = [str, str.upper, lambda name: f"  {name.lower()} "]
+
+    async def ingest(i: int):
+        async with semaphore:
+            crm_data = {"contact_name": spellings[i % 3](f"Contact {i % 50}"), "company": "Acme",
+                        "deal_value": 100.0 * (i + 1), "follow_up_date": f"2026-11-{1 + i % 28:02d}"}
+            return await backend.save_crm_record(crm_data, "call", f"transcript {i}", "summary")
+
+    results = await asyncio.gather(*(ingest(i) for i in range(args.ingests)))
+    contacts = await backend.run_db(db.get_all_contacts)
+    check("one contact per name", len(contacts) == 50, f"{len(contacts)} rows")
+    check("every ingest has an activity and deal id", all(r["activity_id"] and r["deal_id"] for r in results))
+
+    before = [len(await backend.run_db(method)) for method in (db.get_all_contacts, db.get_all_activities)]
+    try:
+        await backend.run_db(db.ingest_crm_record, "call", "orphan", contact={"name": "Rollback"},
+                             deal={"deal_value": 1.0}, contact_id=10 ** 9)
+        check("ingest with an unknown contact_id fails", False)
+    except Exception as e:
+        check("ingest with an unknown contact_id fails", True, type(e).__name__)
+    after = [len(await backend.run_db(method)) for method in (db.get_all_contacts, db.get_all_activities)]
+    check("nothing from the failed ingest is left", before == after, f"rows {before} -> {after}")
+
+    print("\n📄 List endpoints")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend.app), base_url="http://api") as client:
+        deals = await page_all(client, "deals", 37)
+        ids = [deal["id"] for deal in deals]
+        check("deals paged once each, newest first", ids == sorted(set(ids), reverse=True) and len(ids) == args.ingests,
+              f"{len(ids)} rows")
+        check("deals embed their contact", all(deal["contacts"]["id"] == deal["contact_id"] for deal in deals))
+        projected = await page_all(client, "activities", 100, "type,contacts")
+        check("activities projected to the requested fields",
+              all(set(row) == {"id", "type", "contacts"} and row["contacts"] for row in projected),
+              str(sorted(projected[0])))
+        unknown = await client.get("/contacts", params={"fields": "password"})
+        check("unknown field rejected", unknown.status_code == 422)
+
+    print("\n📝 Write-behind")
+    buffer = ActivityWriteBuffer(flush_seconds=0.05, id_block=100, spill_dir=os.path.join(workdir, "spill"))
+    await buffer.start(write=backend._write_activity_rows, reserve=backend._reserve_activity_ids)
+    buffered = await buffer.add_many([activity_row("email", f"buffered {i}") for i in range(150)])
+    direct = await backend.run_db(db.create_activity, "email", "direct")
+    await buffer.stop()
+    check("inserts skip reserved ids", direct["id"] > max(buffered), f"reserved up to {max(buffered)}, insert got {direct['id']}")
+    count = len(await backend.run_db(db.get_all_activities, fields=["id"]))
+    await backend.run_db(db.save_activity_rows, [{**activity_row("email", "replayed"), "id": buffered[0]}])
+    check("replayed rows are skipped", len(await backend.run_db(db.get_all_activities, fields=["id"])) == count,
+          f"{count} activities")
+
+    print("\n🔎 Indexes and durability")
+    plans = {
+        "contact resolution": ("SELECT id FROM contacts WHERE name_key = ? AND company_key = ?", ("a", "b")),
+        "name-only lookup": ("SELECT id FROM contacts WHERE name_key = ? ORDER BY id LIMIT 1", ("a",)),
+        "follow-up range": ("SELECT id FROM deals WHERE follow_up_date BETWEEN ? AND ?", ("2026-11-01", "2026-11-07")),
+        "contact activity timeline": ("SELECT id FROM activities WHERE contact_id = ? ORDER BY timestamp", (1,)),
+    }
+    for label, (sql, params) in plans.items():
+        plan = " ".join(row["detail"] for row in db._query(f"EXPLAIN QUERY PLAN {sql}", params))
+        check(f"{label} uses an index", "USING" in plan and "INDEX" in plan, plan)
+
+    db.close()
+    reopened = SQLiteDatabaseClient(os.environ["SQLITE_DB_PATH"])
+    check("rows still there after reopening", len(reopened.get_all_contacts()) == 50
+          and len(reopened.get_all_deals(limit=1000)) == args.ingests)
+    check("WAL mode", reopened._query("PRAGMA journal_mode")[0]["journal_mode"] == "wal")
+    reopened.close()
+
+    print("\n🧩 Storage interface")
+    for client in (SQLiteDatabaseClient, DatabaseClient, AsyncDatabaseClient):
+        missing = sorted(client.__abstractmethods__)
+        check(f"{client.__name__} implements every method", not missing, ", ".join(missing))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedded SQLite storage check")
+    parser.add_argument("--ingests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All SQLite storage checks passed")
+
+
+if __name__ == "__main__":
+    main()
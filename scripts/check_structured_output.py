@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Structured Output Check
+Offline checks for streamed JSON extraction:
+  1. the incremental parser emits the same fields as json.loads for
+     responses split into random chunks (fences, escapes, nested values)
+  2. truncated or malformed responses keep the fields completed before the
+     error and fall back to a separate summary call, marked degraded and
+     not cached
+  3. with a fake provider streaming a 1s response, the first field arrives
+     well before the full response
+Exits non-zero on failure.
+Usage:  python scripts/check_structured_output.py --requests 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from json_stream import IncrementalJSONParser
+import llm_extraction
+from llm_extraction import DEGRADED_KEY, LLMExtractor
+from llm_providers import FakeProvider
+from llm_router import LLMRouter
+from metrics import metrics
+
+RESPONSE = {
+    "contact_name": "Dana \"DJ\" O'Neil",
+    "company": "Globex, Inc. {EMEA}",
+    "email": "dana@globex.com",
+    "phone": None,
+    "deal_value": 125000.5,
+    "next_step": "Send the contract\nand the SOW",
+    "follow_up_date": "2024-04-15",
+    "notes": "Asked about [seats], \\escapes\\ and unicode: café",
+    "summary": "Dana wants the enterprise plan; contract goes out this week."
+}
+
+failures = 0
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {label}  {detail}")
+
+
+def chunked(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 12)
+        yield text[i:i + n]
+        i += n
+
+
+def parser_checks():
+    print("🧩 Incremental parser")
+    rng = random.Random(7)
+    variants = {
+        "compact": json.dumps(RESPONSE),
+        "indented": json.dumps(RESPONSE, indent=2),
+        "fenced": "```json\n" + json.dumps(RESPONSE, ensure_ascii=False) + "\n```",
+        "nested": json.dumps({"a": [1, {"b": "}]"}], "c": {"d": None}, "e": -1.5e3, "f": True}),
+    }
+    for label, text in variants.items():
+        ok = True
+        for _ in range(200):
+            parser = IncrementalJSONParser()
+            emitted = [pair for chunk in chunked(text, rng) for pair in parser.feed(chunk)]
+            ok &= not parser.failed and dict(emitted) == json.loads(text.strip("`json\n"))
+        check(f"{label:<10} fields match json.loads", ok)
+
+    text = json.dumps(RESPONSE)
+    parser = IncrementalJSONParser()
+    parser.feed(text[:text.index('"notes"') + 12])
+    check("truncated keeps completed fields", list(parser.fields) == list(RESPONSE)[:7], f"{len(parser.fields)} fields")
+    parser = IncrementalJSONParser()
+    parser.feed('{"contact_name": "A", "deal_value": 5 oops}')
+    check("malformed stops emitting", parser.failed and parser.fields == {"contact_name": "A", "deal_value": 5})
+
+
+def salvage_checks():
+    print("\n🩹 Malformed responses")
+    text = json.dumps(RESPONSE)
+    truncated = text[:text.index('"summary"')]
+    provider = FakeProvider("truncating", latency=0.01,
+                            response=lambda p: "Short summary." if p.startswith("Summarize") else truncated)
+    extractor = LLMExtractor(router=LLMRouter([provider], hedge=False))
+    crm_data, summary = extractor.extract_with_summary("salvage check")
+    check("fields salvaged", crm_data["contact_name"] == RESPONSE["contact_name"] and crm_data["deal_value"] == RESPONSE["deal_value"])
+    check("summary from a separate call", summary == "Short summary.", f"{provider.calls} provider calls")
+    check("salvaged result marked degraded", crm_data.get(DEGRADED_KEY) == ["extraction"], str(crm_data.get(DEGRADED_KEY)))
+    cached = []
+    cache_set = llm_extraction.llm_cache.set
+    # The separate summary call's result is fine to cache; CRM data is not
+    llm_extraction.llm_cache.set = lambda key, value: isinstance(value, dict) and cached.append(value)
+    try:
+        extractor.extract_with_summary("salvage check")
+        extractor.extract_crm_data("salvage check")
+    finally:
+        llm_extraction.llm_cache.set = cache_set
+    check("salvaged results not cached", not cached, f"{len(cached)} CRM data cache writes")
+
+
+def latency_checks(args):
+    print(f"\n⏱️  Time to first field: fake provider streaming a 1s response, {args.requests} requests")
+    provider = FakeProvider("streaming", latency=1.0, response=json.dumps(RESPONSE))
+    extractor = LLMExtractor(router=LLMRouter([provider], hedge=False))
+    first, total = [], []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        seen = []
+        extractor.extract_with_summary(f"latency check {i}", on_field=lambda name, value: seen.append(time.perf_counter() - start))
+        first.append(seen[0])
+        total.append(time.perf_counter() - start)
+    mean_first, mean_total = sum(first) / len(first), sum(total) / len(total)
+    print(f"   first field {mean_first * 1000:.0f}ms, full response {mean_total * 1000:.0f}ms")
+    check("first field before 75% of the response", mean_first < 0.75 * mean_total)
+
+    counters = metrics.snapshot()["counters"]
+    responses = counters.get("llm_structured.responses", 0)
+    parse_failures = counters.get("llm_structured.parse_failures", 0)
+    print(f"   parse failure rate {parse_failures:.0f}/{responses:.0f} (one planted above)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structured output and incremental JSON parsing check")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    parser_checks()
+    salvage_checks()
+    latency_checks(args)
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        sys.exit(1)
+    print("✅ All structured output checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Load Test Script - Measure API throughput at increasing concurrency
+Run against a live backend:  python scripts/load_test.py --endpoint /process_text
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+API_URL = "http://localhost:8000"
+
+SAMPLE_TEXT = "Quick call with John from TestCorp. They want a $5,000 deal. Follow up Monday."
+
+
+async def worker(client, method, endpoint, payload, deadline, latencies, errors):
+    """Fire requests back-to-back until the deadline"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if method == "GET":
+                response = await client.get(endpoint)
+            else:
+                response = await client.post(endpoint, json=payload)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_level(base_url, method, endpoint, payload, concurrency, duration):
+    """Run one concurrency level and return its stats"""
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, method, endpoint, payload, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zero-Click CRM load test")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--endpoint", default="/process_text")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    args = parser.parse_args()
+
+    method = "GET" if args.endpoint in ("/", "/contacts", "/deals", "/activities", "/sample_emails") else "POST"
+    payload = {"text": SAMPLE_TEXT, "source": "loadtest"}
+    if args.endpoint == "/process_email":
+        payload = {"email_text": f"From: John <john@testcorp.com>\nSubject: Deal\n\n{SAMPLE_TEXT}"}
+    elif args.endpoint == "/query":
+        payload = {"query": "Show all deals"}
+
+    print(f"🔥 Load testing {method} {args.url}{args.endpoint}")
+    print(f"{'conc':>6} {'reqs':>7} {'errs':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'scale':>7}")
+
+    baseline = None
+    for level in [int(x) for x in args.levels.split(",")]:
+        stats = asyncio.run(run_level(args.url, method, args.endpoint, payload, level, args.duration))
+        if baseline is None:
+            baseline = stats["throughput"] or 1.0
+        print(f"{stats['concurrency']:>6} {stats['requests']:>7} {stats['errors']:>6} "
+              f"{stats['throughput']:>9.2f} {stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} "
+              f"{stats['throughput'] / baseline:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
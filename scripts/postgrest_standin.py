@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+PostgREST Stand-in
+In-memory server speaking the subset of the PostgREST API the CRM uses
+(select with eq/in/is/lt/gt filters, order, limit, contacts(*) embedding, and
+inserts with return=representation/minimal and resolution=ignore-duplicates)
+plus the resolve_contact(s), ingest_crm_record and reserve_activity_ids
+RPCs, served at / and /rest/v1 so both AsyncDatabaseClient (DB_REST_URL) and the supabase client can point at it.
+Usage:  python scripts/postgrest_standin.py --port 3000 --latency-ms 2 [--certfile c.pem --keyfile k.pem]
+"""
+import argparse
+import asyncio
+import itertools
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+_IN_VALUE = re.compile(r'"((?:[^"\\]|\\.)*)"|([^,]+)')
+
+
+def _in_values(expr: str) -> List[str]:
+    inner = expr[1:-1] if expr.startswith("(") else expr
+    return [re.sub(r"\\(.)", r"\1", quoted) if quoted or not bare else bare
+            for quoted, bare in _IN_VALUE.findall(inner)]
+
+
+def _matches(row: Dict[str, Any], column: str, condition: str) -> bool:
+    op, _, value = condition.partition(".")
+    actual = row.get(column)
+    if op == "eq":
+        return actual is not None and str(actual) == value
+    if op in ("lt", "gt"):
+        if actual is None:
+            return False
+        try:
+            actual, value = float(actual), float(value)
+        except ValueError:
+            actual, value = str(actual), str(value)
+        return actual < value if op == "lt" else actual > value
+    if op == "in":
+        return actual is not None and str(actual) in _in_values(value)
+    if op == "is":
+        return actual is None if value == "null" else str(actual).lower() == value
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _normalize(value: Any) -> str:
+    """normalize_contact_part from setup_database.sql"""
+    return re.sub(r"\s+", " ", (value or "").strip()).lower()
+
+
+def create_app(latency_ms: float = 0.0) -> FastAPI:
+    """A fresh stand-in with empty contacts/deals/activities tables"""
+    app = FastAPI(title="PostgREST stand-in")
+    tables: Dict[str, List[Dict[str, Any]]] = {"contacts": [], "deals": [], "activities": []}
+    ids = itertools.count(1)
+    app.state.tables = tables
+    app.state.requests = 0
+    app.state.contact_resolutions = 0
+
+    async def handle(table: str, request: Request):
+        app.state.requests += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if table not in tables:
+            return JSONResponse({"message": f"relation {table} does not exist"}, status_code=404)
+        rows = tables[table]
+
+        if request.method == "POST":
+            body = await request.json()
+            items = body if isinstance(body, list) else [body]
+            if "ignore-duplicates" in request.headers.get("prefer", ""):
+                existing = {row["id"] for row in rows}
+                items = [item for item in items if item.get("id") not in existing]
+            created = [insert(table, item) for item in items]
+            if "return=minimal" in request.headers.get("prefer", ""):
+                return Response(status_code=201)
+            return JSONResponse(created, status_code=201)
+
+        params = request.query_params
+        select = params.get("select", "*")
+        result = rows
+        for column, condition in params.multi_items():
+            if column not in ("select", "order", "limit", "offset"):
+                result = [row for row in result if _matches(row, column, condition)]
+        if "order" in params:
+            column, _, direction = params["order"].partition(".")
+            result = sorted(result, key=lambda row: (row.get(column) is None, row.get(column)),
+                            reverse=direction.startswith("desc"))
+        offset = int(params.get("offset", 0))
+        if "limit" in params:
+            result = result[offset:offset + int(params["limit"])]
+
+        columns = [c.strip() for c in select.split(",") if c.strip()]
+        contacts = {row["id"]: row for row in tables["contacts"]}
+        out = []
+        for row in result:
+            shaped = dict(row) if "*" in columns else {c: row.get(c) for c in columns if "(" not in c}
+            if "contacts(*)" in columns:
+                shaped["contacts"] = contacts.get(row.get("contact_id"))
+            out.append(shaped)
+        return JSONResponse(out)
+
+    def insert(table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = {**row, "id": row["id"] if row.get("id") is not None else next(ids)}
+        if table == "contacts":
+            # Generated columns, unique together
+            row["name_key"], row["company_key"] = _normalize(row.get("name")), _normalize(row.get("company"))
+        tables[table].append(row)
+        return row
+
+    def resolve_contact(name: str, company: Optional[str], email: Optional[str], phone: Optional[str]) -> int:
+        app.state.contact_resolutions += 1
+        name_key, company_key = _normalize(name), _normalize(company)
+        contacts = sorted(tables["contacts"], key=lambda row: row["id"])
+        for row in contacts:
+            if row["name_key"] == name_key and (not company_key or row["company_key"] == company_key):
+                row["email"], row["phone"] = row.get("email") or email, row.get("phone") or phone
+                return row["id"]
+        return insert("contacts", {"name": name, "company": company or None, "email": email, "phone": phone,
+                                   "created_at": datetime.now().isoformat()})["id"]
+
+    def ingest_crm_record(p: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        contact_id = p.get("p_contact_id")
+        if contact_id is None and _normalize(p.get("p_contact_name")):
+            contact_id = resolve_contact(p["p_contact_name"], p.get("p_company"), p.get("p_email"), p.get("p_phone"))
+        activity = insert("activities", {"type": p["p_activity_type"], "transcript": p["p_transcript"],
+                                         "summary": p.get("p_summary"), "contact_id": contact_id, "timestamp": now})
+        deal = None
+        if p.get("p_create_deal") and contact_id is not None:
+            deal = insert("deals", {"contact_id": contact_id, "deal_value": p.get("p_deal_value"), "stage": "initial",
+                                    "next_step": p.get("p_next_step"), "follow_up_date": p.get("p_follow_up_date"),
+                                    "notes": p.get("p_notes"), "created_at": now})
+        return {"contact_id": contact_id, "activity_id": activity["id"], "deal_id": deal["id"] if deal else None}
+
+    functions = {
+        "resolve_contact": lambda p: resolve_contact(p["p_name"], p.get("p_company"), p.get("p_email"), p.get("p_phone")),
+        "resolve_contacts": lambda p: [resolve_contact(c["name"], c.get("company"), c.get("email"), c.get("phone"))
+                                       for c in p["p_contacts"]],
+        "ingest_crm_record": ingest_crm_record,
+        "reserve_activity_ids": lambda p: [next(ids) for _ in range(p["p_count"])],
+    }
+
+    async def rpc(function: str, request: Request):
+        """The setup_database.sql functions; atomic since handlers don't interleave"""
+        app.state.requests += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if function not in functions:
+            return JSONResponse({"code": "PGRST202", "message": f"Could not find the function public.{function} "
+                                 "in the schema cache"}, status_code=404)
+        return JSONResponse(functions[function](await request.json()))
+
+    for prefix in ("", "/rest/v1"):
+        app.add_api_route(prefix + "/rpc/{function}", rpc, methods=["POST"])
+        app.add_api_route(prefix + "/{table}", handle, methods=["GET", "POST"])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory PostgREST stand-in")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated query time per request")
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms), host="127.0.0.1", port=args.port, log_level="warning",
+                ssl_certfile=args.certfile, ssl_keyfile=args.keyfile)
+
+
+if __name__ == "__main__":
+    main()